@@ -1,22 +1,114 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, session, Response, send_file
+import time
+
+# 记录模块导入和应用初始化耗时，create_app() 时输出
+_import_start = time.perf_counter()
+_startup_timing = {}
+
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, session, Response, send_file, g
+from werkzeug.local import LocalProxy
 from datetime import datetime, timedelta
-from work_manager import WorkManager
+from work_manager import get_manager
 from urllib.parse import quote
 from functools import wraps
 import io
 import csv
-from docx import Document
-from docx.shared import Pt
 import os
+import logging
 from routes.project_routes import bp as project_bp
 from config.district_config import get_grouped_districts
+from event_bus import event_bus
+from write_queue import write_queue, WRITE_TIMEOUT
+from single_flight import single_flight
+import backup
+import maintenance
+import project_import
+from query_stats import query_stats, REQUEST_QUERY_WARN
+from metrics import request_metrics, UNTRACKED_ENDPOINTS
+from models import Database
+import assets
+import compression
+import fragment_cache
+from config.logging_config import setup_logging
+from config import database_config
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key'  # 用于flash消息
-manager = WorkManager()
+# 每个进程在第一次使用时创建自己的 WorkManager 和数据库连接
+manager = LocalProxy(get_manager)
 
 # 注册蓝图
 app.register_blueprint(project_bp)
+# 静态资源（asset_url 和 /assets 路由）
+assets.init_app(app)
+# 响应压缩和 ETag，最先注册所以在其他 after_request 之后执行
+compression.init_app(app)
+# 模板字节码缓存和行片段缓存
+fragment_cache.init_app(app)
+
+@app.before_request
+def start_request_metrics():
+    query_stats.start_request()
+    endpoint = request.endpoint or 'unmatched'
+    if endpoint in UNTRACKED_ENDPOINTS:
+        return
+    g.request_start = time.perf_counter()
+    g.metrics_endpoint = endpoint
+    request_metrics.request_started(endpoint)
+
+@app.after_request
+def finish_request_metrics(response):
+    count = query_stats.end_request()
+    response.headers['X-Query-Count'] = str(count)
+    if count > REQUEST_QUERY_WARN:
+        logger.warning("请求 %s %s 执行了 %d 条 SQL，可能存在 N+1 查询",
+                       request.method, request.path, count)
+    if 'request_start' in g:
+        request_metrics.observe(g.metrics_endpoint, request.method, response.status_code,
+                                time.perf_counter() - g.request_start)
+    return response
+
+@app.teardown_request
+def release_request_metrics(exc):
+    # 异常时 after_request 可能不执行，并发数统一在这里减少
+    endpoint = g.pop('metrics_endpoint', None)
+    if endpoint is not None:
+        request_metrics.request_finished(endpoint)
+
+def collect_runtime_metrics():
+    """数据库连接、SQL 执行、后台写入和事件推送的运行时指标"""
+    opened, live = Database.connection_stats()
+    query_count, query_seconds = query_stats.totals()
+    cache_stats = fragment_cache.fragment_cache.stats()
+    write_stats = write_queue.stats()
+    flight_stats = single_flight.stats()
+    return [
+        ('sqlite_connections_opened_total', 'counter', 'SQLite connections opened.', [({}, opened)]),
+        ('sqlite_connections_live', 'gauge', 'SQLite connections held by live threads.', [({}, live)]),
+        ('sqlite_queries_total', 'counter', 'SQL statements executed.', [({}, query_count)]),
+        ('sqlite_query_seconds_total', 'counter', 'Time spent executing SQL.', [({}, f'{query_seconds:.6f}')]),
+        ('sse_subscribers', 'gauge', 'Connected event stream clients.', [({}, event_bus.subscriber_count)]),
+        ('fragment_cache_requests_total', 'counter', 'Template fragment cache lookups.',
+         [({'result': 'hit'}, cache_stats['hits']), ({'result': 'miss'}, cache_stats['misses'])]),
+        ('fragment_cache_entries', 'gauge', 'Cached template fragments.', [({}, cache_stats['entries'])]),
+        ('write_queue_depth', 'gauge', 'Writes waiting for the background writer.', [({}, write_stats['depth'])]),
+        ('write_queue_batches_total', 'counter', 'Transactions committed by the background writer.',
+         [({}, write_stats['batches'])]),
+        ('write_queue_operations_total', 'counter', 'Background write operations.',
+         [({'result': 'ok'}, write_stats['operations']), ({'result': 'error'}, write_stats['errors'])]),
+        ('single_flight_calls_total', 'counter', 'Coalesced read calls by outcome.',
+         [({'name': name, 'result': result}, count)
+          for name, counts in sorted(flight_stats.items()) for result, count in counts.items()]),
+        ('backup_last_success_timestamp_seconds', 'gauge', 'Finish time of the last backup by this process.',
+         [({}, f"{backup.last_result['finished_at']:.0f}")] if backup.last_result else []),
+        ('backup_last_duration_seconds', 'gauge', 'Duration of the last backup by this process.',
+         [({}, backup.last_result['seconds'])] if backup.last_result else []),
+        ('app_startup_seconds', 'gauge', 'Module import and create_app() time.',
+         [({'phase': phase}, f'{seconds:.6f}') for phase, seconds in _startup_timing.items()])
+    ]
+
+request_metrics.register_collector(collect_runtime_metrics)
 
 # 登录装饰器
 def login_required(f):
@@ -45,14 +137,41 @@ def format_datetime(value):
         value = datetime.fromisoformat(value)
     return value.strftime('%Y-%m-%d %H:%M:%S')
 
+def project_to_dict(project):
+    """将 projects 表的查询结果转换为可序列化的字典"""
+    return {key: project[key] for key in project.keys()}
+
+def task_to_dict(task):
+    """将任务查询结果转换为字典"""
+    return {
+        'id': task['id'],
+        'project_id': task['project_id'],
+        'content': task['content'],
+        'priority': task['priority'],
+        'start_time': format_datetime(task['start_time']),
+        'end_time': format_datetime(task['end_time']) if task['end_time'] else None,
+        'completed': task['completed']
+    }
+
 @app.route('/')
 @login_required
 def index():
+    return render_index()
+
+def render_index(project_form=None, duplicate_clients=None):
+    """渲染首页
+
+    project_form 为添加项目表单提交的值，duplicate_clients 为可能重复的客户，
+    添加项目需要确认重复时用于重新显示表单。
+    """
+    # 先取版本号，渲染期间发生的修改会在下一次增量刷新中返回
+    dashboard_version = manager.get_dashboard_version()
     if session['role'] == 'admin':
         projects = manager.get_projects_by_activity()
     else:
         projects = manager.get_user_projects(session['user_id'])
-    tasks = manager.get_user_tasks(session['user_id'])
+    tasks, next_task_cursor = manager.query_tasks(session['user_id'])
+    task_templates = manager.get_task_templates(session['user_id'])
     project_stats = manager.get_project_statistics()
     district_groups = get_grouped_districts()
     
@@ -61,8 +180,78 @@ def index():
                          recent_inactive=projects['recent_inactive'],
                          long_inactive=projects['long_inactive'],
                          tasks=tasks,
+                         next_task_cursor=next_task_cursor,
+                         task_templates=task_templates,
                          project_stats=project_stats,
-                         district_groups=district_groups)
+                         district_groups=district_groups,
+                         dashboard_version=dashboard_version,
+                         project_form=project_form or {},
+                         duplicate_clients=duplicate_clients or [])
+
+@app.route('/api/dashboard')
+@login_required
+def api_dashboard():
+    # 先取版本号，之后发生的修改会在下一次增量刷新中返回
+    dashboard_version = manager.get_dashboard_version()
+    if session['role'] == 'admin':
+        projects = manager.get_projects_by_activity()
+    else:
+        projects = manager.get_user_projects(session['user_id'])
+    tasks, next_task_cursor = manager.query_tasks(session['user_id'])
+
+    return jsonify({
+        'success': True,
+        'version': dashboard_version,
+        'projects': {
+            bucket: [project_to_dict(project) for project in rows]
+            for bucket, rows in projects.items()
+        },
+        'tasks': [task_to_dict(task) for task in tasks],
+        'next_task_cursor': next_task_cursor,
+        'stats': manager.get_project_counts()
+    })
+
+@app.route('/api/dashboard/delta')
+@login_required
+def api_dashboard_delta():
+    since = request.args.get('since', '')
+    dashboard_version = manager.get_dashboard_version()
+    user_id = None if session['role'] == 'admin' else session['user_id']
+    projects = manager.get_changed_projects(since, user_id)
+
+    # 返回渲染好的行 HTML，前端直接替换
+    changed = []
+    for project in projects:
+        item = project_to_dict(project)
+        item['html'] = str(fragment_cache.render_cached_macro(
+            '_project_row.html', 'project_row', project, project['state'], key=project['id']
+        )) if project['is_active'] == 1 and project['deleted_at'] is None else None
+        changed.append(item)
+
+    return jsonify({
+        'success': True,
+        'version': dashboard_version,
+        'projects': changed,
+        'stats': manager.get_project_counts()
+    })
+
+@app.route('/events')
+@login_required
+def events():
+    subscription = event_bus.subscribe()
+    if subscription is None:
+        # 连接数已满，浏览器改为定时轮询 /api/dashboard/delta，稍后再尝试连接
+        return Response('retry: 60000\n\n', status=503, mimetype='text/event-stream',
+                        headers={'Retry-After': '60'})
+
+    return Response(
+        event_bus.stream(subscription),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
 
 @app.route('/add_project', methods=['POST'])
 def add_project():
@@ -100,15 +289,22 @@ def add_project():
                 flash('项目ID必须为数字')
                 return redirect(url_for('index'))
 
+            # 客户可能已存在时保留已填写的内容重新显示表单，勾选确认（或前端确认）后带
+            # confirm_duplicate 重新提交
+            if not request.form.get('confirm_duplicate'):
+                duplicates = manager.find_duplicate_clients(client_name)
+                if duplicates:
+                    return render_index(project_form=request.form, duplicate_clients=duplicates[:5]), 409
+
             # 添加项目
-            print(f"正在添加项目：ID={project_id}, 客户={client_name}, 环节={stage}")
+            logger.debug("正在添加项目：ID=%s, 客户=%s, 环节=%s", project_id, client_name, stage)
             manager.add_project(project_id, client_name, stage, status, notes, area, project_manager, manager_phone)
             flash('项目添加成功！')
         except ValueError as e:
-            print(f"添加项目时出现 ValueError：{e}")
+            logger.info("添加项目时出现 ValueError：%s", e)
             flash(str(e))
         except Exception as e:
-            print(f"添加项目时出现错误：{e}")
+            logger.exception("添加项目时出现错误：%s", e)
             flash(f'添加项目时出错：{str(e)}')
     return redirect(url_for('index'))
 
@@ -136,6 +332,36 @@ def add_task():
     
     return redirect(url_for('index'))
 
+@app.route('/add_task_template', methods=['POST'])
+@login_required
+def add_task_template():
+    try:
+        project_id = request.form.get('project_id')
+        content = request.form.get('content', '').strip()
+        priority = request.form.get('priority')
+        rule = request.form.get('rule', '').strip()
+
+        if not content or not rule:
+            flash('请输入任务内容和周期规则')
+            return redirect(url_for('index'))
+
+        if manager.add_task_template(project_id, content, priority, rule, session['user_id']):
+            flash('周期任务添加成功！')
+        else:
+            flash('周期任务添加失败，请重试')
+    except ValueError as e:
+        flash(str(e))
+    except Exception as e:
+        flash(f'添加周期任务时出错：{str(e)}')
+
+    return redirect(url_for('index'))
+
+@app.route('/delete_task_template/<int:template_id>', methods=['POST'])
+@login_required
+def delete_task_template(template_id):
+    success = manager.delete_task_template(template_id, session['user_id'])
+    return jsonify({'success': success})
+
 @app.route('/complete_task/<int:task_id>', methods=['POST'])
 def complete_task(task_id):
     completion_note = request.json.get('completion_note', '')
@@ -148,13 +374,63 @@ def cancel_task(task_id):
     success = manager.cancel_task(task_id, cancel_reason)
     return jsonify({'success': success})
 
+@app.route('/api/tasks')
+@login_required
+def api_tasks():
+    try:
+        tasks, next_cursor = manager.query_tasks(
+            session['user_id'],
+            project_id=request.args.get('project_id'),
+            priority=request.args.get('priority'),
+            start_date=request.args.get('start_date'),
+            end_date=request.args.get('end_date'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', 50)
+        )
+        return jsonify({
+            'success': True,
+            'tasks': [task_to_dict(task) for task in tasks],
+            'next_cursor': next_cursor
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/tasks/batch', methods=['POST'])
+@login_required
+def batch_tasks():
+    try:
+        data = request.get_json()
+        action = data.get('action')
+        task_ids = data.get('task_ids', [])
+        note = data.get('note', '')
+        assignee_id = data.get('assignee_id')
+
+        if not isinstance(task_ids, list) or not task_ids:
+            return jsonify({'success': False, 'error': '请选择任务'})
+
+        # 管理员可以处理所有人的任务，其他用户只能处理自己的任务
+        user_id = None if session['role'] == 'admin' else session['user_id']
+        updated = manager.batch_update_tasks(task_ids, action, note, assignee_id, user_id)
+        return jsonify({'success': updated > 0, 'updated': updated})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
+    except Exception as e:
+        logger.exception("批量操作任务时出错：%s", e)
+        return jsonify({'success': False, 'error': str(e)})
+
+def project_not_found():
+    """项目不存在或已删除（已删除的项目只能通过 /restore_project 恢复）"""
+    return jsonify({'success': False, 'error': '项目不存在或已删除'}), 404
+
 @app.route('/update_project_state/<int:project_id>', methods=['POST'])
 def update_project_state(project_id):
+    if not manager.get_project(project_id):
+        return project_not_found()
     data = request.get_json()
     new_state = data.get('state')
     if new_state in ['active', 'recent_inactive', 'long_inactive']:
-        manager.update_project_state(project_id, new_state)
-        return jsonify({'success': True})
+        success = manager.update_project_state(project_id, new_state)
+        return jsonify({'success': success})
     return jsonify({'success': False, 'error': 'Invalid state'})
 
 @app.route('/project_history')
@@ -186,29 +462,41 @@ def project_history():
 def add_maintenance():
     project_id = request.form['project_id']
     description = request.form['description']
-    manager.add_maintenance_record(project_id, description)
-    flash('维护记录已添加！')
+    try:
+        manager.add_maintenance_record(project_id, description).result(WRITE_TIMEOUT)
+        flash('维护记录已添加！')
+    except Exception as e:
+        logger.exception("添加维护记录失败：%s", e)
+        flash('添加维护记录失败')
     return redirect(url_for('index'))
 
 @app.route('/add_issue', methods=['POST'])
 def add_issue():
     project_id = request.form['project_id']
     description = request.form['description']
-    manager.add_issue_record(project_id, description)
-    flash('故障记录已添加！')
+    try:
+        manager.add_issue_record(project_id, description).result(WRITE_TIMEOUT)
+        flash('故障记录已添加！')
+    except Exception as e:
+        logger.exception("添加故障记录失败：%s", e)
+        flash('添加故障记录失败')
     return redirect(url_for('index'))
 
 @app.route('/update_project_stage/<int:project_id>', methods=['POST'])
 def update_project_stage(project_id):
+    if not manager.get_project(project_id):
+        return project_not_found()
     data = request.get_json()
     new_stage = data.get('stage')
     if new_stage:
-        manager.update_project_stage(project_id, new_stage)
-        return jsonify({'success': True})
+        success = manager.update_project_stage(project_id, new_stage) is not False
+        return jsonify({'success': success})
     return jsonify({'success': False, 'error': 'Invalid stage'})
 
 @app.route('/update_project_status/<int:project_id>', methods=['POST'])
 def update_project_status(project_id):
+    if not manager.get_project(project_id):
+        return project_not_found()
     try:
         data = request.get_json()
         new_status = data.get('status')
@@ -244,7 +532,10 @@ def get_daily_report(date):
 @login_required
 @permission_required('reports', 'view')
 def get_monthly_report(year, month):
-    reports = manager.get_monthly_report(year, month, session['user_id'])
+    try:
+        reports = manager.get_monthly_report(year, month, session['user_id'])
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     return jsonify({
         'success': True,
         'reports': reports  # 直接返回报告列表
@@ -259,31 +550,70 @@ def delete_project(project_id):
         print(f"Error deleting project: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/projects/suggest')
+@login_required
+def api_project_suggest():
+    """客户名称联想，duplicate 表示可能与输入的名称重复"""
+    query = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int) or 10, 50)
+    return jsonify({'success': True, 'suggestions': manager.suggest_clients(query, limit)})
+
+@app.route('/import_projects', methods=['POST'])
+@login_required
+@permission_required('projects', 'add')
+def import_projects():
+    """上传 CSV 批量导入项目，返回新增、更新数和逐行错误"""
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'success': False, 'error': '请选择要导入的 CSV 文件'})
+    try:
+        report = project_import.import_projects(
+            manager, project_import.open_text(file.stream),
+            update_existing=request.form.get('update_existing', '1') != '0'
+        )
+        if report['created'] or report['updated']:
+            # 大量写入后更新统计信息，在后台执行，不等待
+            maintenance.refresh_after_bulk_change('import', background=True)
+        return jsonify({'success': True, **report})
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'error': str(e)})
+    except Exception as e:
+        logger.exception("批量导入项目时出错：%s", e)
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/restore_project/<int:project_id>', methods=['POST'])
+@login_required
+@permission_required('projects', 'delete')
+def restore_project(project_id):
+    try:
+        success = manager.restore_project(project_id)
+        return jsonify({'success': success})
+    except Exception as e:
+        logger.exception("恢复项目 %s 时出错：%s", project_id, e)
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/projects_by_state/<state>')
 @login_required
 def projects_by_state(state):
     try:
-        print(f"\n开始获取{state}状态的项目列表...")
         if state == 'total':
             # 获取所有项目
             projects = manager.get_all_projects()
-            print(f"获取到所有项目：{len(projects)} 个")
-            for p in projects:
-                print(f"项目：ID={p['id']}, 名称={p['client_name']}, 状态={p['state']}")
         else:
             # 获取指定状态的项目
             projects = manager.get_projects_by_state(state)
-            print(f"获取到 {state} 状态的项目：{len(projects)} 个")
+        logger.debug("获取到 %s 状态的项目：%d 个", state, len(projects))
+
+        # 逐行日志只在 DEBUG 级别下生成，并且经过采样
+        if logger.isEnabledFor(logging.DEBUG):
             for p in projects:
-                print(f"项目：ID={p['id']}, 名称={p['client_name']}, 状态={p['state']}")
-        
-        print("准备渲染模板...")
+                logger.debug("项目：ID=%s, 名称=%s, 状态=%s", p['id'], p['client_name'], p['state'],
+                             extra={'sample': True})
+
         return render_template('all_projects.html', 
                              projects=projects)
     except Exception as e:
-        print(f"获取项目列表时出错：{str(e)}")
-        import traceback
-        print(f"错误堆栈：\n{traceback.format_exc()}")
+        logger.exception("获取项目列表时出错：%s", e)
         flash('获取项目列表时出错，请重试')
         return redirect(url_for('index'))
 
@@ -330,6 +660,8 @@ def add_device_info(project_id):
 
 @app.route('/add_device/<int:project_id>', methods=['POST'])
 def add_device(project_id):
+    if not manager.get_project(project_id):
+        return project_not_found()
     try:
         data = request.get_json()
         device_info = {
@@ -374,6 +706,8 @@ def delete_device(device_id):
 
 @app.route('/update_project_info/<int:project_id>', methods=['POST'])
 def update_project_info(project_id):
+    if not manager.get_project(project_id):
+        return project_not_found()
     try:
         data = request.get_json()
         field = data.get('field')
@@ -393,6 +727,8 @@ def update_project_info(project_id):
 @login_required
 @permission_required('projects', 'edit')
 def complete_project(project_id):
+    if not manager.get_project(project_id):
+        return project_not_found()
     try:
         success = manager.complete_project(project_id)
         return jsonify({'success': success})
@@ -405,11 +741,14 @@ def complete_project(project_id):
 @permission_required('reports', 'edit')
 def update_daily_report():
     data = request.get_json()
-    success = manager.update_daily_report(
-        data['date'], 
-        data['content'],
-        session['user_id']
-    )
+    try:
+        success = manager.update_daily_report(
+            data['date'], 
+            data['content'],
+            session['user_id']
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)})
     return jsonify({'success': success})
 
 @app.route('/export_daily_report/<date>')
@@ -589,8 +928,53 @@ def get_user_permissions(user_id):
         'permissions': permissions
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus 文本格式的运行指标"""
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/queries')
+@login_required
+def debug_queries():
+    """SQL 执行统计，仅管理员可见"""
+    if session.get('role') != 'admin':
+        flash('权限不足')
+        return redirect(url_for('index'))
+    return render_template('debug_queries.html', stats=query_stats.summary())
+
+@app.route('/debug/queries/reset', methods=['POST'])
+@login_required
+def reset_debug_queries():
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': '权限不足'})
+    query_stats.reset()
+    return jsonify({'success': True})
+
+@app.route('/admin/maintenance')
+@login_required
+def maintenance_runs():
+    """最近的数据库维护记录，仅管理员可见"""
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': '权限不足'})
+    return jsonify({'success': True, 'runs': maintenance.recent_runs()})
+
+@app.route('/admin/maintenance', methods=['POST'])
+@login_required
+def run_maintenance():
+    """立即执行一次完整的数据库维护"""
+    if session.get('role') != 'admin':
+        return jsonify({'success': False, 'error': '权限不足'})
+    try:
+        report = maintenance.run('manual', full=True)
+        return jsonify({'success': True, 'report': report})
+    except Exception as e:
+        logger.exception("数据库维护失败：%s", e)
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/reactivate_project/<int:project_id>', methods=['POST'])
 def reactivate_project(project_id):
+    if not manager.get_project(project_id):
+        return project_not_found()
     try:
         data = request.get_json()
         state = data.get('state', 'active')  # 默认重新激活为进行中状态
@@ -626,6 +1010,10 @@ def export_daily_report_word(date):
     tasks = manager.get_daily_tasks(date, user_id)
     
     if tasks:
+        # python-docx 导入较慢，只在导出 Word 时加载
+        from docx import Document
+        from docx.shared import Pt
+
         # 创建Word文档
         doc = Document()
         
@@ -728,4 +1116,28 @@ def edit_project(project_id):
         except Exception as e:
             print(f"更新项目时出错：{str(e)}")
             flash('更新项目时出错，请重试')
-            return redirect(url_for('edit_project', project_id=project_id))
\ No newline at end of file
+            return redirect(url_for('edit_project', project_id=project_id))
+
+_startup_timing['import'] = time.perf_counter() - _import_start
+
+def create_app(config=None, init_db=False):
+    """应用工厂：配置日志并返回 app
+
+    导入本模块不会连接数据库，每个进程的 WorkManager 在第一次使用时创建，
+    预加载后再 fork 的工作进程不会继承打开的 SQLite 连接。
+    init_db=True 时立即初始化数据库，便于启动阶段发现问题。
+    config 中的 DATABASE_PATH、DATABASE_URI、DATABASE_MEMORY、DATABASE_PRAGMAS
+    覆盖环境变量中的数据库配置，例如测试时传入 {'DATABASE_MEMORY': 'test'}。
+    """
+    if config:
+        app.config.update(config)
+    database_config.configure(app.config)
+    if 'startup' not in _startup_timing:
+        start = time.perf_counter()
+        setup_logging()
+        if init_db:
+            get_manager()
+        _startup_timing['startup'] = time.perf_counter() - start
+        logger.info("应用启动完成：导入 %.1fms，初始化 %.1fms",
+                    _startup_timing['import'] * 1000, _startup_timing['startup'] * 1000)
+    return app
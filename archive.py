@@ -0,0 +1,235 @@
+"""历史数据归档
+
+把早于截止日期的项目历史、已结束的任务和日报，以及很久以前已完成项目的
+历史和任务，移到单独的归档库（见 config/database_config.py 中的 DATABASE_ARCHIVE_PATH），
+主库只保留近期数据。
+
+每个连接以 archive 为名附加归档库，并建立临时视图 all_tasks、all_project_history、
+all_daily_reports 合并主库和归档库。archive_state 记录每张表归档数据的最新时间，
+查询的时间范围不涉及归档数据时直接查主库，只有范围早于该时间时才使用视图。
+归档数据只读，修改和删除历史记录只作用于主库。
+
+用法：
+    python archive.py                       # 归档 ARCHIVE_AFTER_DAYS 天之前的数据
+    python archive.py --before 2024-01-01 --completed-days 180
+"""
+import argparse
+from datetime import datetime, timedelta
+import logging
+import os
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# 默认归档多少天之前的数据，以及完成多少天之后的项目
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '365'))
+ARCHIVE_COMPLETED_DAYS = int(os.environ.get('ARCHIVE_COMPLETED_DAYS', '180'))
+
+# 归档的表：列（与主库一致，显式列出以免受 ALTER TABLE 后列顺序的影响）和时间列；
+# 归档表不加 NOT NULL 约束，旧数据原样保存
+TABLES = {
+    'tasks': {
+        'columns': ('id', 'project_id', 'content', 'priority', 'start_time', 'end_time',
+                    'completed', 'completion_note', 'user_id'),
+        'time_column': 'start_time',
+        'ddl': '''
+            id INTEGER PRIMARY KEY,
+            project_id INTEGER,
+            content TEXT,
+            priority INTEGER,
+            start_time TIMESTAMP,
+            end_time TIMESTAMP,
+            completed BOOLEAN,
+            completion_note TEXT,
+            user_id INTEGER
+        ''',
+        'index': '(user_id, start_time)'
+    },
+    'project_history': {
+        'columns': ('id', 'project_id', 'change_type', 'change_time', 'old_value', 'new_value',
+                    'description'),
+        'time_column': 'change_time',
+        'ddl': '''
+            id INTEGER PRIMARY KEY,
+            project_id INTEGER,
+            change_type TEXT,
+            change_time TIMESTAMP,
+            old_value TEXT,
+            new_value TEXT,
+            description TEXT
+        ''',
+        'index': '(project_id, change_time)'
+    },
+    'daily_reports': {
+        'columns': ('id', 'report_date', 'content', 'created_at', 'user_id'),
+        'time_column': 'report_date',
+        'ddl': '''
+            id INTEGER PRIMARY KEY,
+            report_date DATE,
+            content TEXT,
+            created_at TIMESTAMP,
+            user_id INTEGER
+        ''',
+        'index': '(user_id, report_date)'
+    }
+}
+
+
+def is_attached(conn):
+    return any(row[1] == 'archive' for row in conn.execute('PRAGMA database_list'))
+
+
+def prepare_connection(conn):
+    """新连接打开后调用：建立归档表和合并视图，没有附加归档库时视图只包含主库"""
+    attached = is_attached(conn)
+    if attached:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive.archive_state (
+                table_name TEXT PRIMARY KEY,
+                newest TEXT,        -- 已归档数据的最新时间
+                row_count INTEGER,
+                archived_at TIMESTAMP
+            )
+        ''')
+    for table, spec in TABLES.items():
+        columns = ', '.join(spec['columns'])
+        if attached:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} ({spec['ddl']})")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS archive.idx_{table}_archive ON {table} {spec['index']}")
+            select = (f'SELECT {columns} FROM main.{table} '
+                      f'UNION ALL SELECT {columns} FROM archive.{table}')
+        else:
+            select = f'SELECT {columns} FROM main.{table}'
+        conn.execute(f'CREATE TEMP VIEW IF NOT EXISTS all_{table} AS {select}')
+
+
+def source(cursor, table, start=None):
+    """返回查询 table 时应使用的表名
+
+    start 为查询范围的起始时间（None 表示不限），范围涉及归档数据时返回合并视图。
+    """
+    try:
+        row = cursor.execute('SELECT newest FROM archive.archive_state WHERE table_name = ?',
+                             (table,)).fetchone()
+    except sqlite3.OperationalError:
+        # 没有附加归档库
+        return table
+    if row is None or row[0] is None:
+        return table
+    if start is None or str(start)[:19] <= row[0][:19]:
+        return f'all_{table}'
+    return table
+
+
+def delete_rows(cursor, column, ids):
+    """删除归档库中 column 属于 ids 的行
+
+    外键不能跨库级联，彻底删除项目（column='project_id'）时调用。
+    """
+    if not ids or not is_attached(cursor.connection):
+        return
+    placeholders = ','.join('?' * len(ids))
+    for table, spec in TABLES.items():
+        if column in spec['columns']:
+            cursor.execute(f'DELETE FROM archive.{table} WHERE {column} IN ({placeholders})', list(ids))
+
+
+def renumber_project(cursor, old_id, new_id):
+    """项目改编号时同步归档库中的 project_id"""
+    if not is_attached(cursor.connection):
+        return
+    for table, spec in TABLES.items():
+        if 'project_id' in spec['columns']:
+            cursor.execute(f'UPDATE archive.{table} SET project_id = ? WHERE project_id = ?',
+                           (new_id, old_id))
+
+
+# 各表需要归档的行：早于截止时间，或属于很久以前完成的项目（只归档已结束的任务）
+_OLD_PROJECT = '''project_id IN (
+    SELECT id FROM main.projects WHERE is_active = 0 AND last_updated < :completed_before
+)'''
+CONDITIONS = {
+    'tasks': f'completed != 0 AND (start_time < :before OR {_OLD_PROJECT})',
+    'project_history': f'change_time < :before OR {_OLD_PROJECT}',
+    'daily_reports': 'report_date < :before_date'
+}
+
+
+def run(db, before=None, completed_before=None):
+    """把需要归档的数据移到归档库，返回各表移动的行数
+
+    插入归档库和从主库删除在同一事务中完成。归档后主库的空闲页由维护任务回收。
+    """
+    now = datetime.now()
+    before = before or now - timedelta(days=ARCHIVE_AFTER_DAYS)
+    completed_before = completed_before or now - timedelta(days=ARCHIVE_COMPLETED_DAYS)
+    params = {
+        'before': before,
+        'before_date': before.date() if isinstance(before, datetime) else before,
+        'completed_before': completed_before
+    }
+
+    conn = db.conn
+    cursor = db.cursor
+    if not is_attached(conn):
+        raise RuntimeError('没有可用的归档库，请设置 DATABASE_ARCHIVE_PATH')
+
+    moved = {}
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        for table, condition in CONDITIONS.items():
+            spec = TABLES[table]
+            columns = ', '.join(spec['columns'])
+            newest = cursor.execute(
+                f"SELECT MAX({spec['time_column']}) FROM main.{table} WHERE {condition}", params
+            ).fetchone()[0]
+            if newest is None:
+                moved[table] = 0
+                continue
+            cursor.execute(f'''
+                INSERT INTO archive.{table} ({columns})
+                SELECT {columns} FROM main.{table} WHERE {condition}
+            ''', params)
+            moved[table] = cursor.execute(f'DELETE FROM main.{table} WHERE {condition}', params).rowcount
+            cursor.execute('''
+                INSERT INTO archive.archive_state (table_name, newest, row_count, archived_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(table_name) DO UPDATE SET
+                    newest = MAX(COALESCE(newest, ''), excluded.newest),
+                    row_count = row_count + excluded.row_count,
+                    archived_at = excluded.archived_at
+            ''', (table, str(newest), moved[table], now))
+        conn.commit()
+    except Exception as e:
+        logger.exception("归档数据时出错：%s", e)
+        conn.rollback()
+        raise
+
+    logger.info("归档完成：%s", moved)
+    return moved
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='把旧数据移到归档库')
+    parser.add_argument('--before', help='归档该日期（YYYY-MM-DD）之前的数据，默认为 ARCHIVE_AFTER_DAYS 天前')
+    parser.add_argument('--completed-days', type=int, default=ARCHIVE_COMPLETED_DAYS,
+                        help='归档完成超过该天数的项目的历史和任务')
+    args = parser.parse_args(argv)
+
+    from config.logging_config import setup_logging
+    from models import Database
+
+    setup_logging()
+    before = datetime.strptime(args.before, '%Y-%m-%d') if args.before else None
+    moved = run(Database(), before, datetime.now() - timedelta(days=args.completed_days))
+    for table, count in moved.items():
+        print(f'{table:16s} {count:8d}')
+
+    if any(moved.values()):
+        # 大量删除后更新统计信息并回收空闲页
+        import maintenance
+        maintenance.refresh_after_bulk_change('archive')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""静态资源构建与发布
+
+构建：python assets.py
+    将 static 下的 CSS/JS 压缩后以内容哈希命名写入 static/dist，
+    同时生成 .gz（安装了 brotli 时还有 .br）预压缩文件和 manifest.json。
+
+模板中使用 asset_url('css/index.css') 引用资源：有构建结果时指向
+/assets/<带哈希的文件名>，响应带一年的 immutable 缓存头；
+没有构建结果、调试模式下，或源文件在构建之后被修改过（与 manifest 中记录的
+源文件哈希不一致）时直接使用 static 下的源文件，不会发布过期的构建结果。
+构建后需重启服务才会加载新的 manifest。
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# 带哈希的文件内容不会变化，可以长期缓存
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_IDENTIFIER = re.compile(r'[\w$\u0080-\uffff]')
+_REGEX_KEYWORDS = re.compile(r'(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|delete|throw)$')
+# 这些字符之后或之前的换行可以安全去掉，不影响自动分号插入
+_JOIN_AFTER = set(';{,([=:?&|')
+_JOIN_BEFORE = set(')]},.;:?')
+
+
+def _scan_string(source, start):
+    """返回以 source[start] 开头的字符串字面量结束后的位置"""
+    quote = source[start]
+    i = start + 1
+    n = len(source)
+    while i < n:
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == quote:
+            return i + 1
+        if quote == '`' and source.startswith('${', i):
+            i = _scan_template_expression(source, i + 2)
+            continue
+        i += 1
+    return n
+
+
+def _scan_template_expression(source, start):
+    """跳过模板字符串中的 ${...}，返回右括号之后的位置"""
+    depth = 1
+    i = start
+    n = len(source)
+    while i < n:
+        c = source[i]
+        if c in '\'"`':
+            i = _scan_string(source, i)
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return n
+
+
+def _scan_regex(source, start):
+    i = start + 1
+    n = len(source)
+    in_class = False
+    while i < n:
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '\n':
+            break
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < n and _IDENTIFIER.match(source[i]):
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def minify_js(source):
+    """保守的 JS 压缩：去掉注释、缩进和多余空白，保留影响自动分号插入的换行"""
+    out = []
+    last = ''
+    pending = None
+    i = 0
+    n = len(source)
+    while i < n:
+        c = source[i]
+        if c in ' \t\r\n':
+            j = i
+            while j < n and source[j] in ' \t\r\n':
+                j += 1
+            if pending != '\n':
+                pending = '\n' if '\n' in source[i:j] else ' '
+            i = j
+            continue
+        if source.startswith('//', i):
+            j = source.find('\n', i)
+            i = n if j == -1 else j
+            continue
+        if source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            j = n if j == -1 else j + 2
+            if pending != '\n':
+                pending = '\n' if '\n' in source[i:j] else ' '
+            i = j
+            continue
+
+        if pending and out:
+            if pending == '\n' and last not in _JOIN_AFTER and c not in _JOIN_BEFORE:
+                out.append('\n')
+            elif (_IDENTIFIER.match(last) and _IDENTIFIER.match(c)) or (last in '+-' and c == last):
+                out.append(' ')
+        pending = None
+
+        if c in '\'"`':
+            j = _scan_string(source, i)
+        elif c == '/' and (not last or last in '(,=:[!&|?{};+-*%<>~^\n'
+                           or _REGEX_KEYWORDS.search(''.join(out[-8:]))):
+            j = _scan_regex(source, i)
+        else:
+            j = i + 1
+        out.append(source[i:j])
+        last = source[j - 1]
+        i = j
+    return ''.join(out) + '\n'
+
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|(/\*.*?\*/)|(\s+)', re.S)
+
+
+def minify_css(source):
+    """去掉 CSS 注释和多余空白"""
+    def replace(match):
+        if match.group(1):
+            return match.group(1)
+        return '' if match.group(2) else ' '
+
+    css = _CSS_TOKENS.sub(replace, source)
+    # 字符串以外的 {};,> 两侧空白和冒号后的空白都可以去掉
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', css)
+    for index in range(0, len(parts), 2):
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', parts[index])
+        parts[index] = part.replace(': ', ':').replace(';}', '}')
+    return ''.join(parts).strip() + '\n'
+
+
+def _source_files():
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != DIST_DIR]
+        for name in sorted(files):
+            if name.endswith(('.css', '.js')):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, STATIC_DIR).replace(os.sep, '/'), path
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build():
+    """构建所有静态资源，返回 manifest 和大小统计"""
+    os.makedirs(DIST_DIR, exist_ok=True)
+    manifest = {}
+    sizes = {}
+    for relative, path in _source_files():
+        with open(path, 'rb') as f:
+            raw = f.read()
+        source = raw.decode('utf-8')
+        minified = (minify_css(source) if relative.endswith('.css') else minify_js(source)).encode('utf-8')
+        digest = hashlib.sha256(minified).hexdigest()[:10]
+        base, ext = os.path.splitext(relative)
+        name = f"{base.replace('/', '.')}.{digest}{ext}"
+
+        output = os.path.join(DIST_DIR, name)
+        _write(output, minified)
+        _write(output + '.gz', gzip.compress(minified, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _write(output + '.br', brotli.compress(minified))
+
+        # 记录源文件哈希，运行时据此判断构建结果是否过期
+        manifest[relative] = {'name': name, 'source': _digest(raw)}
+        sizes[relative] = (len(source.encode('utf-8')), len(minified),
+                           os.path.getsize(output + '.gz'))
+
+    # 删除旧版本的构建结果
+    current = {entry['name'] for entry in manifest.values()}
+    for name in os.listdir(DIST_DIR):
+        if name != 'manifest.json' and re.sub(r'\.(gz|br)$', '', name) not in current:
+            os.remove(os.path.join(DIST_DIR, name))
+
+    with open(MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    return manifest, sizes
+
+
+class AssetManifest:
+    """读取构建结果，将源文件路径映射为带哈希的地址"""
+
+    def __init__(self, path=MANIFEST_PATH, static_dir=STATIC_DIR):
+        self.path = path
+        self.static_dir = static_dir
+        self._entries = None
+        self._checked = {}      # 源文件路径 -> (mtime, 构建结果是否仍然有效)
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def built_name(self, filename):
+        """返回 filename 对应的构建文件名，没有构建结果或源文件已修改时返回 None
+
+        只在源文件的修改时间变化时重新计算哈希。
+        """
+        entry = self.entries.get(filename)
+        if not isinstance(entry, dict):
+            # 没有构建结果，或旧格式的 manifest 无法判断是否过期
+            return None
+        try:
+            mtime = os.stat(os.path.join(self.static_dir, filename)).st_mtime_ns
+        except OSError:
+            return entry['name']
+        checked = self._checked.get(filename)
+        if checked is None or checked[0] != mtime:
+            with open(os.path.join(self.static_dir, filename), 'rb') as f:
+                fresh = _digest(f.read()) == entry['source']
+            if not fresh:
+                logger.warning("%s 在构建之后已修改，使用源文件，请重新运行 python assets.py", filename)
+            checked = self._checked[filename] = (mtime, fresh)
+        return entry['name'] if checked[1] else None
+
+    def url(self, filename, debug=False):
+        name = None if debug else self.built_name(filename)
+        if name is None:
+            return url_for('static', filename=filename)
+        return url_for('asset', filename=name)
+
+
+def serve_asset(filename):
+    """发送构建后的资源，客户端支持时直接返回预压缩的文件"""
+    accept = request.accept_encodings
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accept[encoding] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            response = send_from_directory(DIST_DIR, filename + suffix, max_age=IMMUTABLE_MAX_AGE)
+            response.mimetype = 'text/css' if filename.endswith('.css') else 'text/javascript'
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(DIST_DIR, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.charset = 'utf-8'
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    manifest = AssetManifest()
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.jinja_env.globals['asset_url'] = lambda filename: manifest.url(filename, debug=app.debug)
+    return manifest
+
+
+if __name__ == '__main__':
+    manifest, sizes = build()
+    total = [0, 0, 0]
+    for relative, (source_size, minified_size, gzip_size) in sorted(sizes.items()):
+        print(f"{relative:24s} {source_size:8d} -> {minified_size:8d}  gzip {gzip_size:7d}  {manifest[relative]['name']}")
+        total = [a + b for a, b in zip(total, (source_size, minified_size, gzip_size))]
+    print(f"{'合计':22s} {total[0]:8d} -> {total[1]:8d}  gzip {total[2]:7d}")
@@ -0,0 +1,297 @@
+"""在线热备份与恢复
+
+使用 SQLite 的在线备份接口（sqlite3.Connection.backup）复制数据库，服务无需停止。
+每次只复制 BACKUP_PAGES_PER_STEP 页，步与步之间休眠 BACKUP_STEP_SLEEP 秒，
+备份期间其他连接照常读写，不会长时间持有锁。
+其他连接写入源库后分步备份会从头开始，写入持续不断时可能一直完成不了：
+重新开始超过 BACKUP_MAX_RESTARTS 次后改为一步复制整个库（期间写入需要等待）。
+
+每个备份先写入临时文件，通过 PRAGMA integrity_check 后再改为正式文件名；
+附加了归档库时同时备份归档库。备份按时间命名，只保留最近 BACKUP_KEEP 份。
+
+用法：
+    python backup.py create                 # 立即备份
+    python backup.py list
+    python backup.py verify <备份文件>
+    python backup.py restore <备份文件>     # 恢复前先备份当前数据库
+"""
+import argparse
+from datetime import datetime
+import logging
+import os
+import sqlite3
+import threading
+import time
+from urllib.request import pathname2url
+
+from config import database_config
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIR = os.environ.get('BACKUP_DIR', os.path.join(database_config.BASE_DIR, 'backups'))
+BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', '100'))
+BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', '0.005'))
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', '7'))
+BACKUP_MAX_RESTARTS = int(os.environ.get('BACKUP_MAX_RESTARTS', '5'))
+# 定时备份的间隔（小时），0 表示不定时备份
+BACKUP_INTERVAL_HOURS = float(os.environ.get('BACKUP_INTERVAL_HOURS', '24'))
+
+_PREFIX = 'work_management-'
+_ARCHIVE_SUFFIX = '-archive.db'
+# 多个工作进程同时运行定时备份时，只有拿到锁的进程执行
+_LOCK_NAME = '.backup.lock'
+_LOCK_STALE_SECONDS = 3600
+
+# 最近一次备份的结果，供 /metrics 使用
+last_result = {}
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _copy(source, path, name='main'):
+    """分步复制 source 中的 name 库到 path，返回复制的页数"""
+    pages = {'total': 0, 'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        # 其他连接写入源库后备份从第一页重新开始，剩余页数随之变多
+        if pages['remaining'] is not None and remaining > pages['remaining']:
+            pages['restarts'] += 1
+            if pages['restarts'] > BACKUP_MAX_RESTARTS:
+                raise _TooManyRestarts()
+        pages['remaining'] = remaining
+        pages['total'] = total
+        # 每一步之后让出时间，避免备份占满磁盘 I/O
+        time.sleep(BACKUP_STEP_SLEEP)
+
+    target = sqlite3.connect(path)
+    try:
+        try:
+            source.backup(target, pages=BACKUP_PAGES_PER_STEP, progress=progress, name=name)
+        except _TooManyRestarts:
+            logger.warning("源库持续写入，%s 库的分步备份已重新开始 %d 次，放弃分步备份，改为一步复制",
+                           name, pages['restarts'])
+            source.backup(target, name=name)
+            pages['total'] = source.execute(f'PRAGMA {name}.page_count').fetchone()[0]
+    finally:
+        target.close()
+    return pages['total']
+
+
+def _open_readonly(path):
+    return sqlite3.connect(f'file:{pathname2url(os.path.abspath(path))}?mode=ro', uri=True)
+
+
+def verify(path):
+    """对备份文件执行 integrity_check，返回 (是否通过, 检查结果)"""
+    try:
+        conn = _open_readonly(path)
+        try:
+            rows = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return False, str(e)
+    return rows == ['ok'], '\n'.join(rows)
+
+
+def _finish(partial, path):
+    ok, message = verify(partial)
+    if not ok:
+        os.remove(partial)
+        raise RuntimeError(f'备份校验失败：{message}')
+    os.replace(partial, path)
+
+
+def create_backup(directory=None, keep=BACKUP_KEEP):
+    """备份主库（以及归档库），返回备份信息"""
+    directory = directory or BACKUP_DIR
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    path = os.path.join(directory, f'{_PREFIX}{stamp}.db')
+
+    start = time.perf_counter()
+    source = database_config.connect()
+    try:
+        pages = _copy(source, path + '.partial')
+        _finish(path + '.partial', path)
+        archive_path = None
+        if any(row[1] == 'archive' for row in source.execute('PRAGMA database_list')):
+            archive_path = path[:-3] + _ARCHIVE_SUFFIX
+            pages += _copy(source, archive_path + '.partial', name='archive')
+            _finish(archive_path + '.partial', archive_path)
+    finally:
+        source.close()
+
+    result = {
+        'path': path,
+        'archive_path': archive_path,
+        'pages': pages,
+        'bytes': os.path.getsize(path),
+        'seconds': round(time.perf_counter() - start, 3),
+        'finished_at': time.time()
+    }
+    last_result.clear()
+    last_result.update(result)
+    logger.info("数据库备份完成：%s，%d 页，%.1fs", path, pages, result['seconds'])
+    rotate(directory, keep)
+    return result
+
+
+def list_backups(directory=None):
+    """返回主库备份文件路径，按时间从旧到新"""
+    directory = directory or BACKUP_DIR
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory)
+                   if name.startswith(_PREFIX) and name.endswith('.db') and not name.endswith(_ARCHIVE_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+def rotate(directory=None, keep=BACKUP_KEEP):
+    """只保留最近 keep 份备份（keep 不大于 0 时不删除），返回删除的文件"""
+    removed = []
+    for path in list_backups(directory)[:-keep] if keep > 0 else []:
+        for file in (path, path[:-3] + _ARCHIVE_SUFFIX):
+            if os.path.exists(file):
+                os.remove(file)
+                removed.append(file)
+    return removed
+
+
+def restore(path):
+    """用备份覆盖当前数据库，恢复前先备份当前数据库
+
+    恢复通过备份接口一次写入，其他进程的连接在下一次查询时看到恢复后的数据。
+    """
+    ok, message = verify(path)
+    if not ok:
+        raise RuntimeError(f'备份文件校验失败，未恢复：{message}')
+    archive_path = path[:-3] + _ARCHIVE_SUFFIX
+    if os.path.exists(archive_path):
+        ok, message = verify(archive_path)
+        if not ok:
+            raise RuntimeError(f'归档库备份校验失败，未恢复：{message}')
+
+    safety = create_backup(keep=0)
+    logger.info("恢复前已备份当前数据库：%s", safety['path'])
+
+    targets = [(path, database_config.target())]
+    if os.path.exists(archive_path) and database_config.archive_target() is not None:
+        targets.append((archive_path, database_config.archive_target()))
+    for backup_path, (database, uri) in targets:
+        source = _open_readonly(backup_path)
+        target = sqlite3.connect(database, uri=uri)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    logger.info("已从 %s 恢复数据库", path)
+    return safety['path']
+
+
+class _DirectoryLock:
+    """用独占创建的文件作为跨进程锁，超过一小时的锁视为进程异常退出后残留"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, _LOCK_NAME)
+        self.acquired = False
+
+    def __enter__(self):
+        try:
+            if time.time() - os.path.getmtime(self.path) > _LOCK_STALE_SECONDS:
+                os.remove(self.path)
+        except OSError:
+            pass
+        try:
+            os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            self.acquired = True
+        except FileExistsError:
+            self.acquired = False
+        return self
+
+    def __exit__(self, *exc):
+        if self.acquired:
+            os.remove(self.path)
+
+
+class BackupScheduler:
+    """定时备份线程，最近一份备份超过间隔时间后才备份，多个进程同时运行也只备份一次"""
+
+    def __init__(self, interval_hours=BACKUP_INTERVAL_HOURS, check_interval=300, directory=None):
+        self.interval = interval_hours * 3600
+        self.check_interval = check_interval
+        self.directory = directory or BACKUP_DIR
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='backup-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        """到期时备份，返回备份信息，未到期或其他进程正在备份时返回 None"""
+        if not self._due():
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        with _DirectoryLock(self.directory) as lock:
+            # 拿到锁后再检查一次，其他进程可能刚刚完成备份
+            if not lock.acquired or not self._due():
+                return None
+            return create_backup(self.directory)
+
+    def _due(self):
+        backups = list_backups(self.directory)
+        return not backups or time.time() - os.path.getmtime(backups[-1]) >= self.interval
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("定时备份失败：%s", e)
+            self._stop_event.wait(self.check_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='数据库在线备份与恢复')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('create', help='立即备份')
+    subparsers.add_parser('list', help='列出备份')
+    verify_parser = subparsers.add_parser('verify', help='校验备份文件')
+    verify_parser.add_argument('path')
+    restore_parser = subparsers.add_parser('restore', help='从备份恢复')
+    restore_parser.add_argument('path')
+    args = parser.parse_args(argv)
+
+    from config.logging_config import setup_logging
+    setup_logging()
+
+    if args.command == 'create':
+        result = create_backup()
+        print(f"{result['path']}  {result['bytes']} 字节  {result['seconds']}s")
+    elif args.command == 'list':
+        for path in list_backups():
+            print(f'{path}  {os.path.getsize(path)} 字节')
+    elif args.command == 'verify':
+        ok, message = verify(args.path)
+        print(message)
+        return 0 if ok else 1
+    elif args.command == 'restore':
+        safety = restore(args.path)
+        print(f'已恢复，恢复前的数据库已备份到 {safety}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,329 @@
+"""性能基准测试
+
+在临时目录（或 --memory 时的内存数据库）中生成指定规模的模拟数据，对 WorkManager 和 Flask 测试客户端
+执行计时场景，结果写入 JSON 文件，便于不同提交之间对比。
+
+用法：
+    python benchmark.py --projects 500 --users 20 --years 2 --output bench.json
+    python benchmark.py --memory --projects 100 --repeat 5
+    python benchmark.py --during-backup --output bench-backup.json   # 测量备份期间的延迟
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import threading
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BENCH_PASSWORD = 'bench-password'
+
+STAGES = ['当前方案支撑', '现场察', '客户沟通', 'IP规划及方案确认', '设备安装', '设备调测',
+          '业务联调', '验收', '项目结款', '尾款结算', '日常维护', '故障处理', '退网清算']
+STATES = ['active', 'active', 'recent_inactive', 'long_inactive', 'completed']
+DEVICE_TYPES = ['分流设备', '光旁路保护设备', '数通设备', '电源设备']
+CHANGE_TYPES = ['stage_change', 'status_change', 'maintenance', 'issue', 'state_change']
+
+
+def generate_database(db, scale, seed):
+    """向 db（已建表的 Database）写入模拟数据，返回各表行数"""
+    from config.district_config import get_grouped_districts
+
+    rng = random.Random(seed)
+    areas = [district for group in get_grouped_districts().values() for district in group]
+    now = datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=int(365 * scale['years']))
+    total_seconds = int((now - start).total_seconds())
+
+    def random_time():
+        return (start + timedelta(seconds=rng.randrange(total_seconds))).strftime('%Y-%m-%d %H:%M:%S')
+
+    cursor = db.cursor
+    # bcrypt 计算较慢，所有模拟用户共用同一个密码哈希
+    password_hash = db.hash_password(BENCH_PASSWORD)
+    cursor.executemany('''
+        INSERT INTO users (username, password, role) VALUES (?, ?, ?)
+    ''', [(f'bench_user_{i}', password_hash, 'admin' if i == 0 else 'user')
+          for i in range(scale['users'])])
+    user_ids = [row[0] for row in cursor.execute(
+        "SELECT id FROM users WHERE username LIKE 'bench_user_%' ORDER BY id").fetchall()]
+
+    projects = []
+    for project_id in range(1, scale['projects'] + 1):
+        created_at = random_time()
+        state = rng.choice(STATES)
+        projects.append((
+            project_id, f'模拟客户{project_id:05d}', rng.choice(STAGES), f'模拟状态说明 {project_id}',
+            created_at, max(created_at, random_time()), '', state, 0 if state == 'completed' else 1,
+            rng.choice(areas), f'经理{project_id % 97}', f'138{project_id:08d}'
+        ))
+    cursor.executemany('''
+        INSERT INTO projects (id, client_name, stage, status, created_at, last_updated,
+                              notes, state, is_active, area, manager, manager_phone)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', projects)
+    project_ids = [project[0] for project in projects]
+
+    history = []
+    for project_id in project_ids:
+        for _ in range(scale['history_per_project']):
+            change_type = rng.choice(CHANGE_TYPES)
+            history.append((project_id, change_type, random_time(), '旧值', '新值', f'模拟{change_type}记录'))
+    cursor.executemany('''
+        INSERT INTO project_history (project_id, change_type, change_time, old_value, new_value, description)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', history)
+
+    devices = []
+    for project_id in project_ids:
+        for index in range(scale['devices_per_project']):
+            device_type = rng.choice(DEVICE_TYPES)
+            devices.append((project_id, device_type, f'{device_type}{index + 1}', f'MODEL-{rng.randrange(100)}',
+                            rng.randrange(8), rng.randrange(8), rng.randrange(8), rng.randrange(16)))
+    cursor.executemany('''
+        INSERT INTO devices (project_id, device_type, device_name, model,
+                             mec_10g, ge_optical, electrical, card_quantity)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', devices)
+
+    cursor.executemany('INSERT INTO user_projects (user_id, project_id) VALUES (?, ?)',
+                       [(user_id, project_id) for user_id in user_ids
+                        for project_id in rng.sample(project_ids, min(len(project_ids), 20))])
+
+    # 每个用户每天若干任务，并生成对应的日报
+    task_count = report_count = 0
+    day = start.date()
+    while day <= now.date():
+        tasks = []
+        reports = []
+        for user_id in user_ids:
+            lines = []
+            for index in range(scale['tasks_per_day']):
+                begin = datetime(day.year, day.month, day.day, 8) + timedelta(minutes=rng.randrange(600))
+                completed = rng.choice([0, 1, 1, 1, 2]) if day < now.date() else rng.choice([0, 1])
+                project_id = rng.choice(project_ids + [None])
+                content = f'模拟任务 {day} #{index + 1}'
+                tasks.append((project_id, content, rng.randrange(1, 6), begin.strftime('%Y-%m-%d %H:%M:%S'),
+                              completed, '完成' if completed == 1 else None, user_id))
+                lines.append(f'{index + 1}. {content}')
+            if lines:
+                reports.append((day.isoformat(), '\n'.join(lines), user_id))
+        cursor.executemany('''
+            INSERT INTO tasks (project_id, content, priority, start_time, completed, completion_note, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', tasks)
+        cursor.executemany('''
+            INSERT INTO daily_reports (report_date, content, user_id) VALUES (?, ?, ?)
+        ''', reports)
+        task_count += len(tasks)
+        report_count += len(reports)
+        day += timedelta(days=1)
+
+    db.conn.commit()
+    cursor.execute('ANALYZE')
+    return {
+        'users': len(user_ids),
+        'projects': len(projects),
+        'project_history': len(history),
+        'devices': len(devices),
+        'tasks': task_count,
+        'daily_reports': report_count
+    }
+
+
+def time_scenario(func, repeat, warmup=1):
+    """执行 func 若干次，返回耗时统计（毫秒）"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'runs': repeat,
+        'min_ms': round(samples[0], 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))], 3),
+        'p99_ms': round(samples[min(len(samples) - 1, int(round(0.99 * (len(samples) - 1))))], 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'max_ms': round(samples[-1], 3)
+    }
+
+
+def build_scenarios(app, manager, user_id, project_id):
+    """返回 (名称, 函数) 列表，测试客户端请求非 200 时抛出异常"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = 'bench_user_0'
+        session['role'] = 'admin'
+    login_client = app.test_client()
+
+    today = datetime.now()
+    last_month = today.replace(day=1) - timedelta(days=1)
+    date_str = today.strftime('%Y-%m-%d')
+
+    def get(path, test_client=client):
+        def run():
+            response = test_client.get(path)
+            if response.status_code != 200:
+                raise RuntimeError(f'{path} 返回 {response.status_code}')
+            response.get_data()
+        return run
+
+    def login():
+        response = login_client.post('/login', data={'username': 'bench_user_0', 'password': BENCH_PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f'/login 返回 {response.status_code}')
+
+    return [
+        ('manager.get_projects_by_activity', manager.get_projects_by_activity),
+        ('manager.get_project_statistics', manager.get_project_statistics),
+        ('manager.get_project_history', lambda: manager.get_project_history(project_id=project_id)),
+        ('manager.get_daily_report', lambda: manager.get_daily_report(date_str, user_id)),
+        ('manager.generate_monthly_report',
+         lambda: manager.generate_monthly_report(last_month.year, last_month.month, user_id)),
+        ('manager.query_tasks', lambda: manager.query_tasks(user_id, limit=50)),
+        ('manager.check_permission', lambda: manager.check_permission(user_id, 'reports', 'view')),
+        ('http.index', get('/')),
+        ('http.api_dashboard', get('/api/dashboard')),
+        ('http.project_history', get(f'/project_history?project_id={project_id}')),
+        ('http.get_daily_report', get(f'/get_daily_report/{date_str}')),
+        ('http.export_monthly_report', get(f'/export_monthly_report/{last_month.year}/{last_month.month}')),
+        ('http.export_daily_report_word', get(f'/export_daily_report_word/{date_str}')),
+        ('http.export_project_record', get(f'/export_project_record/{project_id}')),
+        ('http.user_management', get('/user_management')),
+        ('http.login', login)
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='生成模拟数据库并运行性能基准测试')
+    parser.add_argument('--projects', type=int, default=300, help='项目数量')
+    parser.add_argument('--users', type=int, default=10, help='用户数量')
+    parser.add_argument('--years', type=float, default=1, help='任务和日报覆盖的年数')
+    parser.add_argument('--tasks-per-day', type=int, default=5, help='每个用户每天的任务数')
+    parser.add_argument('--history-per-project', type=int, default=20, help='每个项目的历史记录数')
+    parser.add_argument('--devices-per-project', type=int, default=3, help='每个项目的设备数')
+    parser.add_argument('--repeat', type=int, default=20, help='每个场景的执行次数')
+    parser.add_argument('--seed', type=int, default=42, help='随机数种子')
+    parser.add_argument('--only', action='append', default=[], help='只运行名称包含该字符串的场景，可重复')
+    parser.add_argument('--output', default='benchmark_results.json', help='结果文件路径')
+    parser.add_argument('--keep-db', action='store_true', help='保留生成的临时数据库')
+    parser.add_argument('--memory', action='store_true', help='使用内存数据库，排除磁盘 I/O 的影响')
+    parser.add_argument('--during-backup', action='store_true',
+                        help='计时期间在后台连续执行在线备份，与不加该参数的结果对比可得备份对延迟的影响')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output)
+    scale = {
+        'projects': args.projects,
+        'users': args.users,
+        'years': args.years,
+        'tasks_per_day': args.tasks_per_day,
+        'history_per_project': args.history_per_project,
+        'devices_per_project': args.devices_per_project
+    }
+
+    # 基准测试只输出告警以上的日志，避免日志 I/O 影响计时
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    sys.path.insert(0, REPO_DIR)
+
+    work_dir = tempfile.mkdtemp(prefix='wm-bench-')
+    # 使用临时数据库，不写入真实数据库；--memory 时使用进程内的共享内存数据库
+    if args.memory:
+        os.environ['DATABASE_MEMORY'] = f'wm-bench-{os.getpid()}'
+    else:
+        os.environ['DATABASE_PATH'] = os.path.join(work_dir, 'work_management.db')
+    try:
+        from models import Database
+
+        db = Database()
+        start = time.perf_counter()
+        row_counts = generate_database(db, scale, args.seed)
+        generate_seconds = time.perf_counter() - start
+        print(f'模拟数据生成完成（{generate_seconds:.1f}s）：{row_counts}')
+
+        from app import create_app, manager
+
+        app = create_app()
+
+        user_id = db.cursor.execute("SELECT id FROM users WHERE username = 'bench_user_0'").fetchone()[0]
+        project_id = db.cursor.execute(
+            "SELECT id FROM projects WHERE is_active = 1 ORDER BY id LIMIT 1").fetchone()[0]
+
+        backup_runs = []
+        stop_backup = threading.Event()
+        if args.during_backup:
+            import backup
+
+            def backup_loop():
+                while not stop_backup.is_set():
+                    backup_runs.append(backup.create_backup(os.path.join(work_dir, 'backups'), keep=1)['seconds'])
+
+            backup_thread = threading.Thread(target=backup_loop, daemon=True)
+            backup_thread.start()
+
+        results = {}
+        for name, func in build_scenarios(app, manager, user_id, project_id):
+            if args.only and not any(pattern in name for pattern in args.only):
+                continue
+            results[name] = time_scenario(func, args.repeat)
+            print(f"{name:40s} median {results[name]['median_ms']:9.3f} ms  "
+                  f"p95 {results[name]['p95_ms']:9.3f} ms  p99 {results[name]['p99_ms']:9.3f} ms")
+
+        if args.during_backup:
+            stop_backup.set()
+            backup_thread.join()
+            print(f'计时期间完成 {len(backup_runs)} 次备份')
+
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': __import__('sqlite3').sqlite_version,
+            'platform': platform.platform(),
+            'scale': scale,
+            'seed': args.seed,
+            'rows': row_counts,
+            'generate_seconds': round(generate_seconds, 3),
+            'database': 'memory' if args.memory else 'file',
+            'during_backup': args.during_backup,
+            'backup_seconds': backup_runs,
+            'database_bytes': db.cursor.execute('PRAGMA page_count').fetchone()[0]
+                              * db.cursor.execute('PRAGMA page_size').fetchone()[0],
+            'results': results
+        }
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'结果已写入 {output}')
+    finally:
+        if args.keep_db and not args.memory:
+            print(f'数据库保留在 {work_dir}')
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,10 @@
 from models import Database
+from config import database_config
 
 def check_projects():
     """检查数据库中的项目数据"""
     db = Database()
+    print(f"数据库：{database_config.describe()}")
     
     print("\n检查项目表...")
     projects = db.cursor.execute('''
@@ -0,0 +1,80 @@
+"""响应压缩和条件请求
+
+对 HTML、JSON 等文本响应：
+- GET 请求计算弱 ETag，内容未变化时返回 304；
+- 超过阈值时按 Accept-Encoding 使用 brotli（已安装时）或 gzip 压缩。
+
+流式响应（SSE、send_file 导出的文件）和已经压缩过的响应会自动跳过。
+"""
+import gzip
+import hashlib
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖
+    brotli = None
+
+# 小于该字节数的响应不压缩
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+# 动态内容使用中等压缩级别，兼顾速度
+BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/plain', 'text/css', 'text/javascript',
+    'application/json', 'application/javascript'
+}
+
+
+def _is_buffered(response):
+    """只处理内容已完整生成的响应"""
+    return not (response.direct_passthrough or response.is_streamed)
+
+
+def _add_etag(response):
+    if response.get_etag()[0] is None:
+        body = response.get_data()
+        response.set_etag(hashlib.sha1(body).hexdigest()[:20], weak=True)
+    if not response.cache_control.no_store and response.cache_control.max_age is None:
+        # 页面与登录用户相关，只允许浏览器缓存，每次使用前向服务器验证
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def _compress(response):
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        response.content_encoding = 'br'
+    elif accept['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        response.content_encoding = 'gzip'
+    return response
+
+
+def process_response(response):
+    if response.mimetype not in COMPRESSIBLE_TYPES or not _is_buffered(response):
+        return response
+    if response.content_encoding:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if request.method in ('GET', 'HEAD') and response.status_code == 200:
+        response = _add_etag(response)
+        if response.status_code == 304:
+            return response
+
+    if response.status_code == 200 and request.method != 'HEAD':
+        response = _compress(response)
+    return response
+
+
+def init_app(app):
+    app.after_request(process_response)
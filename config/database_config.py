@@ -0,0 +1,112 @@
+import os
+import re
+import sqlite3
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 数据库配置，可由环境变量或 create_app(config) 覆盖
+# DATABASE_PATH：数据库文件路径，默认为项目目录下的 work_management.db（不再依赖当前工作目录）
+# DATABASE_URI：SQLite URI，例如 file:/data/work.db?mode=rw，优先于 DATABASE_PATH
+# DATABASE_MEMORY：内存数据库名称，同一进程内的连接共享该库，用于测试和基准测试
+#   共享缓存的锁冲突不等待 busy_timeout，多线程并发写入时会直接报 database table is locked
+# DATABASE_PRAGMAS：每个连接执行的 PRAGMA，例如 journal_mode=WAL;synchronous=NORMAL
+# DATABASE_ARCHIVE_PATH：归档库文件路径，默认与数据库同目录的 <文件名>_archive.db，
+#   每个连接以 archive 为名附加该库（见 archive.py）；使用 DATABASE_URI 时需单独指定
+DEFAULTS = {
+    'DATABASE_PATH': os.path.join(BASE_DIR, 'work_management.db'),
+    'DATABASE_URI': None,
+    'DATABASE_MEMORY': None,
+    'DATABASE_PRAGMAS': '',
+    'DATABASE_ARCHIVE_PATH': None
+}
+
+settings = {key: os.environ.get(key) or default for key, default in DEFAULTS.items()}
+
+_PRAGMA = re.compile(r'^\s*([a-z_]+)\s*=\s*([\w.-]+)\s*$', re.I)
+_lock = threading.Lock()
+# 内存数据库在最后一个连接关闭时销毁，保留一个连接使其在进程内一直存在
+_memory_keeper = None
+
+
+def configure(config):
+    """用 config 中的 DATABASE_* 项更新配置，已打开的连接会在下次使用时按新配置重建"""
+    global _memory_keeper
+    changed = False
+    with _lock:
+        for key in DEFAULTS:
+            if key in config and config[key] != settings[key]:
+                settings[key] = config[key]
+                changed = True
+        if changed:
+            _memory_keeper = None
+    if changed:
+        from models import Database
+        Database.reset_connections()
+        if Database._instance is not None:
+            # 已经使用过数据库时，在新的位置上建表
+            Database()
+
+
+def parse_pragmas(text):
+    """解析 "name=value;name=value"，只接受简单的名称和值"""
+    pragmas = []
+    for item in (text or '').split(';'):
+        if not item.strip():
+            continue
+        match = _PRAGMA.match(item)
+        if not match:
+            raise ValueError(f'PRAGMA 配置格式错误：{item}')
+        pragmas.append((match.group(1), match.group(2)))
+    return pragmas
+
+
+def target():
+    """返回 (database, uri) 作为 sqlite3.connect 的参数"""
+    if settings['DATABASE_MEMORY']:
+        return f"file:{settings['DATABASE_MEMORY']}?mode=memory&cache=shared", True
+    if settings['DATABASE_URI']:
+        return settings['DATABASE_URI'], True
+    return settings['DATABASE_PATH'], False
+
+
+def archive_target():
+    """返回归档库的 (database, uri)，没有可用的归档库时返回 None"""
+    if settings['DATABASE_MEMORY']:
+        return f"file:{settings['DATABASE_MEMORY']}-archive?mode=memory&cache=shared", True
+    if settings['DATABASE_ARCHIVE_PATH']:
+        return settings['DATABASE_ARCHIVE_PATH'], False
+    if settings['DATABASE_URI']:
+        return None
+    return os.path.splitext(settings['DATABASE_PATH'])[0] + '_archive.db', False
+
+
+def _attach_archive(conn):
+    target = archive_target()
+    if target is not None:
+        conn.execute('ATTACH DATABASE ? AS archive', (target[0],))
+
+
+def describe():
+    """当前使用的数据库，用于日志和脚本输出"""
+    return target()[0]
+
+
+def connect(factory=sqlite3.Connection):
+    """按当前配置打开一个连接并执行 PRAGMA"""
+    global _memory_keeper
+    database, uri = target()
+    pragmas = parse_pragmas(settings['DATABASE_PRAGMAS'])
+    conn = sqlite3.connect(database, uri=uri, check_same_thread=False, factory=factory)
+    # SQLite 默认不检查外键，项目的级联删除和改编号依赖该设置
+    conn.execute('PRAGMA foreign_keys = ON')
+    for name, value in pragmas:
+        conn.execute(f'PRAGMA {name}={value}')
+    _attach_archive(conn)
+
+    if settings['DATABASE_MEMORY']:
+        with _lock:
+            if _memory_keeper is None:
+                _memory_keeper = sqlite3.connect(database, uri=True, check_same_thread=False)
+                _attach_archive(_memory_keeper)
+    return conn
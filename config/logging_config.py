@@ -0,0 +1,101 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from datetime import datetime
+
+# 日志级别，生产环境默认 INFO，逐行调试日志使用 DEBUG
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# 日志格式：json 或 text
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+# 逐行调试日志的采样间隔：每 N 条只输出 1 条
+LOG_ROW_SAMPLE_EVERY = int(os.environ.get('LOG_ROW_SAMPLE_EVERY', '50'))
+
+_listener = None
+_log_queue = None
+_output = None
+_setup_lock = threading.Lock()
+
+# LogRecord 的标准属性，其余属性视为 extra 字段
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行 JSON，extra 字段一并输出"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RowSampleFilter(logging.Filter):
+    """对带 sample=True 标记的逐行日志采样，每 every 条保留 1 条"""
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = max(1, every)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if not getattr(record, 'sample', False):
+            return True
+        with self._lock:
+            self._count += 1
+            return self._count % self.every == 1 or self.every == 1
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, sample_every=LOG_ROW_SAMPLE_EVERY):
+    """配置根日志
+
+    请求线程只把日志记录放入队列，由后台监听线程负责格式化和写出，
+    控制台 I/O 不再阻塞请求。重复调用不会重复添加处理器。
+    """
+    global _listener, _log_queue, _output
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        _output = output = logging.StreamHandler()
+        if fmt == 'json':
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+            ))
+
+        _log_queue = log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(RowSampleFilter(sample_every))
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def restart_after_fork():
+    """fork 出的子进程中没有监听线程，重新启动一个消费同一队列的监听线程"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener = logging.handlers.QueueListener(_log_queue, _output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
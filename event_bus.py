@@ -0,0 +1,110 @@
+import json
+import os
+import queue
+import threading
+import time
+
+# 每个客户端最多缓存的事件数，超出后丢弃并通知客户端整体刷新
+CLIENT_QUEUE_SIZE = 100
+# 空闲时发送心跳的间隔（秒），同时用于检测已断开的连接
+HEARTBEAT_INTERVAL = 15
+# 单个 SSE 连接的最长保持时间（秒），到期后由浏览器自动重连，避免长期占用工作线程
+STREAM_MAX_AGE = 300
+# 每个进程同时连接的客户端上限，每个连接占用一个工作线程；
+# gunicorn 下由 wsgi.start_worker 按线程数进一步收紧（见 SSE_THREAD_SHARE）
+MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', '50'))
+# gunicorn 工作进程中 SSE 连接最多占用的线程比例，其余线程留给普通请求
+SSE_THREAD_SHARE = float(os.environ.get('SSE_THREAD_SHARE', '0.25'))
+
+
+class Subscription:
+    """单个客户端的事件队列"""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # 客户端消费太慢，丢弃事件，稍后让客户端整体刷新
+            self.overflowed = True
+
+    def get(self, timeout):
+        """取下一个事件，超时返回 None"""
+        if self.overflowed:
+            self.overflowed = False
+            # 清空积压的事件，用一次整体刷新代替
+            while not self.queue.empty():
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            return {'type': 'resync', 'data': {}}
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """进程内的发布/订阅总线，用于向浏览器推送项目和任务的变更"""
+
+    def __init__(self, max_subscribers=MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, maxsize=CLIENT_QUEUE_SIZE):
+        """订阅事件，超过连接上限时返回 None"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = Subscription(maxsize)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event_type, **data):
+        """发布事件，没有订阅者时几乎没有开销"""
+        if not self._subscribers:
+            return
+        event = {'type': event_type, 'data': data}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def limit_for_threads(self, threads):
+        """按工作进程的线程数收紧连接上限，超出上限的浏览器改为轮询"""
+        self.max_subscribers = min(self.max_subscribers, max(1, int(threads * SSE_THREAD_SHARE)))
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def stream(self, subscription, heartbeat=HEARTBEAT_INTERVAL, max_age=STREAM_MAX_AGE):
+        """生成 SSE 格式的数据流，连接到期或断开时自动取消订阅"""
+        try:
+            # 告诉浏览器断开后 3 秒重连
+            yield 'retry: 3000\n\n'
+            deadline = time.monotonic() + max_age
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                event = subscription.get(timeout=min(heartbeat, remaining))
+                if event is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                payload = json.dumps(event['data'], ensure_ascii=False)
+                yield f"event: {event['type']}\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+
+event_bus = EventBus()
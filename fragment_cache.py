@@ -0,0 +1,75 @@
+"""模板缓存
+
+- Jinja 模板编译结果缓存到磁盘，进程重启后无需重新编译；
+- 片段缓存：按行缓存宏的渲染结果，参数（整行数据）不变时直接复用，
+  只有发生变化的行才重新渲染。
+"""
+from collections import OrderedDict
+import os
+import tempfile
+import threading
+
+from flask import get_template_attribute
+from jinja2 import FileSystemBytecodeCache
+
+# 模板字节码缓存目录
+JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR',
+                                 os.path.join(tempfile.gettempdir(), 'work-management-jinja'))
+# 片段缓存的最大条目数，超出后淘汰最久未使用的
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '5000'))
+
+
+class FragmentCache:
+    """按 key 缓存渲染结果，version 不同时重新渲染"""
+
+    def __init__(self, max_entries=FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, version, render):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        html = render()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (version, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+fragment_cache = FragmentCache()
+
+
+def render_cached_macro(template_name, macro_name, *args, key):
+    """渲染模板中的宏，以 (模板, 宏, key) 缓存，参数完全相同时复用上次结果
+
+    宏的输出只能依赖传入的参数，不能读取 session 等请求相关的数据。
+    """
+    return fragment_cache.get_or_render(
+        (template_name, macro_name, key), args,
+        lambda: get_template_attribute(template_name, macro_name)(*args)
+    )
+
+
+def init_app(app):
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+    app.jinja_env.globals['cached_macro'] = render_cached_macro
@@ -0,0 +1,54 @@
+"""gunicorn 配置，所有参数都可以用环境变量覆盖
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+平滑重启：kill -HUP <master pid>，旧进程处理完当前请求后退出。
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# SQLite 同一时间只允许一个写事务，进程数不宜过多，读请求由线程并发处理
+workers = int(os.environ.get('WEB_WORKERS', min(4, multiprocessing.cpu_count() * 2)))
+threads = int(os.environ.get('WEB_THREADS', '8'))
+# gthread 工作进程中每个 SSE 连接占用一个线程直到到期（STREAM_MAX_AGE），
+# post_worker_init 把每个进程的 SSE 连接数限制在线程数的 SSE_THREAD_SHARE 以内，
+# 超出的浏览器收到 503 后改为轮询 /api/dashboard/delta
+worker_class = 'gthread'
+
+keepalive = int(os.environ.get('WEB_KEEPALIVE', '5'))
+timeout = int(os.environ.get('WEB_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', '30'))
+
+# 处理一定数量的请求后重启工作进程，回收线程结束后残留的资源
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('WEB_MAX_REQUESTS_JITTER', '200'))
+
+# 预加载可加快启动，但数据库连接和日志线程需要在 fork 后重建（见 post_fork）
+preload_app = os.environ.get('WEB_PRELOAD', '0') == '1'
+
+accesslog = os.environ.get('WEB_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
+
+
+def post_fork(server, worker):
+    """工作进程不能复用父进程打开的 SQLite 连接和日志线程"""
+    from models import Database
+    from config.logging_config import restart_after_fork
+
+    Database.reset_connections()
+    restart_after_fork()
+
+
+def post_worker_init(worker):
+    from wsgi import start_worker
+
+    start_worker(threads=worker.cfg.threads)
+
+
+def worker_exit(server, worker):
+    from wsgi import stop_worker
+
+    stop_worker()
@@ -1,6 +1,15 @@
-from app import app
+from app import create_app
+from wsgi import start_worker
+import os
 
 if __name__ == '__main__':
+    app = create_app()
+
+    # 调试模式下重载器会启动两个进程，只在实际提供服务的子进程中启动后台任务：
+    # 周期任务、项目状态转换和已删除项目的彻底删除、定时备份、数据库维护，与 gunicorn 工作进程相同
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_worker()
+
     # 设置主机名为 0.0.0.0 允许外部访问
     # 设置线程模式为 True 支持多线程
     app.run(host='0.0.0.0', port=5000, debug=True, threaded=True) 
\ No newline at end of file
@@ -0,0 +1,300 @@
+"""数据库维护
+
+- PRAGMA optimize：定期执行，让 SQLite 按需更新统计信息；
+- ANALYZE：表的行数与上次统计相差较大（大量导入、归档、删除之后）时重新统计；
+- incremental_vacuum：auto_vacuum=INCREMENTAL 时在空闲时段分批回收空闲页。
+
+每次维护都有时间上限（MAINTENANCE_BUDGET 秒），超时的步骤通过 progress handler 中断，
+结果记录在 maintenance_runs 表中。多个进程同时调度时按上次执行时间认领，只执行一次。
+
+已有数据库的 auto_vacuum 需要一次完整 VACUUM 才能改为 INCREMENTAL，
+在停机窗口执行：python maintenance.py --enable-incremental-vacuum
+新建的数据库默认使用 INCREMENTAL（见 models.Database.create_tables）。
+
+用法：
+    python maintenance.py                 # 立即执行一次完整维护
+    python maintenance.py --list          # 查看最近的维护记录
+"""
+import argparse
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config import database_config
+from models import Database
+
+logger = logging.getLogger(__name__)
+
+# 单次维护的时间上限（秒）
+MAINTENANCE_BUDGET = float(os.environ.get('MAINTENANCE_BUDGET', '30'))
+# PRAGMA optimize 的执行间隔（小时）
+MAINTENANCE_OPTIMIZE_HOURS = float(os.environ.get('MAINTENANCE_OPTIMIZE_HOURS', '6'))
+# 完整维护的时段，例如 02:00-05:00，此时段内进程空闲超过 MAINTENANCE_IDLE_SECONDS 才执行
+MAINTENANCE_WINDOW = os.environ.get('MAINTENANCE_WINDOW', '02:00-05:00')
+MAINTENANCE_IDLE_SECONDS = float(os.environ.get('MAINTENANCE_IDLE_SECONDS', '60'))
+# 行数变化超过该比例（且至少 ANALYZE_MIN_CHANGES 行）时重新 ANALYZE
+ANALYZE_CHANGE_RATIO = float(os.environ.get('ANALYZE_CHANGE_RATIO', '0.1'))
+ANALYZE_MIN_CHANGES = int(os.environ.get('ANALYZE_MIN_CHANGES', '100'))
+# ANALYZE 每个索引最多扫描的行数，限制大表的统计耗时
+ANALYSIS_LIMIT = int(os.environ.get('ANALYSIS_LIMIT', '1000'))
+# 每次 incremental_vacuum 回收的页数
+VACUUM_PAGES_PER_STEP = int(os.environ.get('VACUUM_PAGES_PER_STEP', '500'))
+
+# 两次完整维护之间至少间隔的小时数
+_FULL_INTERVAL_HOURS = 20
+
+
+def _connect():
+    """打开维护专用的连接；maintenance_runs 与其他表一起由 models.create_tables 创建"""
+    Database()
+    return database_config.connect()
+
+
+def _claim(conn, kind, min_interval_hours):
+    """距离上次同类维护超过间隔时插入一条记录并返回其 id，否则返回 None"""
+    now = datetime.now()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if min_interval_hours:
+            last = conn.execute('SELECT MAX(started_at) FROM maintenance_runs WHERE kind = ?',
+                                (kind,)).fetchone()[0]
+            if last and str(last) > str(now - timedelta(hours=min_interval_hours)):
+                conn.rollback()
+                return None
+        run_id = conn.execute('INSERT INTO maintenance_runs (kind, started_at) VALUES (?, ?)',
+                              (kind, now)).lastrowid
+        conn.commit()
+        return run_id
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def stale_tables(conn):
+    """返回需要重新 ANALYZE 的表：有索引但没有统计信息，或行数变化较大"""
+    tables = [row[0] for row in conn.execute('''
+        SELECT DISTINCT tbl_name FROM sqlite_master
+        WHERE type = 'index' AND tbl_name NOT LIKE 'sqlite_%'
+    ''')]
+    has_stats = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'").fetchone()
+    analyzed = {}
+    if has_stats:
+        for table, stat in conn.execute('SELECT tbl, stat FROM sqlite_stat1'):
+            if stat:
+                analyzed[table] = int(stat.split()[0])
+
+    stale = []
+    for table in tables:
+        count = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        if table not in analyzed:
+            if count:
+                stale.append(table)
+            continue
+        changed = abs(count - analyzed[table])
+        if changed >= ANALYZE_MIN_CHANGES and changed > analyzed[table] * ANALYZE_CHANGE_RATIO:
+            stale.append(table)
+    return stale
+
+
+def _step(report, name, func):
+    """执行一个维护步骤并记录耗时，超时中断时记为 timeout"""
+    start = time.perf_counter()
+    entry = {'step': name}
+    try:
+        entry.update(func() or {})
+        entry['result'] = 'ok'
+    except sqlite3.OperationalError as e:
+        entry['result'] = 'timeout' if 'interrupted' in str(e) else f'error: {e}'
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    report.append(entry)
+    return entry['result'] == 'ok'
+
+
+def run(kind='manual', full=True, budget=MAINTENANCE_BUDGET, min_interval_hours=0):
+    """执行一次维护，返回报告；其他进程已在间隔内执行过时返回 None"""
+    conn = _connect()
+    try:
+        run_id = _claim(conn, kind, min_interval_hours)
+        if run_id is None:
+            return None
+
+        start = time.perf_counter()
+        deadline = time.monotonic() + budget
+        # 超过时间上限时中断正在执行的语句
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        steps = []
+
+        def optimize():
+            conn.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+            conn.execute('PRAGMA optimize')
+
+        _step(steps, 'optimize', optimize)
+
+        if full:
+            stale = []
+
+            def check_statistics():
+                stale.extend(stale_tables(conn))
+                return {'stale_tables': stale}
+
+            if _step(steps, 'check_statistics', check_statistics):
+                for table in stale:
+                    if time.monotonic() > deadline:
+                        break
+                    _step(steps, f'analyze {table}', lambda: conn.execute(f'ANALYZE "{table}"'))
+
+            def incremental_vacuum():
+                mode = conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+                before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if mode != 2:
+                    return {'auto_vacuum': mode, 'free_pages': before}
+                while time.monotonic() < deadline:
+                    conn.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})').fetchall()
+                    if conn.execute('PRAGMA freelist_count').fetchone()[0] == 0:
+                        break
+                after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                return {'free_pages': after, 'freed_pages': before - after}
+
+            _step(steps, 'incremental_vacuum', incremental_vacuum)
+
+        conn.set_progress_handler(None, 0)
+        seconds = round(time.perf_counter() - start, 3)
+        report = {'kind': kind, 'seconds': seconds, 'steps': steps}
+        conn.execute('''
+            UPDATE maintenance_runs SET finished_at = ?, seconds = ?, report = ?
+            WHERE id = ?
+        ''', (datetime.now(), seconds, json.dumps(steps, ensure_ascii=False), run_id))
+        conn.commit()
+        logger.info("数据库维护（%s）完成：%.1fs %s", kind, seconds, steps)
+        return report
+    finally:
+        conn.close()
+
+
+def recent_runs(limit=20):
+    conn = _connect()
+    try:
+        rows = conn.execute('''
+            SELECT kind, started_at, finished_at, seconds, report
+            FROM maintenance_runs ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+    finally:
+        conn.close()
+    return [{
+        'kind': kind,
+        'started_at': started_at,
+        'finished_at': finished_at,
+        'seconds': seconds,
+        'steps': json.loads(report) if report else None
+    } for kind, started_at, finished_at, seconds, report in rows]
+
+
+def refresh_after_bulk_change(kind, background=False):
+    """大量导入、归档或删除之后执行一次完整维护，更新统计信息并回收空闲页
+
+    background=True 时在后台线程中执行，不阻塞当前请求，失败只记录日志。
+    """
+    if not background:
+        return run(kind, full=True)
+
+    def target():
+        try:
+            run(kind, full=True)
+        except Exception as e:
+            logger.exception("数据库维护（%s）失败：%s", kind, e)
+
+    threading.Thread(target=target, name=f'maintenance-{kind}', daemon=True).start()
+    return None
+
+
+def enable_incremental_vacuum():
+    """把 auto_vacuum 改为 INCREMENTAL，需要完整 VACUUM，期间数据库不可写"""
+    conn = database_config.connect()
+    try:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        return conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _in_window(now, window=MAINTENANCE_WINDOW):
+    start_text, end_text = window.split('-')
+    start = datetime.strptime(start_text.strip(), '%H:%M').time()
+    end = datetime.strptime(end_text.strip(), '%H:%M').time()
+    current = now.time()
+    if start <= end:
+        return start <= current < end
+    return current >= start or current < end
+
+
+class MaintenanceScheduler:
+    """维护调度线程：定期 PRAGMA optimize，空闲时段执行完整维护"""
+
+    def __init__(self, idle_seconds=None, check_interval=600):
+        # idle_seconds 返回进程空闲的秒数，未提供时视为一直空闲
+        self.idle_seconds = idle_seconds or (lambda: float('inf'))
+        self.check_interval = check_interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='maintenance-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self, now=None):
+        """执行到期的维护，返回报告，没有到期的维护时返回 None"""
+        now = now or datetime.now()
+        if _in_window(now) and self.idle_seconds() >= MAINTENANCE_IDLE_SECONDS:
+            report = run('full', full=True, min_interval_hours=_FULL_INTERVAL_HOURS)
+            if report:
+                return report
+        if MAINTENANCE_OPTIMIZE_HOURS > 0:
+            return run('optimize', full=False, min_interval_hours=MAINTENANCE_OPTIMIZE_HOURS)
+        return None
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("数据库维护失败：%s", e)
+            self._stop_event.wait(self.check_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='数据库维护')
+    parser.add_argument('--budget', type=float, default=MAINTENANCE_BUDGET, help='时间上限（秒）')
+    parser.add_argument('--list', action='store_true', help='查看最近的维护记录')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='将 auto_vacuum 改为 INCREMENTAL（执行完整 VACUUM，请在停机窗口运行）')
+    args = parser.parse_args(argv)
+
+    from config.logging_config import setup_logging
+    setup_logging()
+
+    if args.list:
+        for item in recent_runs():
+            print(json.dumps(item, ensure_ascii=False, default=str))
+        return
+    if args.enable_incremental_vacuum:
+        print(f'auto_vacuum = {enable_incremental_vacuum()}')
+    report = run('manual', full=True, budget=args.budget)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
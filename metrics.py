@@ -0,0 +1,121 @@
+from bisect import bisect_left
+import threading
+import time
+
+# 请求耗时直方图的分桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 不计入请求指标的端点：抓取 /metrics 不统计自身
+UNTRACKED_ENDPOINTS = frozenset({'metrics'})
+# 不算作用户活动的端点：指标抓取、事件流重连、仪表盘轮询和静态资源，
+# 打开的页面和定时抓取不会让进程一直处于非空闲状态
+BACKGROUND_ENDPOINTS = frozenset({'metrics', 'events', 'api_dashboard_delta', 'static', 'asset'})
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """按端点统计的请求耗时、状态码和并发数
+
+    记录时只做几次计数，格式化在 /metrics 被抓取时才进行。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._status = {}
+        self._in_flight = {}
+        self._collectors = []
+        self._last_request = time.monotonic()
+
+    def request_started(self, endpoint):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+            if endpoint not in BACKGROUND_ENDPOINTS:
+                self._last_request = time.monotonic()
+
+    def idle_seconds(self):
+        """距离最近一次用户请求开始的秒数，用于判断是否处于空闲时段"""
+        return time.monotonic() - self._last_request
+
+    def request_finished(self, endpoint):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) - 1
+
+    def observe(self, endpoint, method, status, elapsed):
+        with self._lock:
+            histogram = self._latency.get(endpoint)
+            if histogram is None:
+                histogram = self._latency[endpoint] = Histogram()
+            histogram.observe(elapsed)
+            key = (endpoint, method, status)
+            self._status[key] = self._status.get(key, 0) + 1
+
+    def register_collector(self, collector):
+        """注册附加指标，collector 返回 (名称, 类型, 说明, [(标签字典, 值), ...]) 列表"""
+        self._collectors.append(collector)
+
+    def render(self):
+        """生成 Prometheus 文本格式"""
+        with self._lock:
+            latency = {endpoint: (list(h.counts), h.sum, h.count)
+                       for endpoint, h in self._latency.items()}
+            status = dict(self._status)
+            in_flight = dict(self._in_flight)
+
+        lines = [
+            '# HELP http_request_duration_seconds Request latency by endpoint.',
+            '# TYPE http_request_duration_seconds histogram'
+        ]
+        for endpoint in sorted(latency):
+            counts, total, count = latency[endpoint]
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, counts):
+                cumulative += bucket_count
+                lines.append(f'http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le=bound)} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{_labels(endpoint=endpoint, le="+Inf")} {count}')
+            lines.append(f'http_request_duration_seconds_sum{_labels(endpoint=endpoint)} {total:.6f}')
+            lines.append(f'http_request_duration_seconds_count{_labels(endpoint=endpoint)} {count}')
+
+        lines.append('# HELP http_requests_total Requests by endpoint, method and status.')
+        lines.append('# TYPE http_requests_total counter')
+        for (endpoint, method, code), count in sorted(status.items()):
+            lines.append(f'http_requests_total{_labels(endpoint=endpoint, method=method, status=code)} {count}')
+
+        lines.append('# HELP http_requests_in_flight Requests currently being handled.')
+        lines.append('# TYPE http_requests_in_flight gauge')
+        for endpoint, count in sorted(in_flight.items()):
+            lines.append(f'http_requests_in_flight{_labels(endpoint=endpoint)} {count}')
+
+        for collector in self._collectors:
+            for name, metric_type, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    label_text = _labels(**labels) if labels else ''
+                    lines.append(f'{name}{label_text} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
@@ -1,11 +1,32 @@
+import re
 import sqlite3
 from datetime import datetime
+import logging
 import threading
+import weakref
 import bcrypt
+from query_stats import connection_factory
+from config import database_config
+import archive
+
+logger = logging.getLogger(__name__)
+
+# 引用 projects、users 的子表，外键统一为级联删除、级联更新
+CASCADE_TABLES = ('devices', 'tasks', 'project_history', 'daily_reports',
+                  'permissions', 'user_projects', 'task_templates')
+_REFERENCES = re.compile(
+    r'REFERENCES\s+(projects|users)\s*\(\s*id\s*\)'
+    r'(\s+ON\s+(DELETE|UPDATE)\s+(CASCADE|RESTRICT|NO\s+ACTION|SET\s+NULL|SET\s+DEFAULT))*',
+    re.I
+)
 
 class Database:
     _instance = None
     _lock = threading.Lock()
+    # 连接统计：累计打开的连接数和仍存活的连接（线程结束后连接随之释放）
+    connections_opened = 0
+    _live_connections = weakref.WeakSet()
+    _stats_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -19,22 +40,48 @@ class Database:
         self._lock.acquire()
         try:
             if not hasattr(self.local, 'initialized'):
-                self.local.conn = sqlite3.connect('work_management.db', check_same_thread=False)
+                self.local.conn = self._connect()
                 self.local.cursor = self.local.conn.cursor()
                 self.local.initialized = True
                 self.create_tables()
         finally:
             self._lock.release()
     
+    @classmethod
+    def reset_connections(cls):
+        """丢弃继承自父进程的连接，fork 出的工作进程在首次使用时重新连接"""
+        with cls._stats_lock:
+            cls._live_connections = weakref.WeakSet()
+        if cls._instance is not None:
+            cls._instance.local = threading.local()
+
+    def _connect(self):
+        # 路径、URI、内存模式和 PRAGMA 见 config/database_config.py
+        conn = database_config.connect(factory=connection_factory())
+        # 查询结果既可按下标也可按列名访问，模板中使用 project.client_name
+        conn.row_factory = sqlite3.Row
+        # 归档库的表和合并主库、归档库的临时视图
+        archive.prepare_connection(conn)
+        with Database._stats_lock:
+            Database.connections_opened += 1
+            Database._live_connections.add(conn)
+        return conn
+
+    @classmethod
+    def connection_stats(cls):
+        """返回 (累计打开的连接数, 当前存活的连接数)"""
+        with cls._stats_lock:
+            return cls.connections_opened, len(cls._live_connections)
+
     def get_cursor(self):
         if not hasattr(self.local, 'cursor'):
-            self.local.conn = sqlite3.connect('work_management.db', check_same_thread=False)
+            self.local.conn = self._connect()
             self.local.cursor = self.local.conn.cursor()
         return self.local.cursor
     
     def get_connection(self):
         if not hasattr(self.local, 'conn'):
-            self.local.conn = sqlite3.connect('work_management.db', check_same_thread=False)
+            self.local.conn = self._connect()
             self.local.cursor = self.local.conn.cursor()
         return self.local.conn
     
@@ -53,10 +100,16 @@ class Database:
                     name='devices' OR
                     name='users' OR
                     name='permissions' OR
-                    name='user_projects'
+                    name='user_projects' OR
+                    name='task_templates' OR
+                    name='maintenance_runs'
                 )
             ''')
             existing_tables = {table[0] for table in self.cursor.fetchall()}
+
+            # 新建的数据库使用增量 vacuum，由维护任务回收删除后的空闲页（见 maintenance.py）
+            if not existing_tables:
+                self.cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
             
             # 创建设备表（如果不存在）
             if 'devices' not in existing_tables:
@@ -72,7 +125,7 @@ class Database:
                         electrical INTEGER,        -- 电口卡数量（仅分流设备）
                         card_quantity INTEGER,     -- 业务板卡数量（非分流设备）
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE ON UPDATE CASCADE
                     )
                 ''')
             
@@ -89,8 +142,8 @@ class Database:
                         completed BOOLEAN DEFAULT 0,
                         completion_note TEXT,
                         user_id INTEGER,
-                        FOREIGN KEY (project_id) REFERENCES projects (id),
-                        FOREIGN KEY (user_id) REFERENCES users (id)
+                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE ON UPDATE CASCADE,
+                        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE
                     )
                 ''')
             else:
@@ -98,7 +151,7 @@ class Database:
                 self.cursor.execute('PRAGMA table_info(tasks)')
                 columns = {col[1] for col in self.cursor.fetchall()}
                 if 'user_id' not in columns:
-                    self.cursor.execute('ALTER TABLE tasks ADD COLUMN user_id INTEGER REFERENCES users(id)')
+                    self.cursor.execute('ALTER TABLE tasks ADD COLUMN user_id INTEGER REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE')
                 if 'completion_note' not in columns:
                     self.cursor.execute('ALTER TABLE tasks ADD COLUMN completion_note TEXT')
             
@@ -117,7 +170,9 @@ class Database:
                         is_active INTEGER,
                         area TEXT,
                         manager TEXT,
-                        manager_phone TEXT
+                        manager_phone TEXT,
+                        deleted_at TIMESTAMP,   -- 软删除时间，后台任务到期后彻底删除
+                        state_changed_at TIMESTAMP  -- 按 last_updated 自动转换状态的时间
                     )
                 ''')
             else:
@@ -130,6 +185,10 @@ class Database:
                     self.cursor.execute('ALTER TABLE projects ADD COLUMN manager TEXT')
                 if 'manager_phone' not in columns:
                     self.cursor.execute('ALTER TABLE projects ADD COLUMN manager_phone TEXT')
+                if 'deleted_at' not in columns:
+                    self.cursor.execute('ALTER TABLE projects ADD COLUMN deleted_at TIMESTAMP')
+                if 'state_changed_at' not in columns:
+                    self.cursor.execute('ALTER TABLE projects ADD COLUMN state_changed_at TIMESTAMP')
             
             # 创建项目历史表（如果不存在）
             if 'project_history' not in existing_tables:
@@ -142,7 +201,7 @@ class Database:
                         old_value TEXT,
                         new_value TEXT,
                         description TEXT,
-                        FOREIGN KEY (project_id) REFERENCES projects (id)
+                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE ON UPDATE CASCADE
                     )
                 ''')
             
@@ -155,7 +214,7 @@ class Database:
                         content TEXT NOT NULL,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         user_id INTEGER NOT NULL,
-                        FOREIGN KEY (user_id) REFERENCES users (id)
+                        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE
                     )
                 ''')
             else:
@@ -163,7 +222,7 @@ class Database:
                 self.cursor.execute('PRAGMA table_info(daily_reports)')
                 columns = {col[1] for col in self.cursor.fetchall()}
                 if 'user_id' not in columns:
-                    self.cursor.execute('ALTER TABLE daily_reports ADD COLUMN user_id INTEGER REFERENCES users(id)')
+                    self.cursor.execute('ALTER TABLE daily_reports ADD COLUMN user_id INTEGER REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE')
             
             # 创建用户表（如果不存在）
             if 'users' not in existing_tables:
@@ -175,7 +234,8 @@ class Database:
                         role TEXT NOT NULL,  -- 'admin' 或 'user'
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         last_login TIMESTAMP,
-                        is_active BOOLEAN DEFAULT 1
+                        is_active BOOLEAN DEFAULT 1,
+                        deleted_at TIMESTAMP   -- 删除时间，保留用户的任务和日报
                     )
                 ''')
                 
@@ -184,6 +244,11 @@ class Database:
                     INSERT INTO users (username, password, role)
                     VALUES (?, ?, ?)
                 ''', ('liusw', self.hash_password('LiuShaowei@2020'), 'admin'))
+            else:
+                self.cursor.execute('PRAGMA table_info(users)')
+                columns = {col[1] for col in self.cursor.fetchall()}
+                if 'deleted_at' not in columns:
+                    self.cursor.execute('ALTER TABLE users ADD COLUMN deleted_at TIMESTAMP')
             
             # 创建权限表（如果不存在）
             if 'permissions' not in existing_tables:
@@ -196,7 +261,7 @@ class Database:
                         can_add BOOLEAN DEFAULT 0,
                         can_edit BOOLEAN DEFAULT 0,
                         can_delete BOOLEAN DEFAULT 0,
-                        FOREIGN KEY (user_id) REFERENCES users (id),
+                        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE,
                         UNIQUE(user_id, module)
                     )
                 ''')
@@ -208,17 +273,165 @@ class Database:
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id INTEGER,
                         project_id INTEGER,
-                        FOREIGN KEY (user_id) REFERENCES users (id),
-                        FOREIGN KEY (project_id) REFERENCES projects (id),
+                        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE,
+                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE ON UPDATE CASCADE,
                         UNIQUE(user_id, project_id)
                     )
                 ''')
-            
+
+            # 创建周期任务模板表（如果不存在）
+            if 'task_templates' not in existing_tables:
+                self.cursor.execute('''
+                    CREATE TABLE task_templates (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        project_id INTEGER,
+                        content TEXT NOT NULL,
+                        priority INTEGER,
+                        rule TEXT NOT NULL,       -- cron 规则：分 时 日 月 周
+                        is_active BOOLEAN DEFAULT 1,
+                        last_run TIMESTAMP,       -- 调度水位，之前的触发时间已处理
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE ON UPDATE CASCADE,
+                        FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE ON UPDATE CASCADE
+                    )
+                ''')
+
+            # 创建数据库维护记录表（如果不存在），见 maintenance.py
+            if 'maintenance_runs' not in existing_tables:
+                self.cursor.execute('''
+                    CREATE TABLE maintenance_runs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        kind TEXT NOT NULL,          -- optimize / full / manual / archive
+                        started_at TIMESTAMP NOT NULL,
+                        finished_at TIMESTAMP,
+                        seconds REAL,
+                        report TEXT                  -- JSON
+                    )
+                ''')
+
+            # 创建任务查询索引
+            # 未完成任务按用户、优先级分页，使用部分索引只覆盖未完成任务；
+            # priority 可以为空，索引和查询都按 COALESCE(priority, 0) 排序（见 WorkManager.query_tasks）
+            self.cursor.execute('DROP INDEX IF EXISTS idx_tasks_open')
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tasks_open_priority
+                ON tasks (user_id, COALESCE(priority, 0) DESC) WHERE completed = 0
+            ''')
+            # 按日期范围查询任务
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_tasks_user_start
+                ON tasks (user_id, start_time)
+            ''')
+
+            # 看板增量刷新按 last_updated 查询变更的项目
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_projects_last_updated
+                ON projects (last_updated)
+            ''')
+            # 自动转换状态只扫描各状态中已越过阈值的项目，看板按 state_changed_at 获取自动转换的项目
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_projects_state_updated
+                ON projects (state, last_updated)
+            ''')
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_projects_state_changed
+                ON projects (state_changed_at) WHERE state_changed_at IS NOT NULL
+            ''')
+            # 后台清理查询到期的软删除项目
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_projects_deleted
+                ON projects (deleted_at) WHERE deleted_at IS NOT NULL
+            ''')
+
+            # 级联删除、级联更新按子表的外键列查找，没有索引时每个项目都要扫描整张子表
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks (project_id)')
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_project_history_project
+                ON project_history (project_id, change_time)
+            ''')
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_devices_project ON devices (project_id)')
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_user_projects_project
+                ON user_projects (project_id)
+            ''')
+            self.cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_daily_reports_user
+                ON daily_reports (user_id, report_date)
+            ''')
+
             self.conn.commit()
         except Exception as e:
             print(f"Error creating tables: {e}")
             self.conn.rollback()
             raise
+
+        self.migrate_foreign_keys()
+
+    def _tables_without_cascade(self):
+        tables = []
+        for table in CASCADE_TABLES:
+            foreign_keys = self.cursor.execute(f'PRAGMA foreign_key_list({table})').fetchall()
+            if any(fk['on_delete'] != 'CASCADE' or fk['on_update'] != 'CASCADE' for fk in foreign_keys):
+                tables.append(table)
+        return tables
+
+    def migrate_foreign_keys(self):
+        """把旧数据库子表的外键改为级联删除、级联更新
+
+        SQLite 不能修改已有的约束，按官方步骤重建表：建新表、复制数据、删除旧表、改名。
+        重建期间关闭外键检查（该设置在事务中不生效），返回重建的表。
+        """
+        if not self._tables_without_cascade():
+            return []
+
+        self.conn.execute('PRAGMA foreign_keys = OFF')
+        # 改名时不重新解析引用旧表的视图（archive.py 的临时视图）
+        self.conn.execute('PRAGMA legacy_alter_table = ON')
+        try:
+            self.cursor.execute('BEGIN IMMEDIATE')
+            # 拿到写锁后再检查一次，其他进程可能已经完成迁移
+            tables = self._tables_without_cascade()
+            for table in tables:
+                sql = self.cursor.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+                ).fetchone()[0]
+                indexes = [row[0] for row in self.cursor.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                    (table,)
+                )]
+                sequence = self.cursor.execute(
+                    'SELECT seq FROM sqlite_sequence WHERE name = ?', (table,)
+                ).fetchone()
+
+                sql = _REFERENCES.sub(r'REFERENCES \1 (id) ON DELETE CASCADE ON UPDATE CASCADE', sql)
+                sql = re.sub(rf'^CREATE TABLE\s+"?{table}"?', f'CREATE TABLE {table}_new', sql, count=1)
+                self.cursor.execute(sql)
+                self.cursor.execute(f'INSERT INTO {table}_new SELECT * FROM {table}')
+                self.cursor.execute(f'DROP TABLE {table}')
+                self.cursor.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+                for index in indexes:
+                    self.cursor.execute(index)
+                if sequence is not None:
+                    # 保留自增序号，已删除记录的 id 不会被重新使用
+                    self.cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = ?',
+                                        (sequence[0], table))
+
+            # 旧版本把临时任务的 project_id 记为 0，外键检查要求为 NULL
+            self.cursor.execute('UPDATE tasks SET project_id = NULL WHERE project_id = 0')
+            violations = self.cursor.execute('PRAGMA foreign_key_check').fetchall()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            self.conn.execute('PRAGMA legacy_alter_table = OFF')
+            self.conn.execute('PRAGMA foreign_keys = ON')
+
+        if violations:
+            # 旧版本删除项目后遗留的历史记录等，只在修改这些行的外键列时才会报错
+            logger.warning("迁移外键后有 %d 行不满足外键约束", len(violations))
+        return tables
     
     @property
     def conn(self):
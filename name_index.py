@@ -0,0 +1,178 @@
+"""客户名称索引
+
+内存中维护 projects.client_name 的前缀索引（排序列表 + 二分查找）和二元组倒排索引，
+用于添加项目时的客户名称联想和重复提示，查询不访问数据库。
+
+名称先规范化：全角转半角、小写、去掉空白和标点，以及"有限公司"等后缀。
+中文客户名称通常只有 4~8 个字，三元组对两三个字的输入匹配不到，使用二元组。
+
+索引由 WorkManager 按看板版本号增量同步（见 WorkManager.sync_name_index），
+另外每 NAME_INDEX_RELOAD 秒整体重建一次，以移除其他进程中改编号前的旧编号。
+"""
+from bisect import bisect_left
+from collections import Counter
+import os
+import re
+import threading
+import time
+import unicodedata
+
+# 整体重建的间隔（秒）
+NAME_INDEX_RELOAD = float(os.environ.get('NAME_INDEX_RELOAD', '300'))
+# 二元组相似度（Dice 系数）不低于该值时视为可能重复
+DUPLICATE_THRESHOLD = float(os.environ.get('DUPLICATE_THRESHOLD', '0.8'))
+
+_SUFFIXES = ('股份有限公司', '有限责任公司', '有限公司', '分公司', '公司', '集团')
+_SEPARATORS = re.compile(r'[\W_]+')
+# 一个名称包含另一个名称时，较短的名称至少有这么多字才视为重复
+_CONTAINED_MIN_LENGTH = 4
+
+
+def normalize(name):
+    text = _SEPARATORS.sub('', unicodedata.normalize('NFKC', name or '').lower())
+    for suffix in _SUFFIXES:
+        if text.endswith(suffix) and len(text) > len(suffix):
+            return text[:-len(suffix)]
+    return text
+
+
+def _grams(key):
+    return {key[i:i + 2] for i in range(len(key) - 1)}
+
+
+def _similarity(grams, other):
+    if not grams or not other:
+        return 0.0
+    return 2 * len(grams & other) / (len(grams) + len(other))
+
+
+class NameIndex:
+    """client_name 的前缀和二元组索引"""
+
+    def __init__(self):
+        self._entries = {}      # 项目ID -> (名称, 规范化名称, 二元组)
+        self._sorted = []       # [(规范化名称, 项目ID)]
+        self._grams = {}        # 二元组 -> {项目ID}
+        self._version = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self._version
+
+    def needs_reload(self):
+        return self._version is None or time.monotonic() - self._loaded_at >= NAME_INDEX_RELOAD
+
+    def load(self, rows, version):
+        """用 (项目ID, 名称) 重建索引"""
+        with self._lock:
+            self._entries.clear()
+            self._sorted = []
+            self._grams.clear()
+            for project_id, name in rows:
+                self._add(project_id, name)
+            self._sorted.sort()
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+    def apply(self, rows, version):
+        """应用变更的项目：(项目ID, 名称, 是否已删除)"""
+        with self._lock:
+            for project_id, name, deleted in rows:
+                self._remove(project_id)
+                if not deleted:
+                    self._add(project_id, name, keep_sorted=True)
+            self._version = version
+
+    def remove(self, project_id):
+        with self._lock:
+            self._remove(project_id)
+
+    def search(self, query, limit=10):
+        """返回 [(项目ID, 名称, 得分)]：名称相同 > 前缀匹配 > 包含 > 二元组相似度"""
+        key = normalize(query)
+        if not key:
+            return []
+        grams = _grams(key)
+        with self._lock:
+            # 候选：前缀匹配的名称，以及相同二元组最多的若干个名称
+            candidates = {}
+            start = bisect_left(self._sorted, (key,))
+            for other_key, project_id in self._sorted[start:start + limit * 5]:
+                if not other_key.startswith(key):
+                    break
+                candidates[project_id] = len(grams & self._entries[project_id][2])
+            shared = Counter(project_id for gram in grams for project_id in self._grams.get(gram, ()))
+            for project_id, count in shared.most_common(limit * 5):
+                candidates.setdefault(project_id, count)
+
+            ranked = []
+            for project_id, count in candidates.items():
+                name, other_key, other_grams = self._entries[project_id]
+                score = 2 * count / (len(grams) + len(other_grams)) if grams and other_grams else 0.0
+                if other_key == key:
+                    score += 2.0
+                elif other_key.startswith(key):
+                    score += 1.0
+                elif key in other_key:
+                    score += 0.5
+                ranked.append((-score, name, project_id))
+            ranked.sort()
+            return [(project_id, name, round(-score, 3)) for score, name, project_id in ranked[:limit]]
+
+    def duplicates(self, name, exclude_id=None):
+        """返回可能与 name 重复的 [(项目ID, 名称)]"""
+        key = normalize(name)
+        if not key:
+            return []
+        grams = _grams(key)
+        with self._lock:
+            # 相同、包含或相似的名称至少有一个相同的二元组，只有一个字的名称单独查找
+            candidates = {project_id for gram in grams for project_id in self._grams.get(gram, ())}
+            if len(key) == 1:
+                candidates.update(project_id for project_id, entry in self._entries.items() if entry[1] == key)
+            result = []
+            for project_id in candidates:
+                if project_id == exclude_id:
+                    continue
+                other_name, other_key, other_grams = self._entries[project_id]
+                shorter = min(len(key), len(other_key))
+                if (other_key == key
+                        or (shorter >= _CONTAINED_MIN_LENGTH and (key in other_key or other_key in key))
+                        or _similarity(grams, other_grams) >= DUPLICATE_THRESHOLD):
+                    result.append((project_id, other_name))
+            return sorted(result)
+
+    def stats(self):
+        with self._lock:
+            return {'names': len(self._entries), 'grams': len(self._grams)}
+
+    def _add(self, project_id, name, keep_sorted=False):
+        key = normalize(name)
+        grams = _grams(key)
+        self._entries[project_id] = (name, key, grams)
+        if keep_sorted:
+            self._sorted.insert(bisect_left(self._sorted, (key, project_id)), (key, project_id))
+        else:
+            self._sorted.append((key, project_id))
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(project_id)
+
+    def _remove(self, project_id):
+        entry = self._entries.pop(project_id, None)
+        if entry is None:
+            return
+        _, key, grams = entry
+        index = bisect_left(self._sorted, (key, project_id))
+        if index < len(self._sorted) and self._sorted[index] == (key, project_id):
+            del self._sorted[index]
+        for gram in grams:
+            ids = self._grams.get(gram)
+            if ids is not None:
+                ids.discard(project_id)
+                if not ids:
+                    del self._grams[gram]
+
+
+name_index = NameIndex()
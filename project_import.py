@@ -0,0 +1,189 @@
+"""从 CSV 批量导入项目
+
+CSV 可由 Excel 另存为得到（UTF-8 或 GBK 编码均可），第一行为表头，列名可用中文或英文：
+
+    项目ID(project_id), 客户名称(client_name), 项目环节(stage), 项目状态(status),
+    项目区域(area), 项目经理(manager), 联系电话(manager_phone), 备注(notes)
+
+逐行读取、校验（必填字段、项目ID、区域是否在 get_grouped_districts 中），
+每 IMPORT_CHUNK_SIZE 行在一个事务中批量写入（见 WorkManager.import_projects）。
+项目ID已存在时更新该项目（update_existing=False 时记为错误），出错的行不影响其他行，
+结果中逐行列出错误。
+
+用法：
+    python project_import.py projects.csv
+    python project_import.py projects.csv --no-update --errors errors.csv
+"""
+import argparse
+import csv
+import io
+import logging
+import os
+import sys
+
+from config.district_config import get_grouped_districts
+
+logger = logging.getLogger(__name__)
+
+# 每个事务写入的行数
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', '200'))
+
+# 字段 -> 可用的列名
+COLUMNS = {
+    'project_id': ('项目ID', 'id', 'project_id'),
+    'client_name': ('客户名称', 'client_name'),
+    'stage': ('项目环节', 'stage'),
+    'status': ('项目状态', 'status'),
+    'area': ('项目区域', 'area'),
+    'manager': ('项目经理', 'manager'),
+    'manager_phone': ('联系电话', 'manager_phone'),
+    'notes': ('备注', 'notes')
+}
+REQUIRED = {
+    'project_id': '项目ID',
+    'client_name': '客户名称',
+    'stage': '项目环节',
+    'area': '项目区域',
+    'manager': '项目经理',
+    'manager_phone': '联系电话'
+}
+
+
+def open_text(binary):
+    """把上传的二进制流包装为文本流，UTF-8 解码失败时按 GB18030（Excel 默认的 GBK）读取"""
+    buffered = binary if isinstance(binary, io.BufferedReader) else io.BufferedReader(binary)
+    head = buffered.peek(65536)
+    # 只检查完整的行，避免在多字节字符中间截断
+    head = head[:head.rfind(b'\n') + 1] or head
+    try:
+        head.decode('utf-8')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'gb18030'
+    return io.TextIOWrapper(buffered, encoding=encoding, newline='')
+
+
+def _header_map(fieldnames):
+    """表头 -> 字段名，缺少必填列时抛出 ValueError"""
+    aliases = {alias.lower(): field for field, names in COLUMNS.items() for alias in names}
+    mapping = {}
+    for name in fieldnames or []:
+        field = aliases.get((name or '').strip().lower())
+        if field:
+            mapping[name] = field
+    missing = [label for field, label in REQUIRED.items() if field not in mapping.values()]
+    if missing:
+        raise ValueError(f'CSV 缺少以下列：{", ".join(missing)}')
+    return mapping
+
+
+def validate(row, areas):
+    """校验一行，返回 (项目字典, 错误列表)"""
+    project = {field: (row.get(field) or '').strip() for field in COLUMNS}
+    errors = [f'{label}不能为空' for field, label in REQUIRED.items() if not project[field]]
+    if project['project_id']:
+        try:
+            project['project_id'] = int(project['project_id'])
+            if project['project_id'] <= 0:
+                errors.append('项目ID必须为正整数')
+        except ValueError:
+            errors.append('项目ID必须为数字')
+    if project['area'] and project['area'] not in areas:
+        errors.append(f'项目区域无效：{project["area"]}')
+    return project, errors
+
+
+def read_projects(text):
+    """逐行读取并校验，生成 (行号, 项目字典, 错误列表)"""
+    reader = csv.DictReader(text)
+    mapping = _header_map(reader.fieldnames)
+    areas = {district for group in get_grouped_districts().values() for district in group}
+    for row in reader:
+        values = {mapping[name]: value for name, value in row.items() if name in mapping}
+        if not any((value or '').strip() for value in values.values()):
+            continue
+        project, errors = validate(values, areas)
+        yield reader.line_num, project, errors
+
+
+def import_projects(manager, text, update_existing=True, chunk_size=IMPORT_CHUNK_SIZE):
+    """导入文本流中的项目，返回 {'created', 'updated', 'errors'}
+
+    errors 为 [{'line', 'project_id', 'errors'}]，按行号排列。
+    """
+    report = {'created': 0, 'updated': 0, 'errors': []}
+    seen = set()
+    chunk = []
+
+    def flush():
+        created, updated, failed = manager.import_projects(
+            [project for _, project in chunk], update_existing
+        )
+        report['created'] += created
+        report['updated'] += updated
+        for line, project in chunk:
+            if project['project_id'] in failed:
+                report['errors'].append({
+                    'line': line, 'project_id': project['project_id'],
+                    'errors': [failed[project['project_id']]]
+                })
+        chunk.clear()
+
+    for line, project, errors in read_projects(text):
+        if not errors and project['project_id'] in seen:
+            errors = ['项目ID在文件中重复']
+        if errors:
+            report['errors'].append({'line': line, 'project_id': project['project_id'], 'errors': errors})
+            continue
+        seen.add(project['project_id'])
+        chunk.append((line, project))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    report['errors'].sort(key=lambda error: error['line'])
+    logger.info("导入项目：新增 %d，更新 %d，错误 %d 行",
+                report['created'], report['updated'], len(report['errors']))
+    return report
+
+
+def write_errors(errors, out):
+    """把错误写成 CSV：行号, 项目ID, 错误"""
+    writer = csv.writer(out)
+    writer.writerow(['行号', '项目ID', '错误'])
+    for error in errors:
+        writer.writerow([error['line'], error['project_id'], '；'.join(error['errors'])])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='从 CSV 批量导入项目')
+    parser.add_argument('path', help='CSV 文件')
+    parser.add_argument('--no-update', action='store_true', help='项目ID已存在时记为错误，不更新')
+    parser.add_argument('--errors', help='把错误写入该 CSV 文件（默认输出到终端）')
+    args = parser.parse_args(argv)
+
+    from config.logging_config import setup_logging
+    from work_manager import get_manager
+    from write_queue import write_queue
+
+    setup_logging()
+    with open(args.path, 'rb') as f:
+        report = import_projects(get_manager(), open_text(f), update_existing=not args.no_update)
+    write_queue.flush()
+    if report['created'] or report['updated']:
+        import maintenance
+        maintenance.refresh_after_bulk_change('import')
+
+    print(f"新增 {report['created']}，更新 {report['updated']}，错误 {len(report['errors'])} 行")
+    if report['errors']:
+        if args.errors:
+            with open(args.errors, 'w', newline='', encoding='utf-8-sig') as out:
+                write_errors(report['errors'], out)
+        else:
+            write_errors(report['errors'], sys.stdout)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,216 @@
+from collections import deque
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 是否记录 SQL 统计
+QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS', '1') != '0'
+# 慢查询阈值（毫秒）
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '100'))
+# 单个请求执行的 SQL 条数超过该值时记录告警，用于发现 N+1 查询
+REQUEST_QUERY_WARN = int(os.environ.get('REQUEST_QUERY_WARN', '25'))
+# 每类语句保留的耗时样本数，用于计算分位数
+SAMPLE_SIZE = 500
+
+_THIS_FILE = os.path.normcase(os.path.abspath(__file__))
+_SKIP_FILES = {_THIS_FILE, os.path.normcase(os.path.abspath(os.path.join(os.path.dirname(__file__), 'models.py')))}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """归一化 SQL：去掉多余空白，字面量和 IN 列表替换为占位符"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(?+)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def _call_site():
+    """找到发起查询的业务代码位置"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = os.path.normcase(os.path.abspath(frame.f_code.co_filename))
+        if filename not in _SKIP_FILES:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+class StatementStats:
+    __slots__ = ('calls', 'total', 'max', 'rows', 'samples', 'call_sites')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.call_sites = set()
+
+
+class QueryStats:
+    """按 SQL 指纹汇总的执行统计"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._request = threading.local()
+
+    def record(self, sql, elapsed, rows, call_site=None):
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats()
+            stats.calls += 1
+            stats.total += elapsed
+            stats.rows += rows
+            stats.samples.append(elapsed)
+            if elapsed > stats.max:
+                stats.max = elapsed
+            if call_site and len(stats.call_sites) < 10:
+                stats.call_sites.add(call_site)
+
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning("慢查询 %.1fms rows=%d at %s: %s",
+                           elapsed * 1000, rows, call_site or 'unknown', key)
+
+    def needs_call_site(self, sql):
+        """首次出现的语句记录调用位置，之后不再遍历调用栈"""
+        stats = self._stats.get(fingerprint(sql))
+        return stats is None or not stats.call_sites
+
+    def count_query(self):
+        if getattr(self._request, 'active', False):
+            self._request.count += 1
+
+    def start_request(self):
+        self._request.active = True
+        self._request.count = 0
+
+    def end_request(self):
+        """结束请求计数，返回本次请求执行的 SQL 条数"""
+        count = getattr(self._request, 'count', 0)
+        self._request.active = False
+        self._request.count = 0
+        return count
+
+    def totals(self):
+        """返回 (累计执行次数, 累计耗时秒数)"""
+        with self._lock:
+            return (sum(stats.calls for stats in self._stats.values()),
+                    sum(stats.total for stats in self._stats.values()))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def summary(self):
+        """返回按总耗时排序的统计列表（毫秒）"""
+        with self._lock:
+            items = [(key, stats.calls, stats.total, stats.max, stats.rows,
+                      sorted(stats.samples), sorted(stats.call_sites))
+                     for key, stats in self._stats.items()]
+
+        def percentile(samples, p):
+            if not samples:
+                return 0.0
+            index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+            return samples[index] * 1000
+
+        result = [{
+            'sql': key,
+            'calls': calls,
+            'total_ms': total * 1000,
+            'avg_ms': total * 1000 / calls,
+            'p50_ms': percentile(samples, 50),
+            'p95_ms': percentile(samples, 95),
+            'p99_ms': percentile(samples, 99),
+            'max_ms': max_elapsed * 1000,
+            'avg_rows': rows / calls,
+            'call_sites': call_sites
+        } for key, calls, total, max_elapsed, rows, samples, call_sites in items]
+        result.sort(key=lambda item: item['total_ms'], reverse=True)
+        return result
+
+
+query_stats = QueryStats()
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """记录执行耗时和返回行数的游标
+
+    SELECT 的耗时包括第一次取数据，在取数据或执行下一条语句时记录。
+    """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        self._flush()
+        query_stats.count_query()
+        call_site = _call_site() if query_stats.needs_call_site(sql) else None
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, time.perf_counter() - start, 0, call_site]
+            if self.description is None:
+                # 非查询语句直接记录影响行数
+                self._flush(max(self.rowcount, 0))
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush()
+        query_stats.count_query()
+        call_site = _call_site() if query_stats.needs_call_site(sql) else None
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            query_stats.record(sql, time.perf_counter() - start, max(self.rowcount, 0), call_site)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._add_fetch(time.perf_counter() - start, 1 if row is not None else 0)
+        return row
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._add_fetch(time.perf_counter() - start, len(rows))
+        self._flush()
+        return rows
+
+    def _add_fetch(self, elapsed, rows):
+        if self._pending is not None:
+            self._pending[1] += elapsed
+            self._pending[2] += rows
+
+    def _flush(self, rows=None):
+        if self._pending is None:
+            return
+        sql, elapsed, fetched, call_site = self._pending
+        self._pending = None
+        query_stats.record(sql, elapsed, fetched if rows is None else rows, call_site)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """默认创建 InstrumentedCursor 的连接"""
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or InstrumentedCursor)
+
+
+def connection_factory():
+    """返回 sqlite3.connect 使用的连接类"""
+    return InstrumentedConnection if QUERY_STATS_ENABLED else sqlite3.Connection
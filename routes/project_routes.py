@@ -1,9 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from work_manager import WorkManager
+from werkzeug.local import LocalProxy
+from work_manager import get_manager
 from functools import wraps
 
 bp = Blueprint('project', __name__)
-manager = WorkManager()
+# 首次处理请求时才创建，见 work_manager.get_manager
+manager = LocalProxy(get_manager)
 
 @bp.route('/projects')
 def projects():
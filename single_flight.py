@@ -0,0 +1,102 @@
+"""相同参数的并发读请求合并（single-flight）
+
+同一时刻多个请求调用同一个耗时的只读方法（参数相同）时，只有第一个调用真正执行，
+其余调用等待并共享它的结果；可选的 ttl 让结果在短时间内继续复用。
+结果在调用方之间共享，调用方不能修改返回的对象。
+
+按名称统计执行、共享和缓存命中的次数，由 /metrics 输出。
+"""
+from functools import wraps
+import os
+import threading
+import time
+
+# 项目统计等结果的默认复用时间（秒），0 表示只合并并发调用
+SINGLE_FLIGHT_TTL = float(os.environ.get('SINGLE_FLIGHT_TTL', '2'))
+
+
+class _Call:
+    __slots__ = ('done', 'value', 'error', 'generation')
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """按 key 合并并发调用"""
+
+    def __init__(self):
+        self._calls = {}
+        self._results = {}
+        self._counts = {}
+        # invalidate() 时递增，执行期间被失效的结果不再缓存
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def do(self, name, key, func, ttl=0):
+        """执行 func() 并返回结果，name 相同且 key 相同的并发调用共享同一次执行"""
+        full_key = (name, key)
+        with self._lock:
+            counts = self._counts.setdefault(name, {'executed': 0, 'shared': 0, 'cached': 0})
+            cached = self._results.get(full_key)
+            if cached is not None and cached[0] > time.monotonic():
+                counts['cached'] += 1
+                return cached[1]
+            call = self._calls.get(full_key)
+            leader = call is None
+            if leader:
+                call = self._calls[full_key] = _Call(self._generations.get(name, 0))
+                counts['executed'] += 1
+            else:
+                counts['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[full_key]
+                if ttl > 0 and call.error is None and call.generation == self._generations.get(name, 0):
+                    now = time.monotonic()
+                    for expired in [k for k, (expires, _) in self._results.items() if expires <= now]:
+                        del self._results[expired]
+                    self._results[full_key] = (now + ttl, call.value)
+            call.done.set()
+        return call.value
+
+    def invalidate(self, *names):
+        """丢弃复用中的结果，不指定 names 时全部丢弃；正在执行的调用完成后也不会缓存"""
+        with self._lock:
+            names = names or set(self._counts)
+            for name in names:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            for full_key in [k for k in self._results if k[0] in names]:
+                del self._results[full_key]
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(counts) for name, counts in self._counts.items()}
+
+
+single_flight = SingleFlight()
+
+
+def coalesced(name, ttl=0):
+    """WorkManager 方法的装饰器，以位置参数作为 key 合并并发调用"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args):
+            return single_flight.do(name, args, lambda: method(self, *args), ttl=ttl)
+        return wrapper
+    return decorator
@@ -0,0 +1,707 @@
+function autoSaveDevice(input) {
+    const deviceId = input.dataset.id;
+    const field = input.dataset.field;
+    const value = input.value.trim();
+    const deviceType = input.closest('.device-table').querySelector('h5').textContent.trim();
+    
+    if (!deviceId) {
+        // 如果是新添加的设备，调用添加设备的方法
+        saveNewDevice(input);
+        return;
+    }
+
+    const data = {
+        type: deviceType,
+        [field]: value
+    };
+
+    // 如果是分流设备，需要特���处理板卡信息
+    if (deviceType === '分流设备' && (field === 'mec_10g' || field === 'ge_optical' || field === 'electrical')) {
+        data.card_type = field;
+        data.card_quantity = value;
+    }
+
+    fetch(`/update_device/${deviceId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // 保存成功后刷新页面
+            location.reload();
+        } else {
+            alert('保存失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('保存失败，请重试');
+    });
+}
+
+function addDeviceRow(btn, deviceType) {
+    const table = btn.closest('.device-table').querySelector('table tbody');
+    const newRow = document.createElement('tr');
+    
+    // 创建新行
+    if (deviceType === '分流设备') {
+        newRow.innerHTML = `
+            <td><input type="text" class="device-input" placeholder="设备名称" data-field="name"></td>
+            <td><input type="text" class="device-input" placeholder="设备型号" data-field="model"></td>
+            <td><input type="text" class="device-input" placeholder="数量" data-field="mec_10g"></td>
+            <td><input type="text" class="device-input" placeholder="数量" data-field="ge_optical"></td>
+            <td><input type="text" class="device-input" placeholder="数量" data-field="electrical"></td>
+            <td><button onclick="deleteRow(this)">删除</button></td>
+        `;
+    } else {
+        newRow.innerHTML = `
+            <td><input type="text" class="device-input" placeholder="设��名称" data-field="name"></td>
+            <td><input type="text" class="device-input" placeholder="设备型号" data-field="model"></td>
+            <td><input type="text" class="device-input" placeholder="数量" data-field="card_quantity"></td>
+            <td><button onclick="deleteRow(this)">删除</button></td>
+        `;
+    }
+    
+    // 为所有输入框添加自动保存事件
+    newRow.querySelectorAll('.device-input').forEach(input => {
+        input.addEventListener('change', () => autoSaveDevice(input));
+    });
+    
+    table.appendChild(newRow);
+}
+
+function saveNewDevice(input) {
+    const row = input.closest('tr');
+    const deviceType = row.closest('.device-table').querySelector('h5').textContent.trim();
+    
+    // 收集所有输入值
+    let deviceData = {
+        type: deviceType,
+        name: row.cells[0].querySelector('input').value.trim(),
+        model: row.cells[1].querySelector('input').value.trim()
+    };
+
+    if (deviceType === '分流设备') {
+        deviceData.cards = {
+            mec_10g: row.cells[2].querySelector('input').value.trim() || '0',
+            ge_optical: row.cells[3].querySelector('input').value.trim() || '0',
+            electrical: row.cells[4].querySelector('input').value.trim() || '0'
+        };
+    } else {
+        deviceData.card_quantity = row.cells[2].querySelector('input').value.trim() || '0';
+    }
+
+    // 验证必填字段
+    if (!deviceData.name || !deviceData.model) {
+        alert('请填写设备名称和型号');
+        return;
+    }
+
+    fetch(`/add_device/${projectId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(deviceData)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // 保存成功后刷新页面
+            location.reload();
+        } else {
+            alert('保存失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('保存失败，请重试');
+    });
+}
+
+function deleteRow(btn) {
+    const row = btn.closest('tr');
+    const deviceId = row.querySelector('.device-input').dataset.id;
+    
+    if (!deviceId) {
+        // 如果是新添加的未保存行，直接删除
+        row.remove();
+        return;
+    }
+    
+    if (confirm('确定要删除这条设备信息吗？此操作不可恢复。')) {
+        fetch(`/delete_device/${deviceId}`, {
+            method: 'POST'
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                location.reload();  // 删除成功后刷新页面
+            } else {
+                alert('删除失败，请重试');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('删除失败，请重试');
+        });
+    }
+}
+
+function toggleEdit(btn, field) {
+    const infoItem = btn.closest('.info-item');
+    const textSpan = infoItem.querySelector('.info-text');
+    const editContainer = infoItem.querySelector('.edit-container');
+    const input = editContainer.querySelector('.info-input');
+    
+    // 隐藏所有其他打开编辑容器
+    document.querySelectorAll('.edit-container').forEach(container => {
+        if (container !== editContainer && container.style.display === 'flex') {
+            const item = container.closest('.info-item');
+            item.querySelector('.info-text').style.display = '';
+            item.querySelector('.edit-info-btn').style.display = '';
+            container.style.display = 'none';
+        }
+    });
+
+    if (editContainer.style.display !== 'flex') {
+        // 显示编辑界面
+        textSpan.style.display = 'none';
+        btn.style.display = 'none';
+        editContainer.style.display = 'flex';
+        input.value = textSpan.textContent.trim();
+        input.focus();
+    }
+}
+
+function saveProjectInfo(btn, field) {
+    const input = btn.previousElementSibling;
+    const newValue = input.value.trim();
+    const infoItem = btn.closest('.info-item');
+    const textSpan = infoItem.querySelector('.info-text');
+    const editBtn = infoItem.querySelector('.edit-info-btn');
+    const editContainer = infoItem.querySelector('.edit-container');
+    
+    if (!newValue) {
+        alert('请输入有效的信息');
+        return;
+    }
+    
+    fetch(`/update_project_info/${projectId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            field: field,
+            value: newValue
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // 更新显示的文本
+            textSpan.textContent = newValue;
+            // 隐藏编辑界面
+            textSpan.style.display = '';
+            editBtn.style.display = '';
+            editContainer.style.display = 'none';
+            
+            // 如果是修改项目ID，需要刷新页面
+            if (field === 'id') {
+                window.location.href = `/project_history?project_id=${newValue}`;
+            }
+        } else {
+            alert('保存失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('保存失败，请重试');
+    });
+}
+
+// 点击其他地方关闭编辑界面
+document.addEventListener('click', function(e) {
+    if (!e.target.closest('.info-item')) {
+        document.querySelectorAll('.edit-container').forEach(container => {
+            if (container.style.display === 'flex') {
+                const infoItem = container.closest('.info-item');
+                const textSpan = infoItem.querySelector('.info-text');
+                const editBtn = infoItem.querySelector('.edit-info-btn');
+                
+                textSpan.style.display = '';
+                editBtn.style.display = '';
+                container.style.display = 'none';
+            }
+        });
+    }
+});
+
+// 添加输入监听以示/隐保存按钮
+document.querySelectorAll('.info-input').forEach(input => {
+    input.addEventListener('input', function() {
+        const saveBtn = this.nextElementSibling;
+        saveBtn.style.visibility = 'visible';
+        saveBtn.style.opacity = '1';
+    });
+});
+
+function editRecord(recordId) {
+    const record = document.querySelector(`.history-item[data-record-id="${recordId}"]`);
+    const description = record.querySelector('.history-description');
+    const valueChange = record.querySelector('.value-change');
+    const actions = record.querySelector('.record-actions');
+    
+    // 保存原始内容
+    description.dataset.originalContent = description.textContent;
+    if (valueChange) {
+        const oldValue = valueChange.querySelector('.old-value');
+        const newValue = valueChange.querySelector('.new-value');
+        if (oldValue) oldValue.dataset.originalContent = oldValue.textContent;
+        if (newValue) newValue.dataset.originalContent = newValue.textContent;
+        
+        // 使更新前后的值可编辑
+        if (oldValue) oldValue.contentEditable = 'true';
+        if (newValue) newValue.contentEditable = 'true';
+    }
+    
+    // 进入编辑状态
+    description.contentEditable = true;
+    description.focus();
+    
+    // 修改编辑按钮为确认按钮
+    const editBtn = actions.querySelector('.edit-record-btn');
+    editBtn.innerHTML = '<i class="fas fa-check"></i>';
+    editBtn.onclick = () => saveRecord(recordId);
+    editBtn.title = '确认';
+}
+
+function saveRecord(recordId) {
+    const record = document.querySelector(`.history-item[data-record-id="${recordId}"]`);
+    const description = record.querySelector('.history-description');
+    const valueChange = record.querySelector('.value-change');
+    const actions = record.querySelector('.record-actions');
+    
+    let data = {
+        description: description.textContent.trim()
+    };
+    
+    // 如果有更新前后的值，也保存它们
+    if (valueChange) {
+        const oldValue = valueChange.querySelector('.old-value');
+        const newValue = valueChange.querySelector('.new-value');
+        if (oldValue) data.old_value = oldValue.textContent.trim();
+        if (newValue) data.new_value = newValue.textContent.trim();
+    }
+    
+    console.log('Saving record:', data);
+    
+    fetch(`/update_record/${recordId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(data => {
+        console.log('Save response:', data);
+        if (data.success) {
+            // 退出编辑状态
+            description.contentEditable = false;
+            if (valueChange) {
+                const oldValue = valueChange.querySelector('.old-value');
+                const newValue = valueChange.querySelector('.new-value');
+                if (oldValue) oldValue.contentEditable = false;
+                if (newValue) newValue.contentEditable = false;
+                // 更新显示的更新前后的值
+                if (oldValue) oldValue.textContent = data.old_value || oldValue.textContent;
+                if (newValue) newValue.textContent = data.new_value || newValue.textContent;
+            }
+            // 恢复编辑按钮
+            const editBtn = actions.querySelector('.edit-record-btn');
+            editBtn.innerHTML = '<i class="fas fa-edit"></i>';
+            editBtn.onclick = () => {
+                // 移除之前的事件监听器
+                editBtn.onclick = null;
+                // 添加新的事���监听器
+                editRecord(recordId);
+            };
+            editBtn.title = '编辑';
+            // 保存成功后更新显示的内容
+            description.textContent = data.description;
+        } else {
+            alert('保存失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('保存失败，请重试');
+    });
+}
+
+function cancelEdit(recordId) {
+    const record = document.querySelector(`.history-item[data-record-id="${recordId}"]`);
+    const description = record.querySelector('.history-description');
+    const valueChange = record.querySelector('.value-change');
+    const actions = record.querySelector('.record-actions');
+    const saveActions = record.querySelector('.edit-save-actions');
+    
+    // 恢复原始内容
+    description.textContent = description.dataset.originalContent;
+    if (valueChange) {
+        const oldValue = valueChange.querySelector('.old-value');
+        const newValue = valueChange.querySelector('.new-value');
+        if (oldValue) {
+            oldValue.textContent = oldValue.dataset.originalContent;
+            oldValue.contentEditable = false;
+        }
+        if (newValue) {
+            newValue.textContent = newValue.dataset.originalContent;
+            newValue.contentEditable = false;
+        }
+    }
+    
+    // 退出编辑状态
+    description.contentEditable = false;
+    actions.style.display = 'flex';
+    if (saveActions) saveActions.remove();
+}
+
+function deleteRecord(recordId) {
+    if (confirm('确定要删除这条记录吗？此操作不可恢复。')) {
+        fetch(`/delete_record/${recordId}`, {
+            method: 'POST'
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                const record = document.querySelector(`.history-item[data-record-id="${recordId}"]`);
+                record.remove();
+            } else {
+                alert('删除失败，请重试');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('删除失败，请重试');
+        });
+    }
+}
+
+function exportProjectRecord() {
+    window.location.href = `/export_project_record/${projectId}`;
+}
+
+function saveEdit(element, field, newValue) {
+    // 保存原值用于失败时恢复
+    const originalValue = element.dataset.originalValue;
+    
+    if (!newValue.trim()) {
+        alert('请输入有效的信息');
+        return;
+    }
+    
+    fetch(`/update_project_info/${projectId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            field: field,
+            value: newValue
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            // 更新显示的文本
+            element.textContent = newValue;
+            
+            // 如果是修改项目ID，需要刷新页面
+            if (field === 'id') {
+                window.location.href = `/project_history?project_id=${newValue}`;
+            }
+        } else {
+            alert('保存失败，请重试');
+            element.textContent = originalValue;
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('保存失败，请重试');
+        element.textContent = originalValue;
+    });
+}
+
+function makeEditable(element, field, type) {
+    // 如果已经在编辑状态，则返回
+    if (element.querySelector('input, select')) return;
+    
+    // 保存原始值
+    element.dataset.originalValue = element.textContent.trim();
+    
+    const currentValue = element.textContent;
+    let input;
+    
+    if (type === 'select' && field === 'stage') {
+        input = document.createElement('select');
+        const stages = [
+            "当前方案支撑", "现场察", "客户沟通", "IP规划及方案确认",
+            "设备安装", "设备调测", "业务联", "验收", "项目结款",
+            "尾款结算", "日常维护", "故障处理"
+        ];
+        
+        stages.forEach(stage => {
+            const option = document.createElement('option');
+            option.value = stage;
+            option.textContent = stage;
+            if (stage === currentValue.trim()) option.selected = true;
+            input.appendChild(option);
+        });
+    } else {
+        input = document.createElement('input');
+        input.type = type;
+        input.value = currentValue.trim();
+    }
+    
+    input.className = 'edit-input';
+    
+    // ��建编辑容器
+    const editContainer = document.createElement('div');
+    editContainer.className = 'edit-container';
+    editContainer.style.display = 'flex';
+    editContainer.style.alignItems = 'center';
+    editContainer.style.gap = '5px';
+    
+    // 添加输入框到容器
+    editContainer.appendChild(input);
+    
+    // 创建保存按钮
+    const saveBtn = document.createElement('button');
+    saveBtn.textContent = '保存';
+    saveBtn.className = 'save-btn';
+    saveBtn.onclick = () => saveEdit(element, field, input.value);
+    editContainer.appendChild(saveBtn);
+    
+    // 创建取消按钮
+    const cancelBtn = document.createElement('button');
+    cancelBtn.textContent = '取消';
+    cancelBtn.className = 'cancel-btn';
+    cancelBtn.onclick = () => cancelEdit(element, element.dataset.originalValue);
+    editContainer.appendChild(cancelBtn);
+    
+    // 清空原内容并添加编辑容器
+    element.textContent = '';
+    element.appendChild(editContainer);
+    
+    // 聚焦输入框
+    input.focus();
+}
+
+function cancelEdit(element, originalValue) {
+    if (originalValue) {
+        element.textContent = originalValue;
+    }
+}
+
+function saveDeviceField(btn, deviceId, field) {
+    const input = btn.previousElementSibling;
+    const value = input.value.trim();
+    const row = btn.closest('tr');
+    const deviceType = row.closest('.device-table').querySelector('h5').textContent.trim();
+    
+    if (!value && (field === 'name' || field === 'model')) {
+        alert('请填写设备名称和型号');
+        return;
+    }
+
+    const data = {
+        type: deviceType,
+        [field]: value
+    };
+
+    // 如果是分流设备，需要特殊处理板卡信息
+    if (deviceType === '分流设备' && (field === 'mec_10g' || field === 'ge_optical' || field === 'electrical')) {
+        data.card_type = field;
+        data.card_quantity = value;
+    }
+
+    fetch(`/update_device/${deviceId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            input.classList.remove('edited');
+            btn.style.display = 'none';
+            alert('保存成功');
+        } else {
+            alert('保存失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('保存失败，请重试');
+    });
+}
+
+// 添加输入监听件
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.device-input').forEach(input => {
+        input.addEventListener('input', function() {
+            this.classList.add('edited');
+        });
+
+        input.addEventListener('focus', function() {
+            const saveBtn = this.nextElementSibling;
+            if (saveBtn) saveBtn.style.display = 'inline-block';
+        });
+
+        input.addEventListener('blur', function() {
+            const saveBtn = this.nextElementSibling;
+            if (saveBtn && !this.classList.contains('edited')) {
+                saveBtn.style.display = 'none';
+            }
+        });
+    });
+});
+
+// 添加设备
+function addDevice(deviceType) {
+    // 修改选择器的写法
+    const deviceTable = Array.from(document.querySelectorAll('.device-table')).find(
+        table => table.querySelector('h5').textContent.trim() === deviceType
+    );
+    if (!deviceTable) {
+        console.error('找不到对应的设备表格:', deviceType);
+        return;
+    }
+    
+    const tbody = deviceTable.querySelector('table tbody');
+    const row = document.createElement('tr');
+    
+    if (deviceType === '分流设备') {
+        row.innerHTML = `
+            <td><input type="text" class="device-input" data-field="name" placeholder="设备名称"></td>
+            <td><input type="text" class="device-input" data-field="model" placeholder="设备型号"></td>
+            <td><input type="number" class="device-input" data-field="mec_10g" value="0" min="0"></td>
+            <td><input type="number" class="device-input" data-field="ge_optical" value="0" min="0"></td>
+            <td><input type="number" class="device-input" data-field="electrical" value="0" min="0"></td>
+            <td>
+                <div class="device-actions">
+                    <button onclick="saveDevice(this)" class="save-btn">保存</button>
+                    <button onclick="deleteDevice(this)" class="delete-btn">删除</button>
+                </div>
+            </td>
+        `;
+    } else {
+        row.innerHTML = `
+            <td><input type="text" class="device-input" data-field="name" placeholder="设备名称"></td>
+            <td><input type="text" class="device-input" data-field="model" placeholder="设备型号"></td>
+            <td><input type="number" class="device-input" data-field="card_quantity" value="0" min="0"></td>
+            <td>
+                <div class="device-actions">
+                    <button onclick="saveDevice(this)" class="save-btn">保存</button>
+                    <button onclick="deleteDevice(this)" class="delete-btn">删除</button>
+                </div>
+            </td>
+        `;
+    }
+    
+    tbody.appendChild(row);
+}
+
+// 保存设备信
+function saveDevice(btn) {
+    const row = btn.closest('tr');
+    const deviceId = row.dataset.id;
+    const deviceType = row.closest('.device-table').querySelector('h5').textContent.trim();
+    const inputs = row.querySelectorAll('.device-input');
+    
+    let data = {
+        type: deviceType,
+        name: '',
+        model: ''
+    };
+    
+    inputs.forEach(input => {
+        const field = input.dataset.field;
+        if (field === 'name' || field === 'model') {
+            data[field] = input.value.trim();
+        } else if (deviceType === '分流设备') {
+            if (!data.cards) data.cards = {};
+            data.cards[field] = parseInt(input.value) || 0;
+        } else {
+            data.card_quantity = parseInt(input.value) || 0;
+        }
+    });
+    
+    // 验证必填字段
+    if (!data.name || !data.model) {
+        alert('请填写设备名称和型号');
+        return;
+    }
+    
+    const url = deviceId ? 
+        `/update_device/${deviceId}` : 
+        `/add_device/${projectId}`;
+    
+    fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data)
+    })
+    .then(response => response.json())
+    .then(result => {
+        if (result.success) {
+            location.reload();
+        } else {
+            alert('保存失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('保存失败，请重试');
+    });
+}
+
+// 删除设备
+function deleteDevice(btn) {
+    const row = btn.closest('tr');
+    const deviceId = row.dataset.id;
+    
+    if (!deviceId) {
+        row.remove();
+        return;
+    }
+    
+    if (confirm('确定要删除这条设备信息吗？此操作不可恢复。')) {
+        fetch(`/delete_device/${deviceId}`, {
+            method: 'POST'
+        })
+        .then(response => response.json())
+        .then(result => {
+            if (result.success) {
+                row.remove();
+            } else {
+                alert('删除失败，请重试');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('删除失败，请重试');
+        });
+    }
+}
@@ -0,0 +1,106 @@
+function loadDailyReport() {
+    const date = document.getElementById('reportDate').value;
+    if (!date) {
+        alert('请选择日期');
+        return;
+    }
+    
+    fetch(`/get_daily_report/${date}`)
+        .then(response => response.json())
+        .then(data => {
+            const reportContent = document.getElementById('reportContent');
+            if (data.success && data.report) {
+                reportContent.innerHTML = `<pre>${data.report.content}</pre>`;
+            } else {
+                reportContent.innerHTML = '<p>该日工作记录</p>';
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            document.getElementById('reportContent').innerHTML = '<p>加载失败，请重试</p>';
+        });
+}
+
+function closeReportModal() {
+    document.getElementById('reportModal').style.display = 'none';
+}
+
+function showReportModal() {
+    const modal = document.getElementById('reportModal');
+    const today = new Date().toISOString().split('T')[0];
+    document.getElementById('reportDate').value = today;
+    modal.style.display = 'block';
+    loadDailyReport();  // 自动加载今天的日报
+}
+
+// 点击模态框外部关闭
+window.onclick = function(event) {
+    const modal = document.getElementById('reportModal');
+    if (event.target == modal) {
+        modal.style.display = 'none';
+    }
+}
+
+// 添加项目时联想已有客户名称，并提示可能重复的客户
+function setupClientSuggest() {
+    const form = document.getElementById('addProjectForm');
+    if (!form) {
+        return;
+    }
+    const input = form.querySelector('input[name="client_name"]');
+    const datalist = document.getElementById('clientSuggestions');
+    const hint = document.getElementById('clientDuplicateHint');
+    const confirmField = form.querySelector('input[name="confirm_duplicate"]');
+    // 服务器已提示重复时表单中是确认复选框，由用户勾选，不再弹出确认框
+    const confirmedByCheckbox = confirmField.type === 'checkbox';
+    let duplicates = [];
+    let timer = null;
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        if (!confirmedByCheckbox) {
+            confirmField.value = '';
+        }
+        timer = setTimeout(() => {
+            const query = input.value.trim();
+            if (!query) {
+                datalist.innerHTML = '';
+                hint.textContent = '';
+                duplicates = [];
+                return;
+            }
+            fetch(`/api/projects/suggest?q=${encodeURIComponent(query)}`)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success || input.value.trim() !== query) {
+                        return;
+                    }
+                    datalist.innerHTML = '';
+                    data.suggestions.forEach(item => {
+                        const option = document.createElement('option');
+                        option.value = item.client_name;
+                        option.label = `ID ${item.id}`;
+                        datalist.appendChild(option);
+                    });
+                    duplicates = data.suggestions.filter(item => item.duplicate);
+                    hint.textContent = duplicates.length
+                        ? '客户可能已存在：' + duplicates.map(item => `${item.client_name}（ID ${item.id}）`).join('、')
+                        : '';
+                })
+                .catch(error => console.error('Error:', error));
+        }, 150);
+    });
+
+    form.addEventListener('submit', event => {
+        if (confirmedByCheckbox || !duplicates.length || confirmField.value) {
+            return;
+        }
+        if (confirm(`${hint.textContent}\n确定仍要添加该项目吗？`)) {
+            confirmField.value = '1';
+        } else {
+            event.preventDefault();
+        }
+    });
+}
+
+document.addEventListener('DOMContentLoaded', setupClientSuggest);
@@ -10,7 +10,7 @@ function updateProjectState(projectId, newState) {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            location.reload();
+            refreshDashboard();
         } else {
             alert('状态更新失败，不允许此转');
             // 重置选择到原来的状态
@@ -36,7 +36,7 @@ function completeProject(projectId) {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                location.reload();
+                refreshDashboard();
             } else {
                 alert('完成项目失败，请重试');
             }
@@ -60,7 +60,7 @@ function updateProjectStage(projectId, newStage) {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            location.reload();
+            refreshDashboard();
         }
     });
 }
@@ -77,7 +77,7 @@ function updateProjectStatus(projectId, newStatus) {
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            location.reload();
+            refreshDashboard();
         }
     });
 }
@@ -137,6 +137,7 @@ function saveProjectStatus(input, projectId) {
             
             // 显示保存成功的提示
             showToast('状态已更新');
+            refreshDashboard();
         } else {
             showToast('保存失败，请重试', 'error');
         }
@@ -322,4 +323,304 @@ function completeTask(taskId, btn) {
         console.error('Error:', error);
         alert('完成任务失败，请重试');
     });
-} 
\ No newline at end of file
+}
+
+// 批量完成选中的任务
+function batchCompleteTasks() {
+    const selected = Array.from(document.querySelectorAll('.task-select:checked'));
+    if (selected.length === 0) {
+        alert('请先选择任务');
+        return;
+    }
+
+    const completionNote = prompt('完成说明（可选）：', '');
+    if (completionNote === null) {
+        return;
+    }
+
+    fetch('/tasks/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            action: 'complete',
+            task_ids: selected.map(input => parseInt(input.value, 10)),
+            note: completionNote
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            location.reload();
+        } else {
+            alert(data.error || '批量完成任务失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('批量完成任务失败，请重试');
+    });
+}
+
+// 分页加载更多任务
+function loadMoreTasks(button) {
+    const cursor = button.dataset.cursor;
+    button.disabled = true;
+
+    fetch(`/api/tasks?cursor=${encodeURIComponent(cursor)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                alert('加载任务失败，请重试');
+                button.disabled = false;
+                return;
+            }
+
+            const container = document.querySelector('.tasks');
+            data.tasks.forEach(task => container.appendChild(renderTask(task)));
+
+            if (data.next_cursor) {
+                button.dataset.cursor = data.next_cursor;
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('加载任务失败，请重试');
+            button.disabled = false;
+        });
+}
+
+// 生成任务元素，结构与 index.html 中的任务列表一致
+function renderTask(task) {
+    const priorityClass = task.priority === 3 ? 'high' : task.priority === 2 ? 'medium' : 'low';
+    const priorityText = task.priority === 3 ? '高' : task.priority === 2 ? '中' : '低';
+
+    const element = document.createElement('div');
+    element.className = 'task';
+    element.id = `task-${task.id}`;
+    element.innerHTML = `
+        <div class="task-info">
+            <input type="checkbox" class="task-select" value="${task.id}">
+            <span></span>
+            <span></span>
+            <span class="priority-${priorityClass}">优先级: ${priorityText}</span>
+        </div>
+        <div class="task-time">
+            <span>开始: ${task.start_time}</span>
+            <div class="task-actions">
+                <textarea class="completion-note" placeholder="请输入完成说明..."></textarea>
+                <div class="task-buttons">
+                    <a href="#" onclick="completeTask('${task.id}', this); return false;" class="complete-btn">完成</a>
+                </div>
+            </div>
+        </div>`;
+
+    // 任务内容使用 textContent，避免注入 HTML
+    const spans = element.querySelectorAll('.task-info span');
+    spans[0].textContent = task.project_id ? `项目ID: ${task.project_id}` : '临时任务';
+    spans[1].textContent = `内容: ${task.content}`;
+    return element;
+}
+
+// 停用周期任务
+function deleteTaskTemplate(templateId) {
+    if (!confirm('确定要停用此周期任务吗？')) {
+        return;
+    }
+
+    fetch(`/delete_task_template/${templateId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            document.getElementById(`template-${templateId}`).remove();
+        } else {
+            alert('停用周期任务失败，请重试');
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        alert('停用周期任务失败，请重试');
+    });
+}
+
+// 项目状态与所在列表的对应关系
+const PROJECT_CONTAINERS = {
+    active: 'activeProjects',
+    recent_inactive: 'maintenanceProjects',
+    long_inactive: 'expiredProjects'
+};
+
+// 增量刷新看板：只获取上次版本之后变更的项目
+function refreshDashboard() {
+    const version = document.body.dataset.dashboardVersion || '';
+
+    return fetch(`/api/dashboard/delta?since=${encodeURIComponent(version)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                applyDashboardDelta(data);
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            location.reload();
+        });
+}
+
+// 将变更的项目行和统计数据更新到页面
+function applyDashboardDelta(data) {
+    data.projects.forEach(project => {
+        const existing = document.querySelector(`.project[data-project-id="${project.id}"]`);
+        if (existing) {
+            existing.remove();
+        }
+
+        // 已完成的项目不在看板列表中显示
+        const containerId = PROJECT_CONTAINERS[project.state];
+        if (!project.html || !containerId) {
+            return;
+        }
+
+        // 按最后更新时间倒序，新变更的项目放在表头之后
+        const template = document.createElement('template');
+        template.innerHTML = project.html.trim();
+        const header = document.getElementById(containerId).querySelector('.project-header');
+        header.after(template.content.firstElementChild);
+    });
+
+    Object.entries(data.stats).forEach(([key, value]) => {
+        if (key === 'stages') {
+            return;
+        }
+        const element = document.querySelector(`[data-stat="${key}"]`);
+        if (element) {
+            element.textContent = value;
+        }
+    });
+
+    document.querySelectorAll('[data-stage]').forEach(element => {
+        element.textContent = data.stats.stages[element.dataset.stage] || 0;
+    });
+
+    document.body.dataset.dashboardVersion = data.version;
+}
+
+// 重新加载任务列表第一页
+function refreshTasks() {
+    return fetch('/api/tasks')
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                return;
+            }
+
+            const container = document.querySelector('.tasks');
+            container.replaceChildren(...data.tasks.map(renderTask));
+
+            let button = document.getElementById('loadMoreTasks');
+            if (data.next_cursor) {
+                if (!button) {
+                    button = document.createElement('button');
+                    button.id = 'loadMoreTasks';
+                    button.className = 'view-reports-btn';
+                    button.textContent = '加载更多任务';
+                    button.onclick = () => loadMoreTasks(button);
+                    container.after(button);
+                }
+                button.dataset.cursor = data.next_cursor;
+            } else if (button) {
+                button.remove();
+            }
+        })
+        .catch(error => console.error('Error:', error));
+}
+
+// 合并短时间内的多次刷新请求
+let dashboardRefreshTimer = null;
+function scheduleDashboardRefresh() {
+    clearTimeout(dashboardRefreshTimer);
+    dashboardRefreshTimer = setTimeout(refreshDashboard, 300);
+}
+
+// 推送不可用（服务器连接数已满或浏览器不支持）时的轮询间隔和重新连接间隔（毫秒）
+const EVENTS_POLL_INTERVAL = 30000;
+const EVENTS_RETRY_INTERVAL = 60000;
+let eventsPollTimer = null;
+
+// 定时轮询看板和任务，代替服务器推送
+function startEventsPolling() {
+    if (eventsPollTimer) {
+        return;
+    }
+    eventsPollTimer = setInterval(() => {
+        refreshDashboard();
+        refreshTasks();
+    }, EVENTS_POLL_INTERVAL);
+}
+
+function stopEventsPolling() {
+    clearInterval(eventsPollTimer);
+    eventsPollTimer = null;
+}
+
+// 订阅服务器推送的项目和任务变更
+function connectEvents() {
+    if (!window.EventSource) {
+        startEventsPolling();
+        return;
+    }
+
+    const userId = parseInt(document.body.dataset.userId, 10);
+    const source = new EventSource('/events');
+
+    source.addEventListener('open', () => {
+        stopEventsPolling();
+    });
+
+    // 服务器返回 503（连接数已满）时浏览器不会自动重连：先轮询，稍后再尝试连接
+    source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED) {
+            startEventsPolling();
+            setTimeout(connectEvents, EVENTS_RETRY_INTERVAL);
+        }
+    });
+
+    source.addEventListener('project', event => {
+        const data = JSON.parse(event.data);
+        if (data.deleted) {
+            const row = document.querySelector(`.project[data-project-id="${data.id}"]`);
+            if (row) {
+                row.remove();
+            }
+        }
+        scheduleDashboardRefresh();
+    });
+
+    source.addEventListener('task', event => {
+        const data = JSON.parse(event.data);
+        if (data.user_ids.includes(userId)) {
+            refreshTasks();
+        }
+    });
+
+    // 事件积压被丢弃时整体刷新一次
+    source.addEventListener('resync', () => {
+        scheduleDashboardRefresh();
+        refreshTasks();
+    });
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    if (document.body.dataset.dashboardVersion !== undefined) {
+        connectEvents();
+    }
+});
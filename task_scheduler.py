@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+import logging
+import threading
+
+import maintenance
+
+logger = logging.getLogger(__name__)
+
+
+class CronRule:
+    """简化的 cron 规则：分 时 日 月 周
+
+    每个字段支持 *、*/n、a-b、a-b/n 以及逗号分隔的列表，
+    周字段 0 和 7 都表示周日。日和周同时指定时按 cron 惯例取并集。
+    """
+
+    FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    # 常用规则的别名
+    ALIASES = {
+        '@daily': '0 8 * * *',
+        '@weekdays': '0 8 * * 1-5',
+        '@weekly': '0 8 * * 1',
+        '@monthly': '0 8 1 * *'
+    }
+
+    def __init__(self, rule):
+        self.rule = rule.strip()
+        expression = self.ALIASES.get(self.rule, self.rule)
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f'周期规则格式错误：{rule}（应为"分 时 日 月 周"五个字段）')
+
+        parsed = [self._parse_field(field, low, high)
+                  for field, (low, high) in zip(fields, self.FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # cron 的周日可写作 0 或 7，统一转换为 Python 的 weekday()（周一为 0）
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self.day_restricted = fields[2] != '*'
+        self.weekday_restricted = fields[4] != '*'
+
+    def _parse_field(self, field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step_text = part.split('/', 1)
+                if not step_text.isdigit() or int(step_text) == 0:
+                    raise ValueError(f'周期规则步长错误：{field}')
+                step = int(step_text)
+
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start_text, end_text = part.split('-', 1)
+                if not (start_text.isdigit() and end_text.isdigit()):
+                    raise ValueError(f'周期规则范围错误：{field}')
+                start, end = int(start_text), int(end_text)
+            elif part.isdigit():
+                start = end = int(part)
+            else:
+                raise ValueError(f'周期规则字段错误：{field}')
+
+            if start < low or end > high or start > end:
+                raise ValueError(f'周期规则超出范围：{field}')
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches_day(self, day):
+        """判断某一天是否满足日/月/周条件"""
+        if day.month not in self.months:
+            return False
+        day_match = day.day in self.days
+        weekday_match = day.weekday() in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def latest_between(self, after, until, max_days=366):
+        """返回 (after, until] 区间内最后一个触发时间，没有则返回 None"""
+        hours = sorted(self.hours, reverse=True)
+        minutes = sorted(self.minutes, reverse=True)
+        day = until.date()
+        earliest = max(after.date(), (until - timedelta(days=max_days)).date())
+
+        while day >= earliest:
+            if self.matches_day(day):
+                for hour in hours:
+                    for minute in minutes:
+                        candidate = datetime(day.year, day.month, day.day, hour, minute)
+                        if candidate <= after:
+                            return None
+                        if candidate <= until:
+                            return candidate
+            day -= timedelta(days=1)
+        return None
+
+
+class TaskScheduler:
+    """周期任务调度线程，定期将到期的任务模板生成为任务"""
+
+    def __init__(self, manager, interval=60):
+        self.manager = manager
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='task-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self, now=None):
+        """执行一次调度，返回生成的任务数"""
+        return self.manager.materialize_due_tasks(now)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                created = self.run_once()
+                if created:
+                    logger.info("周期任务调度：生成 %d 个任务", created)
+            except Exception as e:
+                logger.exception("Error running task scheduler: %s", e)
+            self._stop_event.wait(self.interval)
+
+
+class ProjectScheduler:
+    """项目维护线程，定期按 last_updated 自动转换项目状态，并彻底删除保留期已过的已删除项目"""
+
+    def __init__(self, manager, interval=3600):
+        self.manager = manager
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='project-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_once(self, now=None):
+        """执行一次，返回自动转换状态和彻底删除的项目数"""
+        result = {
+            'aged': self.manager.age_projects(now),
+            'purged': self.manager.purge_deleted_projects(now)
+        }
+        if result['purged']:
+            # 级联删除了大量行，更新统计信息并回收空闲页
+            maintenance.refresh_after_bulk_change('purge')
+        return result
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.exception("Error running project scheduler: %s", e)
+            self._stop_event.wait(self.interval)
@@ -1,3 +1,8 @@
+import os
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_add_project')
+
 from work_manager import WorkManager
 
 def test_add_project():
@@ -0,0 +1,63 @@
+import os
+from datetime import datetime
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_archive')
+
+import pytest
+
+import archive
+from work_manager import WorkManager
+
+def test_archive_round_trip():
+    manager = WorkManager()
+    cursor = manager.db.cursor
+    manager.add_project(9301, '归档测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    cursor.execute('''
+        INSERT INTO project_history (project_id, change_type, change_time, description)
+        VALUES (9301, 'maintenance', '2000-01-02 10:00:00', '归档前的维护记录')
+    ''')
+    cursor.execute('''
+        INSERT INTO tasks (project_id, content, priority, user_id, start_time, end_time, completed)
+        VALUES (9301, '归档任务', 2, 1, '2000-01-03 09:00:00', '2000-01-03 18:00:00', 1)
+    ''')
+    cursor.execute('''
+        INSERT INTO daily_reports (report_date, content, user_id)
+        VALUES ('2000-01-05', '归档前的日报', 1)
+    ''')
+    manager.db.conn.commit()
+
+    moved = archive.run(manager.db, before=datetime(2001, 1, 1), completed_before=datetime(2000, 1, 1))
+    assert moved['project_history'] >= 1 and moved['tasks'] >= 1 and moved['daily_reports'] >= 1
+
+    # 主库中已删除，合并视图中仍然可以查到
+    assert cursor.execute("SELECT COUNT(*) FROM main.daily_reports WHERE report_date = '2000-01-05'").fetchone()[0] == 0
+    assert archive.source(cursor, 'daily_reports', '2000-01-01') == 'all_daily_reports'
+    assert archive.source(cursor, 'daily_reports', '2099-01-01') == 'daily_reports'
+    assert archive.source(cursor, 'project_history') == 'all_project_history'
+    history = manager.get_project_history(9301)
+    assert '归档前的维护记录' in [record['description'] for record in history]
+
+    # 归档数据只读：修改已归档日期的日报被拒绝，不会在主库中再插入一份
+    with pytest.raises(ValueError):
+        manager.update_daily_report('2000-01-05', '修改后的日报', 1)
+    count = cursor.execute(
+        "SELECT COUNT(*) FROM all_daily_reports WHERE report_date = '2000-01-05' AND user_id = 1"
+    ).fetchone()[0]
+    assert count == 1
+
+    # 归档范围内但没有归档日报的日期仍然可以编辑
+    assert manager.update_daily_report('2000-01-06', '补写的日报', 1)
+
+def test_renumber_and_delete_follow_archive():
+    manager = WorkManager()
+    cursor = manager.db.cursor
+    cursor.execute('''
+        INSERT INTO archive.project_history (id, project_id, change_type, change_time, description)
+        VALUES (900001, 9302, 'issue', '2000-02-01 10:00:00', '归档的故障记录')
+    ''')
+    archive.renumber_project(cursor, 9302, 9303)
+    assert cursor.execute('SELECT project_id FROM archive.project_history WHERE id = 900001').fetchone()[0] == 9303
+    archive.delete_rows(cursor, 'project_id', [9303])
+    assert cursor.execute('SELECT COUNT(*) FROM archive.project_history WHERE id = 900001').fetchone()[0] == 0
+    manager.db.conn.commit()
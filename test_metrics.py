@@ -0,0 +1,27 @@
+import os
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_metrics')
+
+from app import create_app
+from metrics import RequestMetrics
+
+def test_metrics_scrape_is_not_measured():
+    client = create_app().test_client()
+    client.get('/login')
+    client.get('/metrics')
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'endpoint="login"' in body
+    # 抓取请求不出现在耗时、状态码和并发数指标中
+    assert 'endpoint="metrics"' not in body
+
+def test_background_requests_do_not_reset_idle_clock():
+    metrics = RequestMetrics()
+    metrics._last_request -= 120
+    # 指标抓取、事件流重连、仪表盘轮询和静态资源不算用户活动
+    for endpoint in ('metrics', 'events', 'api_dashboard_delta', 'static', 'asset'):
+        metrics.request_started(endpoint)
+        metrics.request_finished(endpoint)
+    assert metrics.idle_seconds() >= 120
+    metrics.request_started('index')
+    assert metrics.idle_seconds() < 120
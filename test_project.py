@@ -1,7 +1,14 @@
+import os
 import sqlite3
 
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_project')
+
+from config.database_config import connect
+from models import Database
+
 def get_max_project_id():
-    conn = sqlite3.connect('work_management.db')
+    conn = connect()
     cursor = conn.cursor()
     cursor.execute('SELECT MAX(id) FROM projects')
     max_id = cursor.fetchone()[0]
@@ -15,7 +22,7 @@ def test_add_project():
         new_id = max_id + 1
         
         # 连接数据库
-        conn = sqlite3.connect('work_management.db')
+        conn = connect()
         cursor = conn.cursor()
         
         # 测试数据
@@ -61,4 +68,5 @@ def test_add_project():
         print(f"发生错误：{e}")
 
 if __name__ == '__main__':
+    Database()  # 创建数据表
     test_add_project() 
\ No newline at end of file
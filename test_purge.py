@@ -0,0 +1,117 @@
+import os
+from datetime import datetime, timedelta
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_purge')
+
+import maintenance
+import work_manager
+from task_scheduler import ProjectScheduler
+from work_manager import WorkManager
+
+RELATED_TABLES = ('tasks', 'project_history', 'devices', 'user_projects', 'archive.project_history')
+
+def count(manager, table, project_id):
+    return manager.db.cursor.execute(
+        f'SELECT COUNT(*) FROM {table} WHERE project_id = ?', (project_id,)).fetchone()[0]
+
+def add_related_rows(manager, project_id):
+    cursor = manager.db.cursor
+    cursor.execute('''
+        INSERT INTO tasks (project_id, content, priority, user_id, start_time, completed)
+        VALUES (?, '清理测试任务', 2, 1, CURRENT_TIMESTAMP, 0)
+    ''', (project_id,))
+    cursor.execute('''
+        INSERT INTO devices (project_id, device_type, device_name, model, card_quantity)
+        VALUES (?, '采集设备', '清理测试设备', 'X1', 1)
+    ''', (project_id,))
+    cursor.execute('INSERT OR IGNORE INTO user_projects (user_id, project_id) VALUES (1, ?)', (project_id,))
+    cursor.execute('''
+        INSERT INTO archive.project_history (project_id, change_type, change_time, description)
+        VALUES (?, 'maintenance', '2000-01-02 10:00:00', '已归档的维护记录')
+    ''', (project_id,))
+    manager.db.conn.commit()
+
+def test_soft_delete_and_restore():
+    manager = WorkManager()
+    manager.add_project(9401, '软删除测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+
+    assert manager.delete_project(9401)
+    assert not manager.get_project(9401)
+    assert 9401 not in [project['id'] for project in manager.get_all_projects()]
+    # 已删除的项目不能再次删除，也不能修改
+    assert not manager.delete_project(9401)
+    assert not manager.update_project_status(9401, '已完成')
+
+    assert manager.restore_project(9401)
+    assert manager.get_project(9401)
+    assert not manager.restore_project(9401)
+    change_types = [record['change_type'] for record in manager.get_project_history(9401)]
+    assert 'delete' in change_types and 'restore' in change_types
+
+def test_purge_cascades_after_retention():
+    manager = WorkManager()
+    manager.add_project(9402, '彻底删除测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    manager.add_project(9403, '保留期内客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    add_related_rows(manager, 9402)
+    add_related_rows(manager, 9403)
+    assert manager.delete_project(9402) and manager.delete_project(9403)
+
+    now = datetime.now()
+    expired = now - timedelta(days=work_manager.PROJECT_PURGE_DAYS + 1)
+    manager.db.cursor.execute('UPDATE projects SET deleted_at = ? WHERE id = 9402', (expired,))
+    manager.db.conn.commit()
+
+    assert manager.purge_deleted_projects(now) == 1
+    assert manager.db.cursor.execute('SELECT COUNT(*) FROM projects WHERE id = 9402').fetchone()[0] == 0
+    for table in RELATED_TABLES:
+        assert count(manager, table, 9402) == 0, table
+
+    # 保留期内的项目及其数据都还在，可以恢复
+    for table in RELATED_TABLES:
+        assert count(manager, table, 9403) > 0, table
+    assert manager.restore_project(9403)
+    assert manager.purge_deleted_projects(now + timedelta(days=work_manager.PROJECT_PURGE_DAYS + 1)) == 0
+
+def test_scheduler_refreshes_statistics_after_purge():
+    manager = WorkManager()
+    manager.add_project(9404, '调度清理测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    add_related_rows(manager, 9404)
+    assert manager.delete_project(9404)
+    now = datetime.now() + timedelta(days=work_manager.PROJECT_PURGE_DAYS + 1)
+
+    before = len([run for run in maintenance.recent_runs(100) if run['kind'] == 'purge'])
+    assert ProjectScheduler(manager).run_once(now)['purged'] >= 1
+    runs = [run for run in maintenance.recent_runs(100) if run['kind'] == 'purge']
+    assert len(runs) == before + 1
+    assert runs[0]['finished_at'] is not None
+
+def test_delete_user_keeps_tasks_and_reports():
+    manager = WorkManager()
+    manager.add_user({'username': 'purge_user_test', 'password': 'Test@123456', 'role': 'user'})
+    cursor = manager.db.cursor
+    user_id = cursor.execute('SELECT id FROM users WHERE username = ?', ('purge_user_test',)).fetchone()[0]
+    cursor.execute('''
+        INSERT INTO tasks (content, priority, user_id, start_time, completed)
+        VALUES ('离职用户的任务', 2, ?, CURRENT_TIMESTAMP, 1)
+    ''', (user_id,))
+    cursor.execute("INSERT INTO daily_reports (report_date, content, user_id) VALUES ('2026-10-01', '离职用户的日报', ?)",
+                   (user_id,))
+    cursor.execute("INSERT INTO archive.daily_reports (report_date, content, user_id) VALUES ('2000-10-01', '已归档的日报', ?)",
+                   (user_id,))
+    manager.db.conn.commit()
+    assert manager.add_task_template(None, '离职用户的周期任务', 'low', '0 8 * * *', user_id)
+
+    assert manager.delete_user(user_id)
+    assert not manager.delete_user(user_id)
+    assert user_id not in [user['id'] for user in manager.get_users()]
+    assert not manager.authenticate_user('purge_user_test', 'Test@123456')
+    # 删除的用户不能通过启用/禁用恢复
+    manager.toggle_user_status(user_id)
+    assert cursor.execute('SELECT is_active FROM users WHERE id = ?', (user_id,)).fetchone()[0] == 0
+
+    for table in ('tasks', 'daily_reports', 'archive.daily_reports'):
+        assert cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE user_id = ?', (user_id,)).fetchone()[0] == 1, table
+    assert manager.get_task_templates(user_id) == []
+    for table in ('permissions', 'user_projects'):
+        assert cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE user_id = ?', (user_id,)).fetchone()[0] == 0, table
@@ -0,0 +1,53 @@
+import os
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_query_tasks')
+
+from work_manager import WorkManager
+
+def create_user(manager, username):
+    manager.add_user({'username': username, 'password': 'Test@123456', 'role': 'user'})
+    return manager.db.cursor.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()[0]
+
+def test_cursor_pages_through_null_priority():
+    manager = WorkManager()
+    user_id = create_user(manager, 'query_tasks_test')
+    # 优先级为空的任务排在最后，分页不能漏掉也不能报错
+    for priority in (3, None, 1, 2, None, 3, 2, None):
+        manager.db.cursor.execute('''
+            INSERT INTO tasks (content, priority, user_id, start_time, completed)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP, 0)
+        ''', (f'分页任务{priority}', priority, user_id))
+    manager.db.conn.commit()
+    expected = [row[0] for row in manager.db.cursor.execute('''
+        SELECT id FROM tasks WHERE user_id = ? AND completed = 0
+        ORDER BY COALESCE(priority, 0) DESC, id
+    ''', (user_id,))]
+
+    seen = []
+    cursor = None
+    while True:
+        tasks, cursor = manager.query_tasks(user_id, cursor=cursor, limit=3)
+        seen.extend(task[0] for task in tasks)
+        if cursor is None:
+            break
+    assert seen == expected
+    assert len(seen) == 8
+    priorities = [manager.db.cursor.execute('SELECT priority FROM tasks WHERE id = ?', (task_id,)).fetchone()[0]
+                  for task_id in seen]
+    assert priorities == [3, 3, 2, 2, 1, None, None, None]
+
+def test_cursor_with_filters():
+    manager = WorkManager()
+    user_id = create_user(manager, 'query_tasks_filter')
+    for priority in (3, 3, 3, 1):
+        manager.db.cursor.execute('''
+            INSERT INTO tasks (content, priority, user_id, start_time, completed)
+            VALUES ('筛选任务', ?, ?, CURRENT_TIMESTAMP, 0)
+        ''', (priority, user_id))
+    manager.db.conn.commit()
+
+    first, cursor = manager.query_tasks(user_id, priority='high', limit=2)
+    second, last_cursor = manager.query_tasks(user_id, priority='high', cursor=cursor, limit=2)
+    assert len(first) == 2 and len(second) == 1 and last_cursor is None
+    assert {task[0] for task in first}.isdisjoint(task[0] for task in second)
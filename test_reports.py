@@ -0,0 +1,32 @@
+import os
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_reports')
+
+import pytest
+
+from app import create_app
+from work_manager import WorkManager
+
+def admin_client():
+    client = create_app().test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['role'] = 'admin'
+    return client
+
+def test_monthly_report_rejects_invalid_month():
+    manager = WorkManager()
+    for month in (0, 13):
+        with pytest.raises(ValueError):
+            manager.get_monthly_report(2026, month, 1)
+
+    client = admin_client()
+    response = client.get('/get_monthly_report/2026/13')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+    assert client.get('/get_monthly_report/0/1').status_code == 400
+
+    response = client.get('/get_monthly_report/2026/12')
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
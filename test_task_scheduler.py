@@ -0,0 +1,103 @@
+import os
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_task_scheduler')
+
+from datetime import datetime
+
+import pytest
+
+from task_scheduler import CronRule
+from work_manager import WorkManager
+
+def test_cron_fields():
+    rule = CronRule('0,30 9-17/4 * * 1-5')
+    assert rule.minutes == {0, 30}
+    assert rule.hours == {9, 13, 17}
+    # 周一至周五对应 Python 的 weekday() 0-4
+    assert rule.weekdays == {0, 1, 2, 3, 4}
+    assert CronRule('*/15 * * * *').minutes == {0, 15, 30, 45}
+    assert CronRule('@weekdays').weekdays == CronRule('0 8 * * 1-5').weekdays
+
+def test_cron_sunday_is_zero_or_seven():
+    assert CronRule('0 8 * * 0').weekdays == {6}
+    assert CronRule('0 8 * * 7').weekdays == {6}
+
+def test_cron_matches_day():
+    # 2026-10-19 是周一
+    monday = datetime(2026, 10, 19).date()
+    assert CronRule('0 8 * * 1').matches_day(monday)
+    assert not CronRule('0 8 * * 2').matches_day(monday)
+    assert not CronRule('0 8 * 11 *').matches_day(monday)
+    # 日和周同时指定时取并集
+    assert CronRule('0 8 1 * 1').matches_day(monday)
+    assert CronRule('0 8 19 * 2').matches_day(monday)
+    assert not CronRule('0 8 1 * 2').matches_day(monday)
+
+@pytest.mark.parametrize('rule', [
+    '0 8 * *', '60 8 * * *', '0 8 0 * *', '0 8 * * 8', '*/0 8 * * *', '0 17-9 * * *', '0 8 * * mon'
+])
+def test_cron_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        CronRule(rule)
+
+def test_cron_latest_between():
+    rule = CronRule('0 8 * * 1-5')
+    # 周五 9 点到下周一 7 点之间没有触发时间
+    assert rule.latest_between(datetime(2026, 10, 16, 9, 0), datetime(2026, 10, 19, 7, 0)) is None
+    # 期间多次触发时只返回最后一次
+    assert rule.latest_between(datetime(2026, 10, 12, 9, 0), datetime(2026, 10, 19, 9, 0)) == \
+        datetime(2026, 10, 19, 8, 0)
+    # 区间左开右闭
+    assert rule.latest_between(datetime(2026, 10, 19, 8, 0), datetime(2026, 10, 19, 9, 0)) is None
+    assert rule.latest_between(datetime(2026, 10, 19, 7, 0), datetime(2026, 10, 19, 8, 0)) == \
+        datetime(2026, 10, 19, 8, 0)
+
+def test_materialize_due_tasks_once():
+    manager = WorkManager()
+    manager.add_user({'username': 'task_scheduler_test', 'password': 'Test@123456', 'role': 'user'})
+    user_id = manager.db.cursor.execute(
+        'SELECT id FROM users WHERE username = ?', ('task_scheduler_test',)).fetchone()[0]
+    assert manager.add_task_template(None, '周期巡检', 'high', '0 8 * * *', user_id)
+    template_id = manager.db.cursor.execute(
+        'SELECT id FROM task_templates WHERE user_id = ?', (user_id,)).fetchone()[0]
+    manager.db.cursor.execute('UPDATE task_templates SET last_run = ? WHERE id = ?',
+                              ('2026-10-16 09:00:00', template_id))
+    manager.db.conn.commit()
+
+    now = datetime(2026, 10, 19, 9, 30)
+    # 停机期间错过的多次触发只生成一个任务
+    assert manager.materialize_due_tasks(now) == 1
+    assert manager.materialize_due_tasks(now) == 0
+    tasks = manager.db.cursor.execute(
+        'SELECT content, priority, start_time FROM tasks WHERE user_id = ?', (user_id,)).fetchall()
+    assert [tuple(task) for task in tasks] == [('周期巡检', 3, '2026-10-19 08:00:00')]
+    assert manager.db.cursor.execute('SELECT last_run FROM task_templates WHERE id = ?',
+                                     (template_id,)).fetchone()[0] == '2026-10-19 09:30:00'
+
+    # 停用的模板不再生成任务
+    assert manager.delete_task_template(template_id, user_id)
+    assert manager.materialize_due_tasks(datetime(2026, 10, 20, 9, 30)) == 0
+
+def test_materialize_skips_deleted_projects():
+    manager = WorkManager()
+    manager.add_project(9501, '周期任务删除测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    assert manager.add_task_template(9501, '项目周检', 'medium', '0 9 * * *', 1)
+    template_id = manager.db.cursor.execute(
+        'SELECT id FROM task_templates WHERE project_id = 9501').fetchone()[0]
+    manager.db.cursor.execute('UPDATE task_templates SET last_run = ? WHERE id = ?',
+                              ('2026-10-18 10:00:00', template_id))
+    manager.db.conn.commit()
+    assert manager.delete_project(9501)
+
+    # 项目删除期间不生成任务，水位也不前移
+    now = datetime(2026, 10, 19, 9, 30)
+    manager.materialize_due_tasks(now)
+    assert manager.db.cursor.execute('SELECT COUNT(*) FROM tasks WHERE project_id = 9501').fetchone()[0] == 0
+    assert manager.db.cursor.execute('SELECT last_run FROM task_templates WHERE id = ?',
+                                     (template_id,)).fetchone()[0] == '2026-10-18 10:00:00'
+
+    # 恢复后继续生成
+    assert manager.restore_project(9501)
+    manager.materialize_due_tasks(now)
+    assert manager.db.cursor.execute('SELECT COUNT(*) FROM tasks WHERE project_id = 9501').fetchone()[0] == 1
@@ -0,0 +1,120 @@
+import os
+import sqlite3
+
+# 默认使用独立的内存数据库，不修改正式数据库；设置 DATABASE_PATH 等环境变量可指定其他数据库
+os.environ.setdefault('DATABASE_MEMORY', 'test_write_queue')
+
+import pytest
+
+import write_queue as write_queue_module
+from models import Database
+from work_manager import WorkManager
+from write_queue import WriteQueue
+
+def setup_function(function):
+    db = Database()
+    db.cursor.execute('CREATE TABLE IF NOT EXISTS write_queue_test (id INTEGER PRIMARY KEY, value TEXT)')
+    db.cursor.execute('DELETE FROM write_queue_test')
+    db.conn.commit()
+
+def insert_value(value):
+    Database().cursor.execute('INSERT INTO write_queue_test (value) VALUES (?)', (value,))
+    return value
+
+def insert_and_fail(value):
+    insert_value(value)
+    raise ValueError('写入失败')
+
+def always_locked():
+    raise sqlite3.OperationalError('database is locked')
+
+def get_values():
+    return [row[0] for row in Database().cursor.execute('SELECT value FROM write_queue_test ORDER BY id')]
+
+def test_operations_keep_submit_order():
+    queue = WriteQueue(enabled=True, batch_ms=20, batch_size=5)
+    try:
+        futures = [queue.submit(insert_value, str(i)) for i in range(23)]
+        queue.flush()
+        # flush 返回时此前提交的操作都已提交
+        assert all(future.done() for future in futures)
+        assert [future.result() for future in futures] == [str(i) for i in range(23)]
+        assert get_values() == [str(i) for i in range(23)]
+        assert queue.stats()['batches'] >= 5
+    finally:
+        queue.stop()
+
+def test_failed_operation_only_rolls_back_itself():
+    queue = WriteQueue(enabled=True, batch_ms=200)
+    try:
+        first = queue.submit(insert_value, 'a')
+        failed = queue.submit(insert_and_fail, 'x')
+        last = queue.submit(insert_value, 'b')
+        queue.flush()
+        assert first.result() == 'a' and last.result() == 'b'
+        with pytest.raises(ValueError):
+            failed.result()
+        assert get_values() == ['a', 'b']
+        assert queue.stats()['errors'] == 1
+    finally:
+        queue.stop()
+
+def test_locked_batch_fails_after_retries(monkeypatch):
+    monkeypatch.setattr(write_queue_module, 'WRITE_RETRIES', 2)
+    queue = WriteQueue(enabled=True, batch_ms=200)
+    try:
+        other = queue.submit(insert_value, 'c')
+        locked = queue.submit(always_locked)
+        # 重试次数用完后整批回滚，每个调用方都收到异常
+        with pytest.raises(sqlite3.OperationalError):
+            locked.result(5)
+        with pytest.raises(sqlite3.OperationalError):
+            other.result(5)
+        assert get_values() == []
+        assert queue.stats()['errors'] == 2
+    finally:
+        queue.stop()
+
+def test_inline_mode_commits_or_rolls_back_immediately():
+    queue = WriteQueue(enabled=False)
+    assert queue.submit(insert_value, 'd').result() == 'd'
+    with pytest.raises(ValueError):
+        queue.submit(insert_and_fail, 'y').result()
+    assert get_values() == ['d']
+
+def test_maintenance_record_goes_through_queue():
+    manager = WorkManager()
+    manager.add_project(9203, '维护记录测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    manager.add_maintenance_record(9203, '更换电源').result(5)
+    history = manager.get_project_history(9203)
+    assert ('maintenance', '更换电源') in [(record['change_type'], record['description']) for record in history]
+
+    # 项目删除后提交的记录通过 Future 返回错误
+    assert manager.delete_project(9203)
+    with pytest.raises(ValueError):
+        manager.add_issue_record(9203, '设备离线').result(5)
+
+# 历史记录和日报追加属于调用方的事务，不经过写入队列
+def test_history_rolls_back_with_caller():
+    manager = WorkManager()
+    manager.add_project(9201, '写入队列测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    manager.add_history_record(9201, 'update', '未提交的修改')
+    manager.db.conn.rollback()
+    count = manager.db.cursor.execute(
+        "SELECT COUNT(*) FROM project_history WHERE project_id = 9201 AND description = '未提交的修改'"
+    ).fetchone()[0]
+    assert count == 0
+
+def test_complete_task_writes_report_in_same_transaction():
+    manager = WorkManager()
+    manager.add_project(9202, '日报测试客户', '设备安装', '进行中', '', '重庆', '张三', '13800138000')
+    assert manager.add_task(9202, '写入队列测试任务', 'high', 1)
+    task_id = manager.db.cursor.execute(
+        "SELECT MAX(id) FROM tasks WHERE content = '写入队列测试任务'"
+    ).fetchone()[0]
+    assert manager.complete_task(task_id, '已完成')
+    # 不等待写入队列，返回时日报已经写入
+    content = manager.db.cursor.execute(
+        'SELECT content FROM daily_reports WHERE user_id = 1 ORDER BY report_date DESC LIMIT 1'
+    ).fetchone()[0]
+    assert '完成任务：写入队列测试任务' in content
@@ -1,22 +1,77 @@
 from datetime import datetime, timedelta
 from models import Database
+from task_scheduler import CronRule
+from event_bus import event_bus
+from write_queue import write_queue
+from single_flight import coalesced, single_flight, SINGLE_FLIGHT_TTL
+from name_index import name_index
+import archive
+import logging
+import os
 import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 删除的项目保留多少天后彻底删除，期间可以恢复
+PROJECT_PURGE_DAYS = float(os.environ.get('PROJECT_PURGE_DAYS', '7'))
+# 进行中的项目多少天未更新自动转为维保中、合同到期退网，0 表示不自动转换
+PROJECT_RECENT_INACTIVE_DAYS = float(os.environ.get('PROJECT_RECENT_INACTIVE_DAYS', '30'))
+PROJECT_LONG_INACTIVE_DAYS = float(os.environ.get('PROJECT_LONG_INACTIVE_DAYS', '180'))
+
+_manager = None
+_manager_pid = None
+_manager_lock = threading.Lock()
+
+
+def get_manager():
+    """返回当前进程的 WorkManager
+
+    首次调用时才连接数据库并检查表结构；fork 出的子进程不复用父进程的连接，
+    在子进程中第一次调用时重新创建。
+    """
+    global _manager, _manager_pid
+    pid = os.getpid()
+    if _manager is not None and _manager_pid == pid:
+        return _manager
+    with _manager_lock:
+        if _manager is None or _manager_pid != pid:
+            if _manager_pid is not None:
+                Database.reset_connections()
+            start = time.perf_counter()
+            _manager = WorkManager()
+            _manager_pid = pid
+            logger.info("数据库初始化完成：%.1fms", (time.perf_counter() - start) * 1000)
+    return _manager
 
 class WorkManager:
     def __init__(self):
         self.db = Database()
     
+    def _publish(self, event_type, **data):
+        """事务提交后发布变更事件，推送给已连接的浏览器"""
+        if event_type == 'project':
+            single_flight.invalidate('project_statistics')
+            if data.get('deleted'):
+                # 删除或改编号后旧编号不会出现在增量同步中，本进程的索引直接移除
+                name_index.remove(data['id'])
+        try:
+            event_bus.publish(event_type, **data)
+        except Exception as e:
+            logger.exception("Error publishing %s event: %s", event_type, e)
+    
     def add_project(self, project_id, client_name, stage, status, notes, area, manager, manager_phone):
         """添加新项目"""
         try:
-            print(f"开始添加项目：ID={project_id}, 客户={client_name}")
+            logger.debug("开始添加项目：ID=%s, 客户=%s", project_id, client_name)
             
             # 验证项目ID
             if not isinstance(project_id, int):
-                print(f"项目ID类型错误：{type(project_id)}")
+                logger.debug("项目ID类型错误：%s", type(project_id))
                 raise ValueError('项目ID必须为整数')
             if project_id <= 0:
-                print(f"项目ID值无效：{project_id}")
+                logger.debug("项目ID值无效：%s", project_id)
                 raise ValueError('项目ID必须为正整数')
 
             # 验证必填字段
@@ -27,37 +82,37 @@ class WorkManager:
                 if not area: missing.append('项目区域')
                 if not manager: missing.append('项��经理')
                 if not manager_phone: missing.append('联系电话')
-                print(f"缺少必填字段：{', '.join(missing)}")
+                logger.debug("缺少必填字段：%s", ', '.join(missing))
                 raise ValueError(f'以下字段为必填项：{", ".join(missing)}')
 
             # 检查项目ID是否已存在
-            print(f"检查项目ID {project_id} 是否存在")
+            logger.debug("检查项目ID %s 是否存在", project_id)
             existing = self.db.cursor.execute(
                 'SELECT id FROM projects WHERE id = ?', 
                 (project_id,)
             ).fetchone()
             
             if existing:
-                print(f"项目ID {project_id} 已存在")
+                logger.debug("项目ID %s 已存在", project_id)
                 raise ValueError('项目ID已存在')
             
             # 添加项目
-            print(f"正在将新项目插入数据库")
+            logger.debug("正在将新项目插入数据库")
             self.db.cursor.execute('''
                 INSERT INTO projects (
                     id, client_name, stage, status, notes, 
                     created_at, last_updated, state, is_active,
                     area, manager, manager_phone
                 )
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP, 'active', 1, ?, ?, ?)
+                VALUES (?, ?, ?, ?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'), 'active', 1, ?, ?, ?)
             ''', (
                 project_id, client_name, stage, status, notes,
                 area, manager, manager_phone
             ))
             
             # 获取所有用户ID
-            print("正在为所有用户添加项目访问权限")
-            users = self.db.cursor.execute('SELECT id FROM users').fetchall()
+            logger.debug("正在为所有用户添加项目访问权限")
+            users = self.db.cursor.execute('SELECT id FROM users WHERE deleted_at IS NULL').fetchall()
             for user in users:
                 try:
                     self.db.cursor.execute('''
@@ -65,10 +120,10 @@ class WorkManager:
                         VALUES (?, ?)
                     ''', (user[0], project_id))
                 except Exception as e:
-                    print(f"为用户 {user[0]} 添加项目访问权限时出错：{e}")
+                    logger.warning("为用户 %s 添加项目访问权限时出错：%s", user[0], e)
             
             # 添加创建记录
-            print("正在添加项目创建历史记录")
+            logger.debug("正在添加项目创建历史记录")
             self.add_history_record(
                 project_id=project_id,
                 change_type='create',
@@ -76,14 +131,15 @@ class WorkManager:
             )
             
             self.db.conn.commit()
-            print(f"项目 {project_id} 添加成功")
+            self._publish('project', id=project_id)
+            logger.info("项目 %s 添加成功", project_id)
             return True
         except ValueError as e:
-            print(f"添加项目时出现 ValueError：{e}")
+            logger.info("添加项目时出现 ValueError：%s", e)
             self.db.conn.rollback()
             raise
         except Exception as e:
-            print(f"添加项目时出现错误：{e}")
+            logger.exception("添加项目时出现错误：%s", e)
             self.db.conn.rollback()
             raise ValueError(f'添加项目时出错：{str(e)}')
     
@@ -126,7 +182,7 @@ class WorkManager:
             # 添加到日报
             if project_id:
                 project_name = self.db.cursor.execute(
-                    'SELECT client_name FROM projects WHERE id = ?', 
+                    'SELECT client_name FROM projects WHERE id = ? AND deleted_at IS NULL', 
                     (project_id,)
                 ).fetchone()[0]
                 task_record = f"新建任务：{content}\n所属项目：{project_name}\n"
@@ -136,6 +192,7 @@ class WorkManager:
             self.add_task_to_report(user_id, task_record)
             
             self.db.conn.commit()
+            self._publish('task', user_ids=[user_id])
             return True
         except Exception as e:
             print(f"Error adding task: {e}")
@@ -145,19 +202,19 @@ class WorkManager:
     def get_projects_by_activity(self):
         active = self.db.cursor.execute('''
             SELECT * FROM projects 
-            WHERE state = 'active' AND is_active = 1
+            WHERE state = 'active' AND is_active = 1 AND deleted_at IS NULL
             ORDER BY last_updated DESC
         ''').fetchall()
         
         recent_inactive = self.db.cursor.execute('''
             SELECT * FROM projects 
-            WHERE state = 'recent_inactive' AND is_active = 1
+            WHERE state = 'recent_inactive' AND is_active = 1 AND deleted_at IS NULL
             ORDER BY last_updated DESC
         ''').fetchall()
         
         long_inactive = self.db.cursor.execute('''
             SELECT * FROM projects 
-            WHERE state = 'long_inactive' AND is_active = 1
+            WHERE state = 'long_inactive' AND is_active = 1 AND deleted_at IS NULL
             ORDER BY last_updated DESC
         ''').fetchall()
         
@@ -167,16 +224,117 @@ class WorkManager:
             "long_inactive": long_inactive
         }
     
+    def get_dashboard_version(self):
+        """看板版本号：项目表中最新的 last_updated 或 state_changed_at（自动转换状态的时间）"""
+        version = self.db.cursor.execute('''
+            SELECT MAX(
+                COALESCE((SELECT MAX(last_updated) FROM projects), ''),
+                COALESCE((SELECT MAX(state_changed_at) FROM projects), '')
+            )
+        ''').fetchone()[0]
+        return version or ''
+
+    def get_changed_projects(self, since, user_id=None):
+        """获取 last_updated 不早于 since 的项目，user_id 不为空时只返回该用户的项目
+
+        包括已删除（deleted_at 不为空）的项目，前端据此移除对应的行；
+        自动转换状态的项目 last_updated 不变，按 state_changed_at 返回。
+        """
+        # last_updated 有的带微秒有的只到秒，按秒比较，同一秒内的项目会重复返回
+        since = (since or '')[:19]
+        if user_id is None:
+            return self.db.cursor.execute('''
+                SELECT * FROM projects
+                WHERE last_updated >= ? OR state_changed_at >= ?
+                ORDER BY last_updated
+            ''', (since, since)).fetchall()
+        return self.db.cursor.execute('''
+            SELECT p.* FROM projects p
+            JOIN user_projects up ON p.id = up.project_id
+            WHERE up.user_id = ? AND (p.last_updated >= ? OR p.state_changed_at >= ?)
+            ORDER BY p.last_updated
+        ''', (user_id, since, since)).fetchall()
+
+    def sync_name_index(self):
+        """按看板版本号把新增、修改、删除的项目同步到客户名称索引（见 name_index.py）"""
+        version = self.get_dashboard_version()
+        if name_index.needs_reload():
+            rows = self.db.cursor.execute(
+                'SELECT id, client_name FROM projects WHERE deleted_at IS NULL'
+            ).fetchall()
+            name_index.load(rows, version)
+        elif version != name_index.version:
+            name_index.apply([
+                (project['id'], project['client_name'], project['deleted_at'] is not None)
+                for project in self.get_changed_projects(name_index.version)
+            ], version)
+
+    def suggest_clients(self, query, limit=10):
+        """客户名称联想，返回按匹配程度排序的 [{'id', 'client_name', 'score', 'duplicate'}]"""
+        self.sync_name_index()
+        duplicates = {project_id for project_id, _ in name_index.duplicates(query)}
+        return [
+            {'id': project_id, 'client_name': name, 'score': score, 'duplicate': project_id in duplicates}
+            for project_id, name, score in name_index.search(query, limit)
+        ]
+
+    def find_duplicate_clients(self, client_name, exclude_id=None):
+        """返回客户名称可能与 client_name 重复的项目 [{'id', 'client_name'}]"""
+        self.sync_name_index()
+        return [{'id': project_id, 'client_name': name}
+                for project_id, name in name_index.duplicates(client_name, exclude_id)]
+
+    def get_project_counts(self):
+        """获取项目数量统计（不含项目列表），供看板接口使用"""
+        counts = {
+            'total': 0,
+            'active': 0,
+            'recent_inactive': 0,
+            'long_inactive': 0,
+            'completed': 0,
+            'stages': {}
+        }
+
+        rows = self.db.cursor.execute('''
+            SELECT is_active, state, stage, COUNT(*)
+            FROM projects
+            WHERE deleted_at IS NULL
+            GROUP BY is_active, state, stage
+        ''').fetchall()
+
+        for is_active, state, stage, count in rows:
+            counts['total'] += count
+            if is_active == 0:  # 已完成
+                counts['completed'] += count
+                continue
+            if state in ('active', 'recent_inactive', 'long_inactive'):
+                counts[state] += count
+            counts['stages'][stage] = counts['stages'].get(stage, 0) + count
+
+        return counts
+    
     def get_today_tasks(self):
+        # 使用范围条件代替 DATE(start_time)，以便走 start_time 索引
+        today_start, tomorrow_start = self._day_bounds(datetime.now().date())
         return self.db.cursor.execute('''
             SELECT 
                 id, project_id, content, priority,
                 start_time, end_time, completed
             FROM tasks 
-            WHERE DATE(start_time) = DATE('now', 'localtime')
+            WHERE start_time >= ? AND start_time < ?
             AND completed = 0
             ORDER BY priority DESC
-        ''').fetchall()
+        ''', (today_start, tomorrow_start)).fetchall()
+
+    def _day_bounds(self, day, end_day=None):
+        """返回 [day, end_day + 1天) 的时间字符串边界，用于范围查询"""
+        if isinstance(day, str):
+            day = datetime.strptime(day, '%Y-%m-%d').date()
+        if end_day is None:
+            end_day = day
+        elif isinstance(end_day, str):
+            end_day = datetime.strptime(end_day, '%Y-%m-%d').date()
+        return day.strftime('%Y-%m-%d'), (end_day + timedelta(days=1)).strftime('%Y-%m-%d')
     
     def get_next_task_number(self, report_content):
         """获取任务序号"""
@@ -212,41 +370,13 @@ class WorkManager:
                         completion_note = ?
                     WHERE id = ?
                 ''', (completion_note, task_id))
-                
-                # 更新今日日报
-                today = datetime.now().date()
-                report = self.db.cursor.execute('''
-                    SELECT id, content FROM daily_reports 
-                    WHERE report_date = ? AND user_id = ?
-                ''', (today, task[3])).fetchone()
-                
-                # 准备任务完成记录
-                project_name = task[2] if task[2] else '临时任务'
-                task_record = (
-                    f"完成任务：{task[0]}\n"
-                    f"所属项目：{project_name}\n"
-                )
-                if completion_note:
-                    task_record += f"完成说明：{completion_note}\n"
-                task_record += "\n"
-                
-                if report:
-                    # 如果今日已有日报，在末尾添加任务记录
-                    new_content = report[1].rstrip() + "\n" + task_record
-                    self.db.cursor.execute('''
-                        UPDATE daily_reports 
-                        SET content = ?, created_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (new_content, report[0]))
-                else:
-                    # 创建新日报
-                    date_title = f"{today.strftime('%Y年%m月%d日')}工作日报\n\n"
-                    self.db.cursor.execute('''
-                        INSERT INTO daily_reports (report_date, content, user_id)
-                        VALUES (?, ?, ?)
-                    ''', (today, date_title + task_record, task[3]))
-                
+
+                # 更新今日日报，与任务状态在同一事务中提交
+                task_record = self._format_task_record('complete', task[0], task[2], completion_note)
+                self._append_today_report(task[3], [task_record])
+
                 self.db.conn.commit()
+                self._publish('task', user_ids=[task[3]])
                 return True
             return False
         except Exception as e:
@@ -259,7 +389,7 @@ class WorkManager:
         try:
             # 获取旧状态和项目名称
             project_info = self.db.cursor.execute(
-                'SELECT state, client_name FROM projects WHERE id = ?', (project_id,)
+                'SELECT state, client_name FROM projects WHERE id = ? AND deleted_at IS NULL', (project_id,)
             ).fetchone()
             
             if not project_info:
@@ -270,7 +400,7 @@ class WorkManager:
             
             self.db.cursor.execute('''
                 UPDATE projects 
-                SET state = ?, last_updated = CURRENT_TIMESTAMP
+                SET state = ?, last_updated = datetime('now', 'localtime')
                 WHERE id = ?
             ''', (new_state, project_id))
             
@@ -284,12 +414,157 @@ class WorkManager:
             )
             
             self.db.conn.commit()
+            self._publish('project', id=project_id)
             return True
         except Exception as e:
             print(f"Error updating project state: {e}")
             self.db.conn.rollback()
             return False
     
+    def age_projects(self, now=None):
+        """按 last_updated 自动转换项目状态，返回状态发生变化的项目数
+
+        进行中的项目超过 PROJECT_RECENT_INACTIVE_DAYS 天未更新转为维保中，进行中、维保中的项目
+        超过 PROJECT_LONG_INACTIVE_DAYS 天未更新转为合同到期退网，只向后转换。
+        条件走 (state, last_updated) 索引，只扫描已越过阈值的项目，状态在一条 UPDATE 中更新，
+        每个项目的 auto_state 历史记录在同一事务中批量写入。
+        自动转换不修改 last_updated，看板通过 state_changed_at 获取变更。
+        """
+        now = now or datetime.now()
+        rules = []
+        if PROJECT_LONG_INACTIVE_DAYS > 0:
+            rules.append((('active', 'recent_inactive'), now - timedelta(days=PROJECT_LONG_INACTIVE_DAYS),
+                          'long_inactive'))
+        if PROJECT_RECENT_INACTIVE_DAYS > 0:
+            rules.append((('active',), now - timedelta(days=PROJECT_RECENT_INACTIVE_DAYS),
+                          'recent_inactive'))
+        if not rules:
+            return 0
+
+        conditions = []
+        condition_params = []
+        new_state = 'CASE'
+        state_params = []
+        for states, cutoff, target in rules:
+            condition = f"(state IN ({','.join('?' * len(states))}) AND last_updated < ?)"
+            conditions.append(condition)
+            condition_params.extend([*states, cutoff])
+            new_state += f' WHEN {condition} THEN ?'
+            state_params.extend([*states, cutoff, target])
+        new_state += ' END'
+        where = f"is_active = 1 AND deleted_at IS NULL AND ({' OR '.join(conditions)})"
+
+        try:
+            self.db.cursor.execute('BEGIN IMMEDIATE')
+            changed = self.db.cursor.execute(
+                f'SELECT id, client_name, state, {new_state} FROM projects WHERE {where}',
+                state_params + condition_params
+            ).fetchall()
+            if changed:
+                self.db.cursor.execute(
+                    f'UPDATE projects SET state = {new_state}, state_changed_at = ? WHERE {where}',
+                    state_params + [now] + condition_params
+                )
+                # 每个转换的项目记录一条 auto_state 历史，与手动修改区分
+                self.add_history_records(
+                    (project_id, 'auto_state', now, self.get_state_display(old_state),
+                     self.get_state_display(state), f'项目 [{client_name}] 状态自动变更（长期未更新）')
+                    for project_id, client_name, old_state, state in changed
+                )
+            self.db.conn.commit()
+        except Exception as e:
+            logger.exception("自动转换项目状态时出错：%s", e)
+            self.db.conn.rollback()
+            return 0
+
+        if changed:
+            logger.info("自动转换 %d 个项目的状态", len(changed))
+            self._publish('project', ids=[row[0] for row in changed])
+        return len(changed)
+
+    def import_projects(self, projects, update_existing=True):
+        """在一个事务中批量写入已校验的项目（见 project_import.py），返回 (新增数, 更新数, {项目ID: 错误})
+
+        新项目为所有用户添加访问权限；已存在的项目只在内容有变化时更新，
+        项目状态、备注为空时保留原值。创建、更新历史批量写入。
+        """
+        fields = ('client_name', 'stage', 'status', 'area', 'manager', 'manager_phone', 'notes')
+        project_ids = [project['project_id'] for project in projects]
+        placeholders = ','.join('?' * len(project_ids))
+        now = datetime.now()
+        failed = {}
+        try:
+            self.db.cursor.execute('BEGIN IMMEDIATE')
+            existing = {row['id']: row for row in self.db.cursor.execute(f'''
+                SELECT id, deleted_at, {', '.join(fields)} FROM projects WHERE id IN ({placeholders})
+            ''', project_ids).fetchall()}
+
+            created, updated, history = [], [], []
+            for project in projects:
+                project_id = project['project_id']
+                current = existing.get(project_id)
+                if current is None:
+                    created.append(project)
+                    history.append((project_id, 'create', now, None, None,
+                                    f"创建项目: {project['client_name']}（批量导入）"))
+                    continue
+                if current['deleted_at'] is not None:
+                    failed[project_id] = '项目已删除，尚未彻底删除'
+                    continue
+                if not update_existing:
+                    failed[project_id] = '项目ID已存在'
+                    continue
+                values = {field: project[field] or (current[field] if field in ('status', 'notes') else '')
+                          for field in fields}
+                changes = [field for field in fields if values[field] != (current[field] or '')]
+                if changes:
+                    updated.append(values | {'project_id': project_id})
+                    history.append((
+                        project_id, 'update', now,
+                        '; '.join(f'{field}: {current[field] or ""}' for field in changes),
+                        '; '.join(f'{field}: {values[field]}' for field in changes),
+                        f"更新项目: {values['client_name']}（批量导入）"
+                    ))
+
+            self.db.cursor.executemany('''
+                INSERT INTO projects (
+                    id, client_name, stage, status, notes,
+                    created_at, last_updated, state, is_active,
+                    area, manager, manager_phone
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'active', 1, ?, ?, ?)
+            ''', [(
+                project['project_id'], project['client_name'], project['stage'], project['status'],
+                project['notes'], now, now, project['area'], project['manager'], project['manager_phone']
+            ) for project in created])
+            # 新项目对所有用户可见
+            self.db.cursor.executemany('''
+                INSERT OR IGNORE INTO user_projects (user_id, project_id)
+                SELECT id, ? FROM users WHERE deleted_at IS NULL
+            ''', [(project['project_id'],) for project in created])
+            self.db.cursor.executemany('''
+                UPDATE projects
+                SET client_name = ?, stage = ?, status = ?, area = ?, manager = ?,
+                    manager_phone = ?, notes = ?, last_updated = ?
+                WHERE id = ?
+            ''', [(
+                values['client_name'], values['stage'], values['status'], values['area'],
+                values['manager'], values['manager_phone'], values['notes'], now, values['project_id']
+            ) for values in updated])
+            if history:
+                self.add_history_records(history)
+
+            self.db.conn.commit()
+        except Exception as e:
+            logger.exception("批量导入项目时出错：%s", e)
+            self.db.conn.rollback()
+            return 0, 0, {project_id: f'写入失败：{e}' for project_id in project_ids}
+
+        changed_ids = [project['project_id'] for project in created] + [values['project_id'] for values in updated]
+        if changed_ids:
+            self._publish('project', ids=changed_ids)
+        return len(created), len(updated), failed
+
     def get_state_display(self, state):
         state_map = {
             'active': '进行中',
@@ -299,31 +574,40 @@ class WorkManager:
         return state_map.get(state, state)
     
     def add_history_record(self, project_id, change_type, description, old_value=None, new_value=None):
-        self.db.cursor.execute('''
+        """插入历史记录（不提交事务），与调用方对项目的修改一起提交或回滚"""
+        self.add_history_records([
+            (project_id, change_type, datetime.now(), old_value, new_value, description)
+        ])
+
+    def add_history_records(self, records):
+        """批量插入历史记录（不提交事务），records 为 (project_id, change_type, change_time,
+        old_value, new_value, description)"""
+        self.db.cursor.executemany('''
             INSERT INTO project_history (
                 project_id, change_type, change_time, old_value, new_value, description
             )
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (project_id, change_type, datetime.now(), old_value, new_value, description))
-        self.db.conn.commit()
+        ''', records)
     
     def add_maintenance_record(self, project_id, description):
-        self.add_history_record(
-            project_id=project_id,
-            change_type='maintenance',
-            description=description
-        )
+        """交给后台写入队列添加维护记录，返回 Future，调用方需确认写入结果"""
+        return write_queue.submit(self._add_project_record, project_id, 'maintenance', description)
     
     def add_issue_record(self, project_id, description):
-        self.add_history_record(
-            project_id=project_id,
-            change_type='issue',
-            description=description
-        )
+        """交给后台写入队列添加故障记录，返回 Future，调用方需确认写入结果"""
+        return write_queue.submit(self._add_project_record, project_id, 'issue', description)
     
+    def _add_project_record(self, project_id, change_type, description):
+        """在写入队列中添加维护或故障记录，项目不存在或已删除时抛出 ValueError"""
+        if not self.get_project(project_id):
+            raise ValueError('项目不存在或已删除')
+        self.add_history_record(project_id=project_id, change_type=change_type, description=description)
+
     def get_project_history(self, project_id=None, client_name=None):
+        # 已归档的历史记录通过视图一并查询
+        history_table = archive.source(self.db.cursor, 'project_history')
         if project_id:
-            return self.db.cursor.execute('''
+            return self.db.cursor.execute(f'''
                 SELECT 
                     h.id,
                     h.project_id,
@@ -333,13 +617,13 @@ class WorkManager:
                     h.new_value,
                     h.description,
                     p.client_name 
-                FROM project_history h
+                FROM {history_table} h
                 JOIN projects p ON h.project_id = p.id
-                WHERE h.project_id = ?
+                WHERE h.project_id = ? AND p.deleted_at IS NULL
                 ORDER BY h.change_time DESC
             ''', (project_id,)).fetchall()
         elif client_name:
-            return self.db.cursor.execute('''
+            return self.db.cursor.execute(f'''
                 SELECT 
                     h.id,
                     h.project_id,
@@ -349,44 +633,31 @@ class WorkManager:
                     h.new_value,
                     h.description,
                     p.client_name 
-                FROM project_history h
+                FROM {history_table} h
                 JOIN projects p ON h.project_id = p.id
-                WHERE p.client_name LIKE ?
+                WHERE p.client_name LIKE ? AND p.deleted_at IS NULL
                 ORDER BY h.change_time DESC
             ''', (f'%{client_name}%',)).fetchall()
     
     def get_project(self, project_id):
-        """获取项目信息，包括所有字段"""
+        """获取项目信息，包括所有字段，已删除的项目返回 None（恢复见 restore_project）"""
         project = self.db.cursor.execute('''
             SELECT id, client_name, stage, status, created_at, last_updated, 
                    notes, state, is_active, area, manager, manager_phone 
             FROM projects 
-            WHERE id = ?
+            WHERE id = ? AND deleted_at IS NULL
         ''', (project_id,)).fetchone()
         
-        if project:
-            # 将查询结果转为字典，方便访问
-            return {
-                'id': project[0],
-                'client_name': project[1],
-                'stage': project[2],
-                'status': project[3],
-                'created_at': project[4],
-                'last_updated': project[5],
-                'notes': project[6],
-                'state': project[7],
-                'is_active': project[8],
-                'area': project[9],
-                'manager': project[10],
-                'manager_phone': project[11]
-            }
-        return None
+        # sqlite3.Row 支持 project['client_name'] 和模板中的 project.client_name
+        return project
     
     def update_project_stage(self, project_id, new_stage):
         # 获取旧环节和项目名称
         project_info = self.db.cursor.execute(
-            'SELECT stage, client_name FROM projects WHERE id = ?', (project_id,)
+            'SELECT stage, client_name FROM projects WHERE id = ? AND deleted_at IS NULL', (project_id,)
         ).fetchone()
+        if not project_info:
+            return False
         old_stage = project_info[0]
         client_name = project_info[1]
         
@@ -407,12 +678,15 @@ class WorkManager:
             )
             
             self.db.conn.commit()
+            self._publish('project', id=project_id)
     
     def update_project_status(self, project_id, new_status):
         # 获取旧状态和项目名称
         project_info = self.db.cursor.execute(
-            'SELECT status, client_name FROM projects WHERE id = ?', (project_id,)
+            'SELECT status, client_name FROM projects WHERE id = ? AND deleted_at IS NULL', (project_id,)
         ).fetchone()
+        if not project_info:
+            return False
         old_status = project_info[0]
         client_name = project_info[1]
         
@@ -435,22 +709,18 @@ class WorkManager:
             self.db.conn.commit()
     
     def add_maintenance_record(self, project_id, description):
-        self.add_history_record(
-            project_id=project_id,
-            change_type='maintenance',
-            description=description
-        )
+        """交给后台写入队列添加维护记录，返回 Future，调用方需确认写入结果"""
+        return write_queue.submit(self._add_project_record, project_id, 'maintenance', description)
     
     def add_issue_record(self, project_id, description):
-        self.add_history_record(
-            project_id=project_id,
-            change_type='issue',
-            description=description
-        )
+        """交给后台写入队列添加故障记录，返回 Future，调用方需确认写入结果"""
+        return write_queue.submit(self._add_project_record, project_id, 'issue', description)
     
     def get_project_history(self, project_id=None, client_name=None):
+        # 已归档的历史记录通过视图一并查询
+        history_table = archive.source(self.db.cursor, 'project_history')
         if project_id:
-            return self.db.cursor.execute('''
+            return self.db.cursor.execute(f'''
                 SELECT 
                     h.id,
                     h.project_id,
@@ -460,13 +730,13 @@ class WorkManager:
                     h.new_value,
                     h.description,
                     p.client_name 
-                FROM project_history h
+                FROM {history_table} h
                 JOIN projects p ON h.project_id = p.id
-                WHERE h.project_id = ?
+                WHERE h.project_id = ? AND p.deleted_at IS NULL
                 ORDER BY h.change_time DESC
             ''', (project_id,)).fetchall()
         elif client_name:
-            return self.db.cursor.execute('''
+            return self.db.cursor.execute(f'''
                 SELECT 
                     h.id,
                     h.project_id,
@@ -476,9 +746,9 @@ class WorkManager:
                     h.new_value,
                     h.description,
                     p.client_name 
-                FROM project_history h
+                FROM {history_table} h
                 JOIN projects p ON h.project_id = p.id
-                WHERE p.client_name LIKE ?
+                WHERE p.client_name LIKE ? AND p.deleted_at IS NULL
                 ORDER BY h.change_time DESC
             ''', (f'%{client_name}%',)).fetchall()
     
@@ -519,11 +789,27 @@ class WorkManager:
                 'task_count': 0
             }
     
+    @coalesced('monthly_daily_reports')
+    def get_monthly_report(self, year, month, user_id):
+        """获取某月的全部日报，按日期排列，年月无效时抛出 ValueError"""
+        if not 1 <= month <= 12:
+            raise ValueError(f'月份无效：{month}')
+        first_day = datetime(year, month, 1).date()
+        next_month = datetime(year + month // 12, month % 12 + 1, 1).date()
+        reports_table = archive.source(self.db.cursor, 'daily_reports', first_day)
+        reports = self.db.cursor.execute(f'''
+            SELECT report_date, content FROM {reports_table}
+            WHERE user_id = ? AND report_date >= ? AND report_date < ?
+            ORDER BY report_date
+        ''', (user_id, first_day, next_month)).fetchall()
+        return [{'report_date': report['report_date'], 'content': report['content']} for report in reports]
+
     def get_date_range_reports(self, start_date, end_date, user_id):
         """获取指定日期范围内的日报"""
         try:
-            reports = self.db.cursor.execute("""
-                SELECT report_date, content FROM daily_reports 
+            reports_table = archive.source(self.db.cursor, 'daily_reports', start_date)
+            reports = self.db.cursor.execute(f"""
+                SELECT report_date, content FROM {reports_table} 
                 WHERE user_id = ? AND report_date BETWEEN ? AND ?
                 ORDER BY report_date DESC
             """, (user_id, start_date, end_date)).fetchall()
@@ -532,6 +818,7 @@ class WorkManager:
             print(f"Error getting date range reports: {e}")
             return None
 
+    @coalesced('weekly_report')
     def generate_weekly_report(self, year, week, user_id):
         """生成周报"""
         try:
@@ -569,6 +856,7 @@ class WorkManager:
             print(f"Error generating weekly report: {e}")
             return None
 
+    @coalesced('monthly_report')
     def generate_monthly_report(self, year, month, user_id):
         """生成月报"""
         try:
@@ -615,23 +903,90 @@ class WorkManager:
             return None
     
     def delete_project(self, project_id):
-        """删除项目"""
+        """删除项目
+
+        只标记 deleted_at，项目立即从列表和统计中消失；PROJECT_PURGE_DAYS 天后由
+        purge_deleted_projects 彻底删除，此前可以用 restore_project 恢复。
+        """
         try:
-            # 首先删除相关的历史记录
-            self.db.cursor.execute('DELETE FROM project_history WHERE project_id = ?', (project_id,))
-            # 删除相关的设备信息
-            self.db.cursor.execute('DELETE FROM project_devices WHERE project_id = ?', (project_id,))
-            # 删除相关的任务
-            self.db.cursor.execute('DELETE FROM tasks WHERE project_id = ?', (project_id,))
-            # 最后删除项目
-            self.db.cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
-            
+            project = self.db.cursor.execute(
+                'SELECT client_name FROM projects WHERE id = ? AND deleted_at IS NULL', (project_id,)
+            ).fetchone()
+            if not project:
+                return False
+
+            now = datetime.now()
+            self.db.cursor.execute(
+                'UPDATE projects SET deleted_at = ?, last_updated = ? WHERE id = ?',
+                (now, now, project_id)
+            )
+            self.add_history_record(
+                project_id=project_id,
+                change_type='delete',
+                description=f'删除项目: {project[0]}'
+            )
+
             self.db.conn.commit()
+            self._publish('project', id=project_id, deleted=True)
             return True
         except Exception as e:
             print(f"Error deleting project: {e}")
             self.db.conn.rollback()
             return False
+
+    def restore_project(self, project_id):
+        """恢复已删除但尚未彻底删除的项目"""
+        try:
+            project = self.db.cursor.execute(
+                'SELECT client_name FROM projects WHERE id = ? AND deleted_at IS NOT NULL', (project_id,)
+            ).fetchone()
+            if not project:
+                return False
+
+            self.db.cursor.execute(
+                'UPDATE projects SET deleted_at = NULL, last_updated = ? WHERE id = ?',
+                (datetime.now(), project_id)
+            )
+            self.add_history_record(
+                project_id=project_id,
+                change_type='restore',
+                description=f'恢复项目: {project[0]}'
+            )
+
+            self.db.conn.commit()
+            self._publish('project', id=project_id)
+            return True
+        except Exception as e:
+            logger.exception("恢复项目 %s 时出错：%s", project_id, e)
+            self.db.conn.rollback()
+            return False
+
+    def purge_deleted_projects(self, now=None):
+        """彻底删除软删除超过 PROJECT_PURGE_DAYS 天的项目，返回删除的项目数
+
+        任务、历史、设备和用户关联由外键级联删除；归档库不能跨库级联，一并删除。
+        所有项目在同一事务中删除。
+        """
+        before = (now or datetime.now()) - timedelta(days=PROJECT_PURGE_DAYS)
+        try:
+            self.db.cursor.execute('BEGIN IMMEDIATE')
+            project_ids = [row[0] for row in self.db.cursor.execute('''
+                SELECT id FROM projects
+                WHERE deleted_at IS NOT NULL AND deleted_at < ?
+            ''', (before,)).fetchall()]
+            if project_ids:
+                placeholders = ','.join('?' * len(project_ids))
+                archive.delete_rows(self.db.cursor, 'project_id', project_ids)
+                self.db.cursor.execute(f'DELETE FROM projects WHERE id IN ({placeholders})', project_ids)
+            self.db.conn.commit()
+        except Exception as e:
+            logger.exception("彻底删除项目时出错：%s", e)
+            self.db.conn.rollback()
+            return 0
+
+        if project_ids:
+            logger.info("已彻底删除 %d 个项目：%s", len(project_ids), project_ids)
+        return len(project_ids)
     
     def cancel_task(self, task_id, cancel_reason=''):
         """取消任务"""
@@ -653,48 +1008,149 @@ class WorkManager:
                         completion_note = ?
                     WHERE id = ?
                 ''', (cancel_reason, task_id))
-                
-                # 更新今日日报
-                today = datetime.now().date()
-                report = self.db.cursor.execute('''
-                    SELECT id, content FROM daily_reports 
-                    WHERE report_date = ? AND user_id = ?
-                ''', (today, task[3])).fetchone()
-                
-                # 准备任务取消记录
-                project_name = task[2] if task[2] else '临时任务'
-                task_record = (
-                    f"取消任务：{task[0]}\n"
-                    f"所属项目：{project_name}\n"
-                    f"取消原因：{cancel_reason}\n\n"
-                )
-                
-                if report:
-                    # 如果今日已有日报，在末尾添加任务记录
-                    new_content = report[1].rstrip() + "\n" + task_record
-                    self.db.cursor.execute('''
-                        UPDATE daily_reports 
-                        SET content = ?, created_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (new_content, report[0]))
-                else:
-                    # 创建新日报
-                    date_title = f"{today.strftime('%Y年%m月%d日')}工作日报\n\n"
-                    self.db.cursor.execute('''
-                        INSERT INTO daily_reports (report_date, content, user_id)
-                        VALUES (?, ?, ?)
-                    ''', (today, date_title + task_record, task[3]))
-                
+
+                # 更新今日日报，与任务状态在同一事务中提交
+                task_record = self._format_task_record('cancel', task[0], task[2], cancel_reason)
+                self._append_today_report(task[3], [task_record])
+
                 self.db.conn.commit()
+                self._publish('task', user_ids=[task[3]])
                 return True
             return False
         except Exception as e:
             print(f"Error canceling task: {e}")
             self.db.conn.rollback()
             return False
+
+    def batch_update_tasks(self, task_ids, action, note='', assignee_id=None, user_id=None):
+        """批量完成/取消/转交任务，任务更新和日报在同一事务中提交
+
+        user_id 不为 None 时只处理该用户自己的任务（管理员传 None 可处理所有任务），
+        转交的接收人必须是已启用的用户。每个受影响用户的日报只追加一次。返回实际处理的任务数。
+        """
+        if action not in ('complete', 'cancel', 'reassign'):
+            raise ValueError('不支持的批量操作')
+        if action == 'reassign':
+            if not assignee_id:
+                raise ValueError('转交任务需要指定接收人')
+            assignee_id = int(assignee_id)
+            assignee = self.db.cursor.execute(
+                'SELECT id FROM users WHERE id = ? AND is_active = 1', (assignee_id,)
+            ).fetchone()
+            if not assignee:
+                raise ValueError('接收人不存在或已停用')
+
+        task_ids = list({int(task_id) for task_id in task_ids})
+        if not task_ids:
+            return 0
+
+        try:
+            placeholders = ','.join('?' * len(task_ids))
+            # 普通用户只能处理自己的任务，查询和更新都限定任务所有人
+            owner_params = [] if user_id is None else [user_id]
+            task_owner_condition = 'AND t.user_id = ?' if owner_params else ''
+            owner_condition = 'AND user_id = ?' if owner_params else ''
+
+            # 一次查询所有未完成的任务
+            tasks = self.db.cursor.execute(f'''
+                SELECT t.id, t.content, p.client_name, t.user_id
+                FROM tasks t
+                LEFT JOIN projects p ON t.project_id = p.id
+                WHERE t.id IN ({placeholders}) AND t.completed = 0 {task_owner_condition}
+            ''', task_ids + owner_params).fetchall()
+
+            if not tasks:
+                return 0
+
+            open_ids = [task[0] for task in tasks]
+            placeholders = ','.join('?' * len(open_ids))
+
+            # 一条语句更新所有任务
+            if action == 'reassign':
+                self.db.cursor.execute(f'''
+                    UPDATE tasks SET user_id = ?
+                    WHERE id IN ({placeholders}) AND completed = 0 {owner_condition}
+                ''', [assignee_id] + open_ids + owner_params)
+            else:
+                completed = 1 if action == 'complete' else 2
+                self.db.cursor.execute(f'''
+                    UPDATE tasks
+                    SET completed = ?,
+                        end_time = CURRENT_TIMESTAMP,
+                        completion_note = ?
+                    WHERE id IN ({placeholders}) AND completed = 0 {owner_condition}
+                ''', [completed, note] + open_ids + owner_params)
+
+            # 按用户汇总日报记录
+            records_by_user = {}
+            for task in tasks:
+                report_user = assignee_id if action == 'reassign' else task[3]
+                records_by_user.setdefault(report_user, []).append(
+                    self._format_task_record(action, task[1], task[2], note)
+                )
+
+            for user_id, records in records_by_user.items():
+                self._append_today_report(user_id, records)
+
+            self.db.conn.commit()
+            self._publish('task', user_ids=sorted({task[3] for task in tasks} | set(records_by_user)))
+            return len(open_ids)
+        except Exception as e:
+            logger.exception("批量操作任务（%s）时出错：%s", action, e)
+            self.db.conn.rollback()
+            return 0
+
+    def _format_task_record(self, action, content, project_name, note=''):
+        """生成写入日报的任务记录"""
+        project_name = project_name if project_name else '临时任务'
+        if action == 'complete':
+            task_record = (
+                f"完成任务：{content}\n"
+                f"所属项目：{project_name}\n"
+            )
+            if note:
+                task_record += f"完成说明：{note}\n"
+        elif action == 'cancel':
+            task_record = (
+                f"取消任务：{content}\n"
+                f"所属项目：{project_name}\n"
+                f"取消原因：{note}\n"
+            )
+        else:
+            task_record = (
+                f"接收任务：{content}\n"
+                f"所属项目：{project_name}\n"
+            )
+        return task_record + "\n"
+
+    def _append_today_report(self, user_id, task_records):
+        """将任务记录追加到用户今日日报（不提交事务）"""
+        today = datetime.now().date()
+        report = self.db.cursor.execute('''
+            SELECT id, content FROM daily_reports
+            WHERE report_date = ? AND user_id = ?
+        ''', (today, user_id)).fetchone()
+
+        records = ''.join(task_records)
+        if report:
+            # 如果今日已有日报，在末尾添加任务记录
+            new_content = report[1].rstrip() + "\n" + records
+            self.db.cursor.execute('''
+                UPDATE daily_reports
+                SET content = ?, created_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (new_content, report[0]))
+        else:
+            # 创建新日报
+            date_title = f"{today.strftime('%Y年%m月%d日')}工作日报\n\n"
+            self.db.cursor.execute('''
+                INSERT INTO daily_reports (report_date, content, user_id)
+                VALUES (?, ?, ?)
+            ''', (today, date_title + records, user_id))
     
+    @coalesced('project_statistics', ttl=SINGLE_FLIGHT_TTL)
     def get_project_statistics(self):
-        """获取项目统计信息"""
+        """获取项目统计信息，并发调用合并执行，结果短时间内复用，调用方不能修改"""
         stats = {
             'total': {'count': 0, 'projects': []},
             'active': {'count': 0, 'projects': []},
@@ -708,6 +1164,7 @@ class WorkManager:
         all_projects = self.db.cursor.execute('''
             SELECT id, client_name, state, stage, is_active 
             FROM projects
+            WHERE deleted_at IS NULL
         ''').fetchall()
         
         for project in all_projects:
@@ -741,6 +1198,8 @@ class WorkManager:
     def add_device_info(self, project_id, device_info):
         """添加设备信息"""
         try:
+            if not self.get_project(project_id):
+                return False
             for device in device_info:
                 if device['type'] == '分流设备':
                     self.db.cursor.execute('''
@@ -782,29 +1241,14 @@ class WorkManager:
     def get_project_devices(self, project_id):
         """获取项目的设备信息"""
         try:
-            devices = self.db.cursor.execute('''
-                SELECT id, device_type, device_name, model,
+            # 板卡字段按设备类型使用：分流设备用 mec_10g/ge_optical/electrical，其余用 card_quantity
+            return self.db.cursor.execute('''
+                SELECT id, device_type AS type, device_name AS name, model,
                        mec_10g, ge_optical, electrical, card_quantity
                 FROM devices 
                 WHERE project_id = ?
                 ORDER BY device_type, id
             ''', (project_id,)).fetchall()
-            
-            if not devices:
-                return []
-            
-            return [{
-                'id': device[0],
-                'type': device[1],
-                'name': device[2],
-                'model': device[3],
-                'cards': {
-                    'mec_10g': device[4],
-                    'ge_optical': device[5],
-                    'electrical': device[6]
-                } if device[1] == '分流设备' else None,
-                'card_quantity': device[7] if device[1] != '分流设备' else None
-            } for device in devices]
         except Exception as e:
             print(f"Error getting project devices: {e}")
             return []
@@ -873,6 +1317,7 @@ class WorkManager:
         try:
             # 如果是更新ID需要检查新ID是否已存在
             if field == 'id':
+                value = int(value)
                 existing = self.db.cursor.execute(
                     'SELECT id FROM projects WHERE id = ?', 
                     (value,)
@@ -880,32 +1325,21 @@ class WorkManager:
                 if existing:
                     raise ValueError("新项目ID已存在")
 
-            # 获取旧值用于历史记录
+            # 获取旧值用于历史记录，已删除的项目需先恢复
             old_value = self.db.cursor.execute(
-                f'SELECT {field} FROM projects WHERE id = ?', 
+                f'SELECT {field} FROM projects WHERE id = ? AND deleted_at IS NULL', 
                 (project_id,)
-            ).fetchone()[0]
+            ).fetchone()
+            if old_value is None:
+                raise ValueError("项目不存在或已删除")
+            old_value = old_value[0]
             
-            # 更新项目信息
+            # 更新项目ID时，任务、历史、设备和用户关联由外键级联更新，
+            # 归档库不能跨库级联，单独更新
             if field == 'id':
-                # 更新项目ID需要同时更新相关
-                self.db.cursor.execute('''
-                    UPDATE project_history 
-                    SET project_id = ? 
-                    WHERE project_id = ?
-                ''', (value, project_id))
-                
-                self.db.cursor.execute('''
-                    UPDATE project_devices 
-                    SET project_id = ? 
-                    WHERE project_id = ?
-                ''', (value, project_id))
-                
-                self.db.cursor.execute('''
-                    UPDATE tasks 
-                    SET project_id = ? 
-                    WHERE project_id = ?
-                ''', (value, project_id))
+                # 先写完队列中按旧编号提交的维护和故障记录，改编号后旧编号不再满足外键
+                write_queue.flush()
+                archive.renumber_project(self.db.cursor, project_id, value)
 
             # 更新主表
             self.db.cursor.execute(f'''
@@ -916,7 +1350,7 @@ class WorkManager:
             
             # 添加更新记录到历史表
             self.add_history_record(
-                project_id=project_id,
+                project_id=value if field == 'id' else project_id,
                 change_type='update',
                 description=f'更新项目{field}',
                 old_value=str(old_value),
@@ -924,6 +1358,11 @@ class WorkManager:
             )
             
             self.db.conn.commit()
+            if field == 'id':
+                self._publish('project', id=project_id, deleted=True)
+                self._publish('project', id=value)
+            else:
+                self._publish('project', id=project_id)
             return True
         except Exception as e:
             print(f"Error updating project info: {e}")
@@ -933,35 +1372,35 @@ class WorkManager:
     def complete_project(self, project_id):
         """完成项目"""
         try:
-            print(f"尝试完成项目 {project_id}")
+            logger.debug("尝试完成项目 %s", project_id)
             
-            # 检查项目是否存在且未完成
+            # 检查项目是否存在（未删除）且未完成
             project = self.db.cursor.execute('''
                 SELECT client_name, is_active 
                 FROM projects 
-                WHERE id = ?
+                WHERE id = ? AND deleted_at IS NULL
             ''', (project_id,)).fetchone()
             
             if not project:
-                print(f"项目 {project_id} 不存在")
+                logger.info("项目 %s 不存在", project_id)
                 return False
                 
             if project[1] == 0:
-                print(f"项目 {project_id} 已经完成")
+                logger.info("项目 %s 已经完成", project_id)
                 return False
             
-            print(f"找到项目：{project[0]}")
+            logger.debug("找到项目：%s", project[0])
             
             # 更新项目状态
             self.db.cursor.execute('''
                 UPDATE projects 
                 SET is_active = 0, 
-                    last_updated = CURRENT_TIMESTAMP,
+                    last_updated = datetime('now', 'localtime'),
                     state = 'completed'
                 WHERE id = ?
             ''', (project_id,))
             
-            print(f"已更新项目状态为完成")
+            logger.debug("已更新项目状态为完成")
             
             # 添加完成记录
             self.add_history_record(
@@ -970,14 +1409,15 @@ class WorkManager:
                 description=f'项目完成: {project[0]}'
             )
             
-            print(f"已添加完成记录")
+            logger.debug("已添加完成记录")
             
             self.db.conn.commit()
-            print(f"项目 {project_id} ({project[0]}) 已成功完成")
+            self._publish('project', id=project_id)
+            logger.info("项目 %s (%s) 已成功完成", project_id, project[0])
             return True
             
         except Exception as e:
-            print(f"完成项目 {project_id} 时出错：{e}")
+            logger.exception("完成项目 %s 时出错：%s", project_id, e)
             self.db.conn.rollback()
             return False
     
@@ -1060,27 +1500,76 @@ class WorkManager:
             WHERE user_id = ? AND completed = 0
             ORDER BY priority DESC
         ''', (user_id,)).fetchall()
+
+    def query_tasks(self, user_id, project_id=None, priority=None,
+                    start_date=None, end_date=None, cursor=None, limit=50):
+        """分页查询用户未完成的任务
+
+        按 (priority DESC, id) 做键集分页，优先级为空的任务视为 0 排在最后，
+        cursor 为上一页返回的 "priority:id" 字符串。返回 (任务列表, 下一页cursor)，
+        没有更多数据时 cursor 为 None。
+        """
+        conditions = ['user_id = ?', 'completed = 0']
+        params = [user_id]
+
+        if project_id == 'none':
+            # 临时任务和日常工作
+            conditions.append('project_id IS NULL')
+        elif project_id:
+            conditions.append('project_id = ?')
+            params.append(int(project_id))
+
+        if priority:
+            priority_map = {'high': 3, 'medium': 2, 'low': 1}
+            conditions.append('priority = ?')
+            params.append(priority_map.get(priority) or int(priority))
+
+        if start_date or end_date:
+            lower, upper = self._day_bounds(start_date or '1970-01-01', end_date or '9998-12-31')
+            conditions.append('start_time >= ? AND start_time < ?')
+            params.extend([lower, upper])
+
+        if cursor:
+            last_priority, last_id = (int(value) for value in cursor.split(':'))
+            conditions.append('(COALESCE(priority, 0) < ? OR (COALESCE(priority, 0) = ? AND id > ?))')
+            params.extend([last_priority, last_priority, last_id])
+
+        limit = max(1, min(int(limit), 200))
+        tasks = self.db.cursor.execute(f'''
+            SELECT id, project_id, content, priority,
+                   start_time, end_time, completed
+            FROM tasks
+            WHERE {' AND '.join(conditions)}
+            ORDER BY COALESCE(priority, 0) DESC, id
+            LIMIT ?
+        ''', params + [limit + 1]).fetchall()
+
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            next_cursor = f"{tasks[-1][3] or 0}:{tasks[-1][0]}"
+        return tasks, next_cursor
     
     def get_user_projects(self, user_id):
         """获取用户的项目"""
         active = self.db.cursor.execute('''
             SELECT p.* FROM projects p
             JOIN user_projects up ON p.id = up.project_id
-            WHERE up.user_id = ? AND p.state = 'active' AND p.is_active = 1
+            WHERE up.user_id = ? AND p.state = 'active' AND p.is_active = 1 AND p.deleted_at IS NULL
             ORDER BY p.last_updated DESC
         ''', (user_id,)).fetchall()
         
         recent_inactive = self.db.cursor.execute('''
             SELECT p.* FROM projects p
             JOIN user_projects up ON p.id = up.project_id
-            WHERE up.user_id = ? AND p.state = 'recent_inactive' AND p.is_active = 1
+            WHERE up.user_id = ? AND p.state = 'recent_inactive' AND p.is_active = 1 AND p.deleted_at IS NULL
             ORDER BY p.last_updated DESC
         ''', (user_id,)).fetchall()
         
         long_inactive = self.db.cursor.execute('''
             SELECT p.* FROM projects p
             JOIN user_projects up ON p.id = up.project_id
-            WHERE up.user_id = ? AND p.state = 'long_inactive' AND p.is_active = 1
+            WHERE up.user_id = ? AND p.state = 'long_inactive' AND p.is_active = 1 AND p.deleted_at IS NULL
             ORDER BY p.last_updated DESC
         ''', (user_id,)).fetchall()
         
@@ -1092,21 +1581,12 @@ class WorkManager:
     
     def get_users(self):
         """获取所有用户列表"""
-        users = self.db.cursor.execute('''
+        return self.db.cursor.execute('''
             SELECT id, username, role, created_at, last_login, is_active 
             FROM users
+            WHERE deleted_at IS NULL
             ORDER BY created_at DESC
         ''').fetchall()
-        
-        # 将元组转换为字典列表
-        return [{
-            'id': user[0],
-            'username': user[1],
-            'role': user[2],
-            'created_at': user[3],
-            'last_login': user[4],
-            'is_active': user[5]
-        } for user in users]
     
     def add_user(self, data):
         """添加新用户"""
@@ -1142,7 +1622,7 @@ class WorkManager:
             # 为新用户添加所有现有项目的访问权限
             self.db.cursor.execute('''
                 INSERT INTO user_projects (user_id, project_id)
-                SELECT ?, id FROM projects
+                SELECT ?, id FROM projects WHERE deleted_at IS NULL
             ''', (user_id,))
             
             self.db.conn.commit()
@@ -1180,7 +1660,7 @@ class WorkManager:
             self.db.cursor.execute('''
                 UPDATE users 
                 SET is_active = NOT is_active 
-                WHERE id = ? AND username != 'liusw'
+                WHERE id = ? AND username != 'liusw' AND deleted_at IS NULL
             ''', (user_id,))
             self.db.conn.commit()
             return True
@@ -1190,21 +1670,26 @@ class WorkManager:
             return False
     
     def delete_user(self, user_id):
-        """删除用户"""
+        """删除用户
+
+        只标记 deleted_at 并停用账号，用户的任务和日报（包括归档库中的）都保留；
+        权限和项目访问权限删除，周期任务模板停用。用户名不能再用于新用户。
+        """
         try:
             # 检查是否是超级管理员
             user = self.db.cursor.execute(
-                'SELECT username FROM users WHERE id = ?', 
+                'SELECT username FROM users WHERE id = ? AND deleted_at IS NULL', 
                 (user_id,)
             ).fetchone()
             
             if user and user[0] != 'liusw':
-                # 删除用户的权限
+                self.db.cursor.execute(
+                    'UPDATE users SET is_active = 0, deleted_at = ? WHERE id = ?',
+                    (datetime.now(), user_id)
+                )
                 self.db.cursor.execute('DELETE FROM permissions WHERE user_id = ?', (user_id,))
-                # 删除用户的项目访问权限
                 self.db.cursor.execute('DELETE FROM user_projects WHERE user_id = ?', (user_id,))
-                # 删除用户
-                self.db.cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
+                self.db.cursor.execute('UPDATE task_templates SET is_active = 0 WHERE user_id = ?', (user_id,))
                 self.db.conn.commit()
                 return True
             return False
@@ -1246,7 +1731,7 @@ class WorkManager:
         """重新激活已完成的项目"""
         try:
             project = self.db.cursor.execute(
-                'SELECT client_name, is_active FROM projects WHERE id = ?', 
+                'SELECT client_name, is_active FROM projects WHERE id = ? AND deleted_at IS NULL', 
                 (project_id,)
             ).fetchone()
             
@@ -1255,7 +1740,7 @@ class WorkManager:
                     UPDATE projects 
                     SET is_active = 1,
                         state = ?,
-                        last_updated = CURRENT_TIMESTAMP
+                        last_updated = datetime('now', 'localtime')
                     WHERE id = ?
                 ''', (state, project_id))
                 
@@ -1269,6 +1754,7 @@ class WorkManager:
                 )
                 
                 self.db.conn.commit()
+                self._publish('project', id=project_id)
                 return True
             return False
         except Exception as e:
@@ -1279,39 +1765,28 @@ class WorkManager:
     def get_all_projects(self):
         """获取所有项目"""
         try:
-            print("\n开始获取所有项目...")
+            logger.debug("开始获取所有项目")
             
             # 获取所有项目，按最后更新时间排序
             query = '''
                 SELECT id, client_name, stage, status, created_at, 
-                       last_updated, state, is_active, area
+                       last_updated, state, is_active,
+                       COALESCE(NULLIF(area, ''), '未分类') AS area
                 FROM projects
+                WHERE deleted_at IS NULL
                 ORDER BY last_updated DESC
             '''
-            print(f"执行查询：{query}")
+            logger.debug("执行查询：%s", query)
             
             projects = self.db.cursor.execute(query).fetchall()
-            print(f"查询到 {len(projects)} 个项目")
-            
-            result = [{
-                'id': p[0],
-                'client_name': p[1],
-                'stage': p[2],
-                'status': p[3],
-                'created_at': p[4],
-                'last_updated': p[5],
-                'state': p[6],
-                'is_active': p[7],
-                'area': p[8] if p[8] else '未分类'
-            } for p in projects]
-            
-            return result
+            logger.debug("查询到 %d 个项目", len(projects))
+            return projects
         except Exception as e:
-            print(f"获取所有项目时出错：{str(e)}")
+            logger.exception("获取所有项目时出错：%s", e)
             return []
     
     def add_task_to_report(self, user_id, task_record):
-        """添加任务记录到日报"""
+        """添加任务记录到今日日报（不提交事务）"""
         today = datetime.now().date()
         report = self.db.cursor.execute('''
             SELECT id, content FROM daily_reports 
@@ -1338,7 +1813,7 @@ class WorkManager:
         """获取项目当前状态"""
         try:
             status = self.db.cursor.execute('''
-                SELECT status FROM projects WHERE id = ?
+                SELECT status FROM projects WHERE id = ? AND deleted_at IS NULL
             ''', (project_id,)).fetchone()
             
             return status[0] if status else None
@@ -1354,7 +1829,7 @@ class WorkManager:
             
             # 获取项目名称用于历史记录
             project = self.db.cursor.execute('''
-                SELECT client_name FROM projects WHERE id = ?
+                SELECT client_name FROM projects WHERE id = ? AND deleted_at IS NULL
             ''', (project_id,)).fetchone()
             
             if not project:
@@ -1363,7 +1838,7 @@ class WorkManager:
             # 更新状态
             self.db.cursor.execute('''
                 UPDATE projects 
-                SET status = ?, last_updated = CURRENT_TIMESTAMP
+                SET status = ?, last_updated = datetime('now', 'localtime')
                 WHERE id = ?
             ''', (new_status, project_id))
             
@@ -1378,6 +1853,7 @@ class WorkManager:
                 )
             
             self.db.conn.commit()
+            self._publish('project', id=project_id)
             return True
         except Exception as e:
             print(f"Error updating project status: {e}")
@@ -1388,14 +1864,16 @@ class WorkManager:
         """获取指定日期的任务列表"""
         try:
             cursor = self.db.cursor
-            cursor.execute("""
+            day_start, day_end = self._day_bounds(date)
+            tasks_table = archive.source(cursor, 'tasks', day_start)
+            cursor.execute(f"""
                 SELECT t.project_id, t.content, t.completed, t.completion_note,
                        p.client_name as project_name
-                FROM tasks t
+                FROM {tasks_table} t
                 LEFT JOIN projects p ON t.project_id = p.id
-                WHERE t.user_id = ? AND date(t.start_time) = date(?)
+                WHERE t.user_id = ? AND t.start_time >= ? AND t.start_time < ?
                 ORDER BY t.start_time
-            """, (user_id, date))
+            """, (user_id, day_start, day_end))
             
             tasks = []
             for row in cursor.fetchall():
@@ -1434,32 +1912,24 @@ class WorkManager:
                 # 获取已完成的项目
                 projects = self.db.cursor.execute('''
                     SELECT id, client_name, stage, status, created_at, 
-                           last_updated, state, is_active, area
+                           last_updated, state, is_active,
+                           COALESCE(NULLIF(area, ''), '未分类') AS area
                     FROM projects
-                    WHERE is_active = 0
+                    WHERE is_active = 0 AND deleted_at IS NULL
                     ORDER BY last_updated DESC
                 ''').fetchall()
             else:
                 # 获取指定状态的项目
                 projects = self.db.cursor.execute('''
                     SELECT id, client_name, stage, status, created_at, 
-                           last_updated, state, is_active, area
+                           last_updated, state, is_active,
+                           COALESCE(NULLIF(area, ''), '未分类') AS area
                     FROM projects
-                    WHERE state = ? AND is_active = 1
+                    WHERE state = ? AND is_active = 1 AND deleted_at IS NULL
                     ORDER BY last_updated DESC
                 ''', (state,)).fetchall()
             
-            return [{
-                'id': p[0],
-                'client_name': p[1],
-                'stage': p[2],
-                'status': p[3],
-                'created_at': p[4],
-                'last_updated': p[5],
-                'state': p[6],
-                'is_active': p[7],
-                'area': p[8] if p[8] else '未分类'
-            } for p in projects]
+            return projects
         except Exception as e:
             print(f"Error getting projects by state: {e}")
             return []
@@ -1504,9 +1974,9 @@ class WorkManager:
                 content += f"设备名称：{device['name']}\n"
                 content += f"设备型号：{device['model']}\n"
                 if device['type'] == '分流设备':
-                    content += f"万兆光卡：{device['cards']['mec_10g']}\n"
-                    content += f"千兆光卡：{device['cards']['ge_optical']}\n"
-                    content += f"口卡：{device['cards']['electrical']}\n"
+                    content += f"万兆光卡：{device['mec_10g']}\n"
+                    content += f"千兆光卡：{device['ge_optical']}\n"
+                    content += f"口卡：{device['electrical']}\n"
                 else:
                     content += f"业务板卡数量：{device['card_quantity']}\n"
                 content += "\n"
@@ -1515,12 +1985,11 @@ class WorkManager:
             content += "历史记录：\n"
             content += "-" * 20 + "\n"
             for record in history:
-                # 使用索引访问元组中的值
-                change_time = record[3]  # change_time 在索引 3
-                change_type = record[2]  # change_type 在索引 2
-                description = record[6]  # description 在索引 6
-                old_value = record[4]    # old_value 在索引 4
-                new_value = record[5]    # new_value 在索引 5
+                change_time = record['change_time']
+                change_type = record['change_type']
+                description = record['description']
+                old_value = record['old_value']
+                new_value = record['new_value']
                 
                 content += f"时间：{change_time}\n"
                 content += f"类型：{change_type}\n"
@@ -1537,7 +2006,13 @@ class WorkManager:
             return None
     
     def update_daily_report(self, date, content, user_id):
-        """更新日报内容"""
+        """更新日报内容
+
+        归档数据只读：该日期的日报已移到归档库时抛出 ValueError，
+        否则会在主库中再插入一份，合并视图中出现两份日报。
+        """
+        if self.is_daily_report_archived(date, user_id):
+            raise ValueError('该日期的日报已归档，不能修改')
         try:
             with self.db.get_connection() as conn:
                 cursor = conn.cursor()
@@ -1572,6 +2047,15 @@ class WorkManager:
             print(f"Error updating daily report: {e}")
             return False
     
+    def is_daily_report_archived(self, date, user_id):
+        """该用户该日期的日报是否已在归档库中"""
+        if archive.source(self.db.cursor, 'daily_reports', date) == 'daily_reports':
+            # 日期晚于已归档的数据
+            return False
+        return self.db.cursor.execute('''
+            SELECT 1 FROM archive.daily_reports WHERE report_date = ? AND user_id = ?
+        ''', (date, user_id)).fetchone() is not None
+
     def create_project(self, project_data):
         """创建新项目"""
         try:
@@ -1579,7 +2063,7 @@ class WorkManager:
                 INSERT INTO projects (
                     client_name, stage, status, notes, area,
                     created_at, last_updated
-                ) VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ) VALUES (?, ?, ?, ?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'))
             ''', (
                 project_data['client_name'],
                 project_data.get('stage', ''),
@@ -1587,7 +2071,9 @@ class WorkManager:
                 project_data.get('notes', ''),
                 project_data.get('area', '未分类')
             ))
+            project_id = self.db.cursor.lastrowid
             self.db.conn.commit()
+            self._publish('project', id=project_id)
             return True
         except Exception as e:
             print(f"Error creating project: {e}")
@@ -1603,8 +2089,8 @@ class WorkManager:
                     status = ?,
                     notes = ?,
                     area = ?,
-                    last_updated = CURRENT_TIMESTAMP
-                WHERE id = ?
+                    last_updated = datetime('now', 'localtime')
+                WHERE id = ? AND deleted_at IS NULL
             ''', (
                 project_data['client_name'],
                 project_data.get('stage', ''),
@@ -1613,8 +2099,146 @@ class WorkManager:
                 project_data.get('area', '未分类'),
                 project_id
             ))
+            if self.db.cursor.rowcount == 0:
+                return False
             self.db.conn.commit()
+            self._publish('project', id=project_id)
             return True
         except Exception as e:
             print(f"Error updating project: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    def add_task_template(self, project_id, content, priority, rule, user_id):
+        """添加周期任务模板"""
+        try:
+            CronRule(rule)  # 校验规则格式
+
+            if not project_id or project_id in ('daily', '0'):
+                project_id = None
+            else:
+                project_id = int(project_id)
+
+            priority_map = {
+                'high': 3,
+                'medium': 2,
+                'low': 1
+            }
+            priority_value = priority_map.get(priority, 2)
+
+            # 水位从创建时间开始，之前的触发时间不补生成
+            self.db.cursor.execute('''
+                INSERT INTO task_templates (
+                    user_id, project_id, content, priority, rule, last_run
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (
+                user_id, project_id, content, priority_value, rule.strip(),
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            ))
+            self.db.conn.commit()
+            return True
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.exception("添加周期任务模板时出错：%s", e)
+            self.db.conn.rollback()
+            return False
+    
+    def get_task_templates(self, user_id):
+        """获取用户的周期任务模板"""
+        return self.db.cursor.execute('''
+            SELECT t.id, t.project_id,
+                   COALESCE(NULLIF(p.client_name, ''), '临时任务') AS project_name,
+                   t.content, t.priority, t.rule, t.last_run
+            FROM task_templates t
+            LEFT JOIN projects p ON t.project_id = p.id
+            WHERE t.user_id = ? AND t.is_active = 1
+            ORDER BY t.id
+        ''', (user_id,)).fetchall()
+    
+    def delete_task_template(self, template_id, user_id):
+        """停用周期任务模板"""
+        try:
+            deleted = self.db.cursor.execute('''
+                UPDATE task_templates SET is_active = 0
+                WHERE id = ? AND user_id = ?
+            ''', (template_id, user_id)).rowcount
+            self.db.conn.commit()
+            return deleted > 0
+        except Exception as e:
+            logger.exception("停用周期任务模板 %s 时出错：%s", template_id, e)
+            self.db.conn.rollback()
+            return False
+    
+    def materialize_due_tasks(self, now=None):
+        """将到期的周期任务模板生成为任务，返回生成的任务数
+
+        每个模板以 last_run 为水位，只处理 (last_run, now] 区间内的触发时间，
+        期间多次触发（如服务停机）只生成一个任务。所属项目已删除的模板暂停生成，
+        项目恢复后继续。水位更新与任务插入在同一
+        事务中完成，水位更新使用比较交换，多个进程同时调度也不会重复生成。
+        """
+        now = (now or datetime.now()).replace(second=0, microsecond=0)
+        now_text = now.strftime('%Y-%m-%d %H:%M:%S')
+
+        templates = self.db.cursor.execute('''
+            SELECT t.id, t.user_id, t.project_id, t.content, t.priority,
+                   t.rule, t.last_run, p.client_name
+            FROM task_templates t
+            LEFT JOIN projects p ON t.project_id = p.id
+            WHERE t.is_active = 1 AND (t.last_run IS NULL OR t.last_run < ?)
+              AND (t.project_id IS NULL OR p.deleted_at IS NULL)
+        ''', (now_text,)).fetchall()
+
+        due = []
+        for template in templates:
+            try:
+                rule = CronRule(template[5])
+                watermark = datetime.fromisoformat(template[6]) if template[6] else now - timedelta(minutes=1)
+                occurrence = rule.latest_between(watermark, now)
+            except ValueError as e:
+                logger.warning("周期任务模板 %s 规则无效：%s", template[0], e)
+                continue
+            if occurrence:
+                due.append((template, occurrence))
+
+        if not due:
+            return 0
+
+        try:
+            new_tasks = []
+            for template, occurrence in due:
+                claimed = self.db.cursor.execute('''
+                    UPDATE task_templates SET last_run = ?
+                    WHERE id = ? AND last_run IS ?
+                ''', (now_text, template[0], template[6])).rowcount
+                if claimed:
+                    new_tasks.append((template, occurrence))
+
+            # 批量插入任务
+            self.db.cursor.executemany('''
+                INSERT INTO tasks (
+                    project_id, content, priority, user_id,
+                    start_time, completed
+                )
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', [
+                (template[2], template[3], template[4], template[1], occurrence)
+                for template, occurrence in new_tasks
+            ])
+
+            # 与手动添加任务一样写入日报
+            for template, occurrence in new_tasks:
+                if template[2]:
+                    task_record = f"新建任务：{template[3]}\n所属项目：{template[7]}\n"
+                else:
+                    task_record = f"新建任务：{template[3]}\n类型：周期任务\n"
+                self.add_task_to_report(template[1], task_record)
+
+            self.db.conn.commit()
+            self._publish('task', user_ids=sorted({template[1] for template, _ in new_tasks}))
+            return len(new_tasks)
+        except Exception as e:
+            logger.exception("Error materializing recurring tasks: %s", e)
+            self.db.conn.rollback()
+            return 0
\ No newline at end of file
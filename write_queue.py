@@ -0,0 +1,192 @@
+"""后台写入队列
+
+维护记录、故障记录这类独立追加、不属于其他事务的写操作交给一个专用的写线程执行：
+写线程把几毫秒内提交的操作合并到一个事务中提交，不再由各个请求线程分别提交。
+
+项目、任务修改时产生的历史记录和日报追加必须与修改一起提交或回滚，
+仍在调用方的事务中写入，不经过队列。
+
+submit() 返回 concurrent.futures.Future，调用方应调用 future.result() 确认写入结果，
+否则失败只记录在日志中；操作在写线程中通过 Database 的线程连接执行，
+不能自己 commit/rollback。单个操作失败只回滚该操作（SAVEPOINT），
+不影响同一批次的其他操作。
+
+WRITE_QUEUE=0 时在调用线程中立即执行并提交，便于调试。
+"""
+import atexit
+from concurrent.futures import Future
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from models import Database
+
+logger = logging.getLogger(__name__)
+
+WRITE_QUEUE_ENABLED = os.environ.get('WRITE_QUEUE', '1') != '0'
+# 合并写入的时间窗口（毫秒）和每个事务的最大操作数
+WRITE_BATCH_MS = 5
+WRITE_BATCH_SIZE = 200
+# 数据库被锁定时整批重试的次数
+WRITE_RETRIES = 5
+# 需要确认写入结果时的默认等待时间（秒）
+WRITE_TIMEOUT = float(os.environ.get('WRITE_TIMEOUT', '10'))
+
+_STOP = object()
+
+
+class WriteQueue:
+    """单写线程的写入队列，按时间窗口合并事务"""
+
+    def __init__(self, enabled=WRITE_QUEUE_ENABLED, batch_ms=WRITE_BATCH_MS, batch_size=WRITE_BATCH_SIZE):
+        self.enabled = enabled
+        self.batch_seconds = batch_ms / 1000
+        self.batch_size = batch_size
+        self.batches = 0
+        self.operations = 0
+        self.errors = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """提交写操作，返回 Future，结果为 func 的返回值"""
+        future = Future()
+        if not self.enabled:
+            self._run_inline(future, func, args, kwargs)
+            return future
+        self._ensure_started()
+        self._queue.put((func, args, kwargs, future))
+        return future
+
+    def flush(self, timeout=WRITE_TIMEOUT):
+        """等待此前提交的操作全部写入"""
+        self.submit(lambda: None).result(timeout)
+
+    def stop(self, timeout=5):
+        """写完队列中剩余的操作后停止写线程"""
+        with self._lock:
+            thread = self._thread
+            if thread is None or self._pid != os.getpid():
+                return
+            self._queue.put(_STOP)
+            self._thread = None
+        thread.join(timeout)
+
+    def stats(self):
+        return {
+            'depth': self._queue.qsize(),
+            'batches': self.batches,
+            'operations': self.operations,
+            'errors': self.errors
+        }
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != pid:
+                if self._pid != pid:
+                    # fork 出的子进程不继承父进程的写线程和队列
+                    self._queue = queue.Queue()
+                self._pid = pid
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+
+    def _run_inline(self, future, func, args, kwargs):
+        db = Database()
+        try:
+            result = func(*args, **kwargs)
+            db.conn.commit()
+        except Exception as e:
+            db.conn.rollback()
+            self.errors += 1
+            future.set_exception(e)
+        else:
+            self.operations += 1
+            future.set_result(result)
+
+    def _run(self):
+        db = Database()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(db, batch)
+
+    def _write_batch(self, db, batch):
+        """在一个事务中执行一批操作，提交成功后再通知调用方
+
+        数据库被锁定时回滚整批操作并稍后重试。
+        """
+        batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                outcomes = self._execute_batch(db, batch)
+                break
+            except Exception as e:
+                db.conn.rollback()
+                if _is_locked(e) and attempt < WRITE_RETRIES:
+                    time.sleep(0.01 * 2 ** attempt)
+                    continue
+                logger.exception("后台写入事务提交失败：%s", e)
+                self.errors += len(batch)
+                for _, _, _, future in batch:
+                    future.set_exception(e)
+                return
+
+        self.batches += 1
+        for future, result, error in outcomes:
+            if error is None:
+                self.operations += 1
+                future.set_result(result)
+            else:
+                self.errors += 1
+                future.set_exception(error)
+
+    def _execute_batch(self, db, batch):
+        cursor = db.cursor
+        outcomes = []
+        cursor.execute('BEGIN IMMEDIATE')
+        for func, args, kwargs, future in batch:
+            cursor.execute('SAVEPOINT write_op')
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if _is_locked(e):
+                    raise
+                cursor.execute('ROLLBACK TO write_op')
+                cursor.execute('RELEASE write_op')
+                logger.exception("后台写入操作 %s 失败：%s", getattr(func, '__name__', func), e)
+                outcomes.append((future, None, e))
+            else:
+                cursor.execute('RELEASE write_op')
+                outcomes.append((future, result, None))
+        db.conn.commit()
+        return outcomes
+
+
+def _is_locked(error):
+    return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+
+write_queue = WriteQueue()
+atexit.register(write_queue.stop)
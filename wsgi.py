@@ -0,0 +1,63 @@
+"""生产环境 WSGI 入口
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+开发调试仍使用 main.py，其中同样调用 start_worker 启动后台任务。
+"""
+import os
+
+from app import create_app, manager
+from task_scheduler import TaskScheduler, ProjectScheduler
+from write_queue import write_queue
+from backup import BackupScheduler
+from maintenance import MaintenanceScheduler
+from metrics import request_metrics
+from event_bus import event_bus
+
+app = create_app()
+
+_scheduler = None
+_project_scheduler = None
+_backup_scheduler = None
+_maintenance_scheduler = None
+
+
+def start_worker(threads=None):
+    """工作进程启动后的初始化，由 gunicorn 的 post_worker_init 和 main.py 调用
+
+    threads 为工作进程的线程数，SSE 长连接最多占用其中的一部分，其余留给普通请求。
+
+    周期任务按 last_run 水位比较后更新，多个进程同时调度也不会重复生成，
+    可通过 TASK_SCHEDULER=0 关闭。项目状态自动转换和已删除项目的彻底删除可重复执行，
+    可通过 PROJECT_SCHEDULER=0 关闭。定时备份在各进程间用锁文件互斥，
+    可通过 BACKUP_INTERVAL_HOURS=0 关闭。数据库维护按上次执行时间在进程间认领，
+    可通过 DB_MAINTENANCE=0 关闭。
+    """
+    global _scheduler, _project_scheduler, _backup_scheduler, _maintenance_scheduler
+    if threads:
+        event_bus.limit_for_threads(threads)
+    if os.environ.get('TASK_SCHEDULER', '1') != '0' and _scheduler is None:
+        _scheduler = TaskScheduler(manager)
+        _scheduler.start()
+    if os.environ.get('PROJECT_SCHEDULER', '1') != '0' and _project_scheduler is None:
+        _project_scheduler = ProjectScheduler(manager)
+        _project_scheduler.start()
+    if _backup_scheduler is None:
+        _backup_scheduler = BackupScheduler()
+        _backup_scheduler.start()
+    if os.environ.get('DB_MAINTENANCE', '1') != '0' and _maintenance_scheduler is None:
+        _maintenance_scheduler = MaintenanceScheduler(request_metrics.idle_seconds)
+        _maintenance_scheduler.start()
+
+
+def stop_worker():
+    if _scheduler is not None:
+        _scheduler.stop(timeout=5)
+    if _project_scheduler is not None:
+        _project_scheduler.stop(timeout=5)
+    if _backup_scheduler is not None:
+        _backup_scheduler.stop(timeout=5)
+    if _maintenance_scheduler is not None:
+        _maintenance_scheduler.stop(timeout=5)
+    # 写完后台队列中剩余的维护和故障记录
+    write_queue.stop(timeout=5)